@@ -2,45 +2,71 @@ from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
-import boto3
 import redis
-import numpy as np
 import hashlib
 import os
 from datetime import datetime
 from dotenv import load_dotenv
 import requests
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 import json
+import re
+import time
 import uuid
+import asyncio
+from contextlib import aclosing, asynccontextmanager
 
 # Import completed services
 from services.rights_chatbot import RightsChatbotService
 from services.voice_complaint import VoiceComplaintService  # Done by colleague
 from services.legal_lens import legal_lens_with_nova, INDIAN_LANGUAGES
 from services.officer_mode import scan_petition_with_nova, DEPARTMENTS, INDIAN_LANGUAGES as OFFICER_LANGUAGES
+from services.semantic_cache import SemanticIndex, VECTOR_FIELD, META_FIELDS, encode_entry, cached_entry, decode_vector, scan_vectors
+from services.cache_manager import CacheManager
+from services import cross_language
+from services.cross_language import CrossLanguageStats
+from services.tiered_cache import (TieredCache, open_redis, EXPIRED, MISS, REDIS_URL, REDIS_POOL_SIZE,
+                                   REDIS_CONNECT_TIMEOUT, REDIS_SOCKET_TIMEOUT)
+from services.embeddings import EmbeddingService, BatchingEmbeddingClient, normalize_text
+from services.async_bridge import run_blocking, iterate_blocking, spawn, TIMEOUTS, UpstreamTimeout
+from services.pipeline import StagedPipeline, PipelineMetrics
+from services.relevance import RelevanceGate
+from services.query_router import LocalQueryRouter, COMPLEX, SIMPLE
+from services.retrieval_cache import retrieval_cache
+from services.aws_clients import LazyClient, get_client, created_clients
+from services.model_failover import model_failover
+from services.single_flight import SingleFlight
+from services import admission, sse
+from services.admission import Overloaded, priority, BATCH, BACKGROUND
+from services.eval_queue import EvaluationQueue
+from services.evaluation import EvaluationEngine, MODES as EVAL_MODES, parse_score
+from services.batch_eval import EVAL_BATCH_CONCURRENCY, EVAL_BATCH_RETRIES, load_dataset, load_checkpoint, aggregate, run_batch
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing slow happens at import; dependencies warm up after uvicorn starts serving
+    warm = asyncio.create_task(warm_up())
+    yield
+    warm.cancel()
+    # Before the blocking pool goes away: workers finish their batch, the rest is dropped
+    await run_blocking(evaluation_queue.stop)
+    await cache_tiers.close()
+
 app = FastAPI(
     title="NyayaBharat API",
     version="1.0.0",
-    description="AI-powered legal assistance platform for Indian citizens"
+    description="AI-powered legal assistance platform for Indian citizens",
+    lifespan=lifespan
 )
 
 # --- CONFIGURATION ---
 KNOWLEDGE_BASE_ID = os.getenv("AWS_KB_ID")
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 
-# Initialize AWS Bedrock clients
-bedrock_agent_runtime = boto3.client(
-    service_name='bedrock-agent-runtime',
-    region_name=AWS_REGION
-)
-bedrock_runtime = boto3.client(
-    service_name='bedrock-runtime',
-    region_name=AWS_REGION
-)
+# AWS Bedrock clients — shared registry, created on first call (services/aws_clients.py)
+bedrock_agent_runtime = LazyClient('bedrock-agent-runtime')
+bedrock_runtime = LazyClient('bedrock-runtime')
 
 MODEL_ID          = "amazon.nova-lite-v1:0"
 FALLBACK_MODEL_ID = "meta.llama3-3-70b-instruct-v1:0"
@@ -49,83 +75,216 @@ FALLBACK_MODEL_ID = "meta.llama3-3-70b-instruct-v1:0"
 # SEMANTIC CACHE (Redis)
 # ===========================================================
 
-try:
-    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-    redis_client.ping()
-    CACHE_ENABLED = True
-except Exception:
-    redis_client = None
-    CACHE_ENABLED = False
+# Redis (L2) is connected by connect_cache() at startup and reconnected in the
+# background if it is down; the in-process L1 serves the cache in the meantime
+# (REDIS_URL, REDIS_POOL_SIZE: see services/tiered_cache.py)
+CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "1") == "1"
 
 CACHE_TTL        = 60 * 60 * 24  # 24 hours
 SIMILARITY_THRESHOLD = 0.92       # tune: higher = stricter match required
+CACHE_PREFIX     = "nyaya:cache:"
+
+# In-process index of every cached question's embedding, so lookups never scan Redis
+cache_index = SemanticIndex()
+
+# Per-language budgets with TinyLFU admission, per-entry hits and the similarity histogram
+cache_manager = CacheManager()
+
+# Misses answered by translating a pivot language's cached answer, per language
+cross_stats = CrossLanguageStats()
+
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
 
 def get_embedding(text: str) -> list:
     """Get text embedding from Amazon Titan for semantic similarity."""
     response = bedrock_runtime.invoke_model(
-        modelId="amazon.titan-embed-text-v2:0",
+        modelId=EMBEDDING_MODEL_ID,
         body=json.dumps({"inputText": text[:8000]}),
         contentType="application/json",
         accept="application/json"
     )
     return json.loads(response['body'].read())['embedding']
 
-def cosine_similarity(a: list, b: list) -> float:
-    a, b = np.array(a), np.array(b)
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-10))
+# Concurrent misses are coalesced into short windows with a cap on in-flight Titan calls
+embedding_batcher = BatchingEmbeddingClient(
+    get_embedding,
+    window_ms=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5")),
+    max_batch=int(os.getenv("EMBEDDING_BATCH_MAX", "16")),
+    max_in_flight=int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "8")),
+)
 
-def cache_lookup(question: str, language: str):
+# Memoized embeddings: in-process LRU, plus Redis as a second tier when available
+embedder = EmbeddingService(
+    embedding_batcher.embed,
+    EMBEDDING_MODEL_ID,
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    redis_client=None,  # set while Redis is connected when EMBEDDING_CACHE_REDIS=1
+)
+
+async def rebuild_cache_index(redis_client):
+    """
+    Load every cached embedding from Redis into the in-process index.
+    Uses SCAN rather than KEYS so Redis keeps serving while we read,
+    and fetches only the language + vector fields in pipelined batches.
     """
-    Search Redis for a semantically similar cached question.
+    by_language = {}
+    async for key, language, vector, meta in scan_vectors(redis_client, CACHE_PREFIX):
+        keys, vectors, rows = by_language.setdefault(language, ([], [], []))
+        keys.append(key)
+        vectors.append(vector)
+        rows.append((key, meta["size"], meta["hits"], meta["question"]))
+    for language, (keys, vectors, rows) in by_language.items():
+        await run_blocking(cache_index.load, language, keys, vectors)
+        cache_manager.load(language, rows)
+
+def cache_key(question: str, language: str) -> str:
+    return f"{CACHE_PREFIX}{hashlib.md5((question+language).encode()).hexdigest()}"
+
+async def cache_lookup(question: str, language: str, embedding=None):
+    """
+    Search the in-process index for a semantically similar cached question.
+    Pass the question's embedding if the caller already has it.
     Returns cached entry dict or None.
     """
     if not CACHE_ENABLED:
         return None
     try:
-        query_vec = get_embedding(question)
-        keys = redis_client.keys("nyaya:cache:*")
-        best_score, best_key = 0.0, None
-        for key in keys:
-            stored = redis_client.hgetall(key)
-            if stored.get('language') != language:
-                continue
-            cached_vec = json.loads(stored['embedding'])
-            score = cosine_similarity(query_vec, cached_vec)
-            if score > best_score:
-                best_score, best_key = score, key
+        if embedding is None:
+            embedding = await run_blocking(embedder.embed, question, timeout="cache")
+        started = time.perf_counter()
+        best_key, best_score = await run_blocking(cache_index.search, language, embedding)
+        candidate = cache_key(question, language)
         if best_score >= SIMILARITY_THRESHOLD and best_key:
-            entry = redis_client.hgetall(best_key)
-            return {
-                'answer': entry['answer'],
-                'citations': json.loads(entry['citations']),
-                'relevance_score': float(entry.get('relevance_score', 0.8)),
-                'model_used': entry.get('model_used', 'cached'),
-                'similarity': best_score
-            }
+            entry, tier = await cache_tiers.get(best_key)
+            if entry is not None:
+                cache_tiers.record(tier, time.perf_counter() - started)
+                cache_tiers.touch(best_key)  # a hit restarts the TTL
+                cache_manager.record_lookup(candidate, best_score, best_key)
+                return {**entry, 'similarity': best_score}
+            if tier == EXPIRED:
+                # Expired in Redis (TTL) — drop it from the index as well
+                cache_index.remove(language, best_key)
+                cache_manager.forget(best_key, expired=True)
+        cache_tiers.record(MISS, time.perf_counter() - started)
+        cache_manager.record_lookup(candidate, best_score if best_key else None)
     except Exception:
         pass
     return None
 
-def cache_save(question: str, language: str, answer: str, citations: list,
-               relevance_score: float, model_used: str):
-    """Save a question+answer to Redis with its embedding."""
+async def cross_language_lookup(question: str, language: str, embedding):
+    """
+    After a same-language miss: find the question in the pivot languages' shards
+    and serve that answer translated (services/cross_language.py). The translation
+    is saved under `language`, so the next ask is a direct hit. Returns entry dict or None.
+    """
+    if not CACHE_ENABLED or embedding is None:
+        return None
+    pivots = cross_language.pivots_for(language)
+    if not pivots:
+        if cross_language.CROSS_LANGUAGE_CACHE and language not in cross_language.TRANSLATE_LANGUAGES:
+            cross_stats.record(language, cross_language.UNSUPPORTED)
+        return None
+    best_pivot, best_key, best_score = None, None, 0.0
+    for pivot in pivots:
+        key, score = await run_blocking(cache_index.search, pivot, embedding)
+        if key and score > best_score:
+            best_pivot, best_key, best_score = pivot, key, score
+    if best_score < cross_language.CROSS_LANGUAGE_THRESHOLD:
+        cross_stats.record(language, cross_language.NO_CANDIDATE)
+        return None
+    entry, tier = await cache_tiers.get(best_key)
+    if entry is None:
+        if tier == EXPIRED:
+            cache_index.remove(best_pivot, best_key)
+            cache_manager.forget(best_key, expired=True)
+        cross_stats.record(language, cross_language.NO_CANDIDATE)
+        return None
+    if entry['relevance_score'] < cross_language.CROSS_LANGUAGE_MIN_RELEVANCE:
+        cross_stats.record(language, cross_language.LOW_RELEVANCE)
+        return None
+    try:
+        answer = await run_blocking(cross_language.translate_answer, entry['answer'], best_pivot, language,
+                                    timeout="translate")
+    except Exception:
+        cross_stats.record(language, cross_language.FAILED)
+        return None
+    cross_stats.record(language, cross_language.TRANSLATED, best_pivot, len(entry['answer']))
+    cache_tiers.touch(best_key)
+    cache_manager.record_hit(best_key)
+    spawn(cache_save(question, language, answer, entry['citations'], entry['relevance_score'],
+                     entry['model_used'], embedding))
+    return {**cached_entry(answer, entry['citations'], entry['relevance_score'], entry['model_used']),
+            'similarity': best_score, 'translated_from': best_pivot}
+
+async def cache_save(question: str, language: str, answer: str, citations: list,
+                     relevance_score: float, model_used: str, embedding=None, deltas=None):
+    """
+    Save a question+answer to Redis with its embedding, and index it.
+    `deltas` ([(text, seconds after first token)]) keeps the streamed chunking
+    and pacing for the pre-rendered replay on cache hits.
+    Returns whether the entry was stored (admission may turn it away).
+    """
     if not CACHE_ENABLED:
-        return
+        return False
     try:
-        key = f"nyaya:cache:{hashlib.md5((question+language).encode()).hexdigest()}"
-        embedding = get_embedding(question)
-        redis_client.hset(key, mapping={
-            'question':       question,
-            'language':       language,
-            'answer':         answer,
-            'citations':      json.dumps(citations),
-            'relevance_score': str(relevance_score),
-            'model_used':     model_used,
-            'embedding':      json.dumps(embedding)
-        })
-        redis_client.expire(key, CACHE_TTL)
+        key = cache_key(question, language)
+        if embedding is None:
+            embedding = await run_blocking(embedder.embed, question, timeout="cache")
+        rendered = sse.prerender(deltas or [(answer, 0.0)]) if sse.SSE_PRERENDER else None
+        mapping = encode_entry(question, language, answer, citations, relevance_score, model_used, embedding, rendered)
+        # Over the language's budget, only answers asked for more often than the coldest resident get in
+        victims = cache_manager.admit(key, language, int(mapping["size"]))
+        if victims is None:
+            return False
+        for victim in victims:
+            cache_index.remove(language, victim)
+            await cache_tiers.delete(victim, language)
+        await cache_tiers.put(key, language, mapping, cached_entry(answer, citations, relevance_score, model_used, rendered))
+        await run_blocking(cache_index.add, language, key, embedding)
+        cache_manager.track(key, language, int(mapping["size"]), question=question)
+        return True
     except Exception:
-        pass
+        return False
+
+# The embedding memo runs on worker threads, so it keeps a synchronous client (connects lazily)
+embedding_redis = redis.Redis.from_url(REDIS_URL, max_connections=REDIS_POOL_SIZE,
+                                       socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                                       socket_timeout=REDIS_SOCKET_TIMEOUT)
+
+async def on_redis_connect(client):
+    """(Re)connected: share Redis with the embedding memo and reload the index."""
+    if os.getenv("EMBEDDING_CACHE_REDIS", "1") == "1":
+        embedder.redis_client = embedding_redis
+    await rebuild_cache_index(client)
+    readiness["cache"] = "warm"
+
+def on_redis_disconnect():
+    embedder.redis_client = None
+    readiness["cache"] = "L1 only, reconnecting to Redis"
+
+async def on_remote_cache_change(op: str, key: str, language: str, client):
+    """Another worker saved or dropped a cache entry: mirror it in this worker's index."""
+    if not language:
+        return
+    if op == "delete":
+        cache_index.remove(language, key)
+        cache_manager.forget(key)
+        return
+    blob, size, hits, question = await client.hmget(key, VECTOR_FIELD, *META_FIELDS)
+    if blob:
+        # Filling a shard retrains its k-means cells: keep that off the event loop, as cache_save does
+        await run_blocking(cache_index.add, language, key, decode_vector(blob))
+        cache_manager.track(key, language, int(size or 0), int(hits or 0), question.decode() if question else "")
+
+# L1 (in-process, per worker) in front of Redis (L2, shared, async client on one pool)
+cache_tiers = TieredCache(open_redis, CACHE_TTL, on_connect=on_redis_connect,
+                          on_disconnect=on_redis_disconnect, on_remote=on_remote_cache_change)
+
+async def connect_cache() -> bool:
+    """Connect to Redis and load the cache index, or start reconnecting in the background."""
+    if not CACHE_ENABLED:
+        return False
+    return await cache_tiers.start()
 
 # Model tiers for query routing
 MODEL_SIMPLE  = "amazon.nova-lite-v1:0"   # fast, cheap — factual/definition questions
@@ -135,6 +294,9 @@ MODEL_COMPLEX = "amazon.nova-pro-v1:0"    # powerful — multi-step legal analys
 # QUERY ROUTER
 # ===========================================================
 
+# Local keyword/feature classifier; the LLM router below only sees low-confidence questions
+query_router = LocalQueryRouter()
+
 def route_query(question: str) -> str:
     """
     Classify the question as SIMPLE or COMPLEX.
@@ -143,6 +305,14 @@ def route_query(question: str) -> str:
     SIMPLE: definitions, yes/no, single-law lookups
     COMPLEX: multi-law analysis, case strategies, comparisons, rights in specific scenarios
     """
+    label, _ = query_router.route(question, llm_fallback=llm_classify_query)
+    return MODEL_COMPLEX if label == COMPLEX else MODEL_SIMPLE
+
+def llm_classify_query(question: str) -> str:
+    """
+    Ask Nova Lite whether the question is SIMPLE or COMPLEX.
+    Raises if the call fails, so failures are not memoized as answers.
+    """
     routing_prompt = f"""You are a query complexity classifier for a legal AI system.
 
 Classify this legal question as either SIMPLE or COMPLEX.
@@ -157,16 +327,13 @@ Question: {question}
 
 Reply with ONLY one word: SIMPLE or COMPLEX"""
 
-    try:
-        response = bedrock_runtime.converse(
-            modelId=MODEL_ID,
-            messages=[{"role": "user", "content": [{"text": routing_prompt}]}],
-            inferenceConfig={"maxTokens": 5, "temperature": 0.0}
-        )
-        verdict = response["output"]["message"]["content"][0]["text"].strip().upper()
-        return MODEL_COMPLEX if "COMPLEX" in verdict else MODEL_SIMPLE
-    except:
-        return MODEL_SIMPLE  # default to fast model if routing fails
+    response = bedrock_runtime.converse(
+        modelId=MODEL_ID,
+        messages=[{"role": "user", "content": [{"text": routing_prompt}]}],
+        inferenceConfig={"maxTokens": 5, "temperature": 0.0}
+    )
+    verdict = response["output"]["message"]["content"][0]["text"].strip().upper()
+    return COMPLEX if "COMPLEX" in verdict else SIMPLE
 
 # ===========================================================
 # SELF-RAG HELPERS
@@ -202,6 +369,22 @@ Output ONLY a decimal like 0.8 or 0.3 — nothing else:"""
         return 0.5  # default to neutral if scoring fails
 
 
+def retrieve_docs(query: str):
+    """
+    Retrieve passages from the Knowledge Base.
+    Returns (context string, citations); each citation keeps the KB's retrieval score.
+    """
+    kb_response = retrieval_cache.retrieve(bedrock_agent_runtime, query, KNOWLEDGE_BASE_ID, 5)
+    ctx = ""
+    cits = []
+    for result in kb_response.get('retrievalResults', []):
+        text_snippet = result['content']['text']
+        source_uri = result.get('location', {}).get('s3Location', {}).get('uri', "Legal Document")
+        ctx += f"\n---\n{text_snippet}\n"
+        cits.append({"text": text_snippet, "source": source_uri, "score": result.get('score')})
+    return ctx, cits
+
+
 def rephrase_query(question: str) -> str:
     """
     Ask Nova to rephrase the question for better retrieval.
@@ -223,6 +406,65 @@ Rephrased question (just the question, nothing else):"""
     except:
         return question  # fallback to original
 
+# ===========================================================
+# STREAMING PIPELINE
+# ===========================================================
+
+# Start rephrase + second retrieval alongside the LLM relevance grader instead of after it
+SPECULATIVE_REQUERY = os.getenv("SPECULATIVE_REQUERY", "1") == "1"
+# Run the stages one after another, as before they were overlapped (for before/after benchmarks)
+PIPELINE_SEQUENTIAL = os.getenv("PIPELINE_SEQUENTIAL", "0") == "1"
+
+# Per-stage timings of recent /api/rights/stream requests
+pipeline_metrics = PipelineMetrics()
+
+# Decides relevance from KB retrieval scores; the LLM grader only sees the uncertain band
+relevance_gate = RelevanceGate()
+
+# Concurrent identical questions (normalized text + language) share one /api/rights/stream pipeline
+stream_flights = SingleFlight()
+
+def grade_completion(prompt: str, max_tokens: int = 10) -> str:
+    """One deterministic grading call on the cheap model; returns the raw text."""
+    r = bedrock_runtime.converse(
+        modelId=MODEL_ID,
+        messages=[{"role": "user", "content": [{"text": prompt}]}],
+        inferenceConfig={"maxTokens": max_tokens, "temperature": 0.0}
+    )
+    return r["output"]["message"]["content"][0]["text"].strip()
+
+async def score_streamed_answer(job: dict) -> dict:
+    """RAGAS quick scores for one streamed answer; awaited on an evaluation worker's loop."""
+    async def quick_score(prompt):
+        with priority(BACKGROUND):  # yields Bedrock capacity to live requests
+            return parse_score(await run_blocking(grade_completion, prompt, timeout="grade"), default=0.5)
+
+    ctx_block = "\n---\n".join([c['text'] for c in job["citations"][:3]])
+    faithfulness, answer_relevance = await asyncio.gather(
+        quick_score(f"""Faithfulness score task:
+Read the CONTEXT and ANSWER below. Every claim in the answer must be traceable to the context.
+Give a score from 0.0 to 1.0 where 1.0 means every single claim is supported by the context.
+CONTEXT: {ctx_block[:1200]}
+ANSWER: {job["answer"][:800]}
+Output ONLY a decimal like 0.8 or 0.5 — nothing else:"""),
+        quick_score(f"""Answer relevance score task:
+Does the ANSWER directly and completely address the QUESTION?
+Give a score from 0.0 to 1.0 where 1.0 means fully answered.
+QUESTION: {job["question"]}
+ANSWER: {job["answer"][:800]}
+Output ONLY a decimal like 0.8 or 0.5 — nothing else:"""),
+    )
+    context_precision = job["relevance_score"]  # reuse Self-RAG score
+    return {
+        "faithfulness": round(faithfulness, 2),
+        "answer_relevance": round(answer_relevance, 2),
+        "context_precision": round(context_precision, 2),
+        "overall": round((faithfulness + answer_relevance + context_precision) / 3, 2),
+    }
+
+# Streamed answers are scored in the background (sampled, bounded queue)
+evaluation_queue = EvaluationQueue(score_streamed_answer)
+
 # Initialize completed services
 rights_chatbot = RightsChatbotService()
 voice_complaint = VoiceComplaintService()
@@ -269,6 +511,56 @@ async def root():
         }
     }
 
+# ===========================================================
+# STARTUP / READINESS
+# ===========================================================
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    # Admission queue timed out: tell clients to back off instead of failing with a 500
+    return JSONResponse({"detail": f"Service busy: {exc}"}, status_code=503,
+                        headers={"Retry-After": str(exc.retry_after)})
+
+# AWS clients built in the background at startup so the first request doesn't pay for them
+WARM_AWS_CLIENTS = ["bedrock-runtime", "bedrock-agent-runtime"] if os.getenv("WARM_AWS_CLIENTS", "1") == "1" else []
+STARTED_AT = time.time()
+readiness = {"cache": "cold", "aws_clients": "cold"}
+
+async def warm_up():
+    async def cache():
+        try:
+            if not await connect_cache():
+                readiness["cache"] = "L1 only, reconnecting to Redis" if CACHE_ENABLED else "disabled"
+        except Exception as e:
+            readiness["cache"] = f"unavailable: {e}"
+
+    async def clients():
+        try:
+            for service in WARM_AWS_CLIENTS:
+                await run_blocking(get_client, service)
+            readiness["aws_clients"] = "warm"
+        except Exception as e:
+            readiness["aws_clients"] = f"unavailable: {e}"
+
+    await asyncio.gather(cache(), clients())
+
+@app.get("/ready", tags=["Health"])
+async def ready():
+    """
+    Readiness probe: 200 once startup warm-up has finished (an unavailable
+    Redis still counts — the cache serves from L1 and reconnects), 503 before that.
+    """
+    warming = [name for name, state in readiness.items() if state == "cold"]
+    body = {
+        "ready": not warming,
+        "uptime_s": round(time.time() - STARTED_AT, 1),
+        "dependencies": dict(readiness),
+        "cache_entries": len(cache_index),
+        "aws_clients": created_clients(),
+        "knowledge_base": "configured" if KNOWLEDGE_BASE_ID else "missing AWS_KB_ID",
+    }
+    return JSONResponse(body, status_code=503 if warming else 200)
+
 # ===========================================================
 # 1. RIGHTS CHATBOT  ✅ (your work)
 # ===========================================================
@@ -283,11 +575,12 @@ async def legal_query(request: LegalQueryRequest):
 
     # STEP 1: Retrieve from AWS Knowledge Base
     try:
-        kb_response = bedrock_agent_runtime.retrieve(
-            retrievalQuery={'text': request.question},
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            retrievalConfiguration={'vectorSearchConfiguration': {'numberOfResults': 5}}
+        kb_response = await run_blocking(
+            retrieval_cache.retrieve, bedrock_agent_runtime, request.question, KNOWLEDGE_BASE_ID, 5,
+            timeout="retrieve"
         )
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Knowledge Base Retrieval Error: {str(e)}")
 
@@ -312,11 +605,15 @@ Context:
 
 User Question: {request.question}
 """
-        nova_response = bedrock_runtime.converse(
+        nova_response = await run_blocking(
+            bedrock_runtime.converse,
             modelId=MODEL_ID,
-            messages=[{"role": "user", "content": [{"text": prompt}]}]
+            messages=[{"role": "user", "content": [{"text": prompt}]}],
+            timeout="generate"
         )
         answer = nova_response["output"]["message"]["content"][0]["text"]
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation Error: {str(e)}")
 
@@ -333,67 +630,68 @@ User Question: {request.question}
 # 1b. RIGHTS CHATBOT — STREAMING  ✅
 # ===========================================================
 
-@app.post("/api/rights/stream", tags=["Rights Chatbot"])
-async def legal_query_stream(request: LegalQueryRequest):
+async def rag_events(request: LegalQueryRequest, pipeline: StagedPipeline, question_vec, follow_up: bool = True):
     """
-    Streaming version of the rights chatbot.
-    Returns Server-Sent Events (SSE) — chunks arrive word by word.
+    Self-RAG pipeline for a cache miss on /api/rights/stream: retrieval,
+    relevance, routing, then generation. Errors before generation raise
+    (HTTPException / Overloaded); returns the async generator of event dicts.
+    With follow_up, the finished answer is sampled for evaluation and cached
+    in the background (scripts/warm_cache.py saves it itself).
     """
-    if not KNOWLEDGE_BASE_ID:
-        raise HTTPException(status_code=500, detail="Missing AWS_KB_ID in environment.")
+    # STEP 1: Self-RAG Retrieval with re-query if relevance is low
+    async def route():
+        try:
+            return await run_blocking(route_query, request.question, timeout="grade")
+        except Exception:
+            return MODEL_SIMPLE
 
-    # STEP 0: Semantic Cache lookup — skip RAG entirely if similar question seen before
-    cached = cache_lookup(request.question, request.language)
-    if cached:
-        async def cached_response():
-            yield f"data: {json.dumps({'type': 'citations', 'citations': cached['citations'], 'relevance_score': cached['relevance_score'], 'model_used': '💾 Cached', 'from_cache': True, 'similarity': round(cached['similarity'] * 100)})}\n\n"
-            # Stream cached answer token by token for consistent UX
-            words = cached['answer'].split(' ')
-            for i, word in enumerate(words):
-                chunk = word + ('' if i == len(words)-1 else ' ')
-                yield f"data: {json.dumps({'type': 'chunk', 'text': chunk})}\n\n"
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
-        return StreamingResponse(cached_response(), media_type="text/event-stream",
-                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    async def requery():
+        rephrased = await run_blocking(rephrase_query, request.question, timeout="grade")
+        return await run_blocking(retrieve_docs, rephrased, timeout="retrieve")
 
-    # STEP 1: Self-RAG Retrieval with re-query if relevance is low
-    def retrieve_docs(query: str):
-        kb_response = bedrock_agent_runtime.retrieve(
-            retrievalQuery={'text': query},
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            retrievalConfiguration={'vectorSearchConfiguration': {'numberOfResults': 5}}
-        )
-        ctx = ""
-        cits = []
-        for result in kb_response.get('retrievalResults', []):
-            text_snippet = result['content']['text']
-            source_uri = result.get('location', {}).get('s3Location', {}).get('uri', "Legal Document")
-            ctx += f"\n---\n{text_snippet}\n"
-            cits.append({"text": text_snippet, "source": source_uri})
-        return ctx, cits
+    # Retrieval and routing depend only on the question, so they run side by side.
+    pipeline.start("retrieve", run_blocking(retrieve_docs, request.question, timeout="retrieve"))
+    pipeline.start("route", route())
 
     try:
-        retrieved_context, citations = retrieve_docs(request.question)
+        retrieved_context, citations = await pipeline.result("retrieve")
 
         if not citations:
+            pipeline.cancel_all()
             async def empty():
-                yield f"data: {json.dumps({'type': 'done', 'answer': 'No relevant legal documents found.', 'citations': []})}\n\n"
-            return StreamingResponse(empty(), media_type="text/event-stream")
-
-        # Self-RAG: score relevance — re-query if score is too low
-        relevance_score = score_relevance(request.question, retrieved_context)
+                yield {'type': 'done', 'answer': 'No relevant legal documents found.', 'citations': []}
+            return empty()
+
+        # Self-RAG: score relevance — re-query if score is too low.
+        # KB retrieval scores decide clear cases; only the uncertain band asks the LLM grader.
+        relevance_score, relevance_source = relevance_gate.decide(request.question, citations)
+        if relevance_score is None:
+            # Uncertain band: the rephrase + second retrieval can run alongside the grader.
+            # Only here, since a cancelled requery still pays for its in-flight Bedrock call.
+            if SPECULATIVE_REQUERY:
+                pipeline.start("requery", requery())
+            relevance_score = await pipeline.run(
+                "score", run_blocking(score_relevance, request.question, retrieved_context, timeout="grade")
+            )
         if relevance_score < 0.5:
-            rephrased = rephrase_query(request.question)
-            new_context, new_citations = retrieve_docs(rephrased)
+            if not pipeline.started("requery"):
+                pipeline.start("requery", requery())
+            new_context, new_citations = await pipeline.result("requery")
             # Use whichever retrieval gave more results
             if new_citations:
                 retrieved_context, citations = new_context, new_citations
+        else:
+            pipeline.cancel("requery")
 
+    except Overloaded:
+        pipeline.cancel_all()
+        raise
     except Exception as e:
+        pipeline.cancel_all()
         raise HTTPException(status_code=500, detail=f"Knowledge Base Retrieval Error: {str(e)}")
 
     # Route to appropriate model based on question complexity
-    routed_model = route_query(request.question)
+    routed_model = await pipeline.result("route")
 
     prompt = f"""You are NyayaBharat, an expert in Indian Law.
 Use the following legal context to answer the user's question in {request.language}.
@@ -407,76 +705,209 @@ User Question: {request.question}
     async def stream_response():
         try:
             # Send citations + relevance score + which model was chosen
-            yield f"data: {json.dumps({'type': 'citations', 'citations': citations, 'relevance_score': relevance_score, 'model_used': routed_model})}\n\n"
-
-            # Try routed model first, fall back to Llama
-            for model_id in [routed_model, FALLBACK_MODEL_ID]:
-                try:
-                    response = bedrock_runtime.converse_stream(
-                        modelId=model_id,
-                        messages=[{"role": "user", "content": [{"text": prompt}]}]
-                    )
-                    full_answer = ''
-                    for event in response['stream']:
-                        if 'contentBlockDelta' in event:
-                            delta = event['contentBlockDelta'].get('delta', {})
-                            if 'text' in delta:
-                                full_answer += delta['text']
-                                yield f"data: {json.dumps({'type': 'chunk', 'text': delta['text']})}\n\n"
-                    yield f"data: {json.dumps({'type': 'done'})}\n\n"
-
-                    # Auto-evaluate the response (RAGAS metrics)
+            yield {'type': 'citations', 'citations': citations, 'relevance_score': relevance_score, 'relevance_source': relevance_source, 'model_used': routed_model}
+
+            # Try routed model first, fall back to Llama; an open circuit skips the routed model
+            models = model_failover.order([routed_model, FALLBACK_MODEL_ID])
+            try:
+                for model_id in models:
+                    started = time.perf_counter()
                     try:
-                        import re as _re
-                        def quick_score(prompt):
-                            r = bedrock_runtime.converse(
-                                modelId=MODEL_ID,
-                                messages=[{"role": "user", "content": [{"text": prompt}]}],
-                                inferenceConfig={"maxTokens": 10, "temperature": 0.0}
-                            )
-                            raw = r["output"]["message"]["content"][0]["text"].strip()
-                            matches = _re.findall(r'[0-9]+[.][0-9]+|[0-9]+', raw)
-                            val = float(matches[0]) if matches else 0.5
-                            return min(max(val, 0.0), 1.0)
-
-                        ctx_block = "\n---\n".join([c['text'] for c in citations[:3]])
-                        faithfulness = quick_score(f"""Faithfulness score task:
-Read the CONTEXT and ANSWER below. Every claim in the answer must be traceable to the context.
-Give a score from 0.0 to 1.0 where 1.0 means every single claim is supported by the context.
-CONTEXT: {ctx_block[:1200]}
-ANSWER: {full_answer[:800]}
-Output ONLY a decimal like 0.8 or 0.5 — nothing else:""")
-                        answer_relevance = quick_score(f"""Answer relevance score task:
-Does the ANSWER directly and completely address the QUESTION?
-Give a score from 0.0 to 1.0 where 1.0 means fully answered.
-QUESTION: {request.question}
-ANSWER: {full_answer[:800]}
-Output ONLY a decimal like 0.8 or 0.5 — nothing else:""")
-                        context_precision = relevance_score  # reuse Self-RAG score
-                        overall = round((faithfulness + answer_relevance + context_precision) / 3, 2)
-                        yield f"data: {json.dumps({'type': 'ragas', 'faithfulness': round(faithfulness, 2), 'answer_relevance': round(answer_relevance, 2), 'context_precision': round(context_precision, 2), 'overall': overall})}\n\n"
-                    except Exception as eval_err:
-                        yield f"data: {json.dumps({'type': 'ragas', 'faithfulness': 0.5, 'answer_relevance': 0.5, 'context_precision': round(relevance_score,2), 'overall': 0.5, 'error': str(eval_err)})}\n\n"
-
-                    # Save to semantic cache for future similar questions
-                    cache_save(request.question, request.language, full_answer,
-                               citations, relevance_score, routed_model)
-                    return
-                except Exception:
-                    if model_id == FALLBACK_MODEL_ID:
-                        raise
+                        response = await run_blocking(
+                            bedrock_runtime.converse_stream,
+                            modelId=model_id,
+                            messages=[{"role": "user", "content": [{"text": prompt}]}],
+                            timeout="generate"
+                        )
+                        full_answer = ''
+                        deltas = []   # (text, seconds after first token) for the cached replay
+                        usage = {}
+                        # Read the blocking event stream on a background thread; leaving this
+                        # block early (client gone, timeout) closes the upstream stream.
+                        async with aclosing(iterate_blocking(response['stream'])) as events:
+                            async for event in events:
+                                if 'contentBlockDelta' in event:
+                                    delta = event['contentBlockDelta'].get('delta', {})
+                                    if 'text' in delta:
+                                        if not full_answer:
+                                            pipeline.mark("first_token")
+                                            model_failover.record(model_id, time.perf_counter() - started, op="stream")
+                                            first_token_at = time.perf_counter()
+                                        full_answer += delta['text']
+                                        deltas.append((delta['text'], time.perf_counter() - first_token_at))
+                                        yield {'type': 'chunk', 'text': delta['text']}
+                                elif 'metadata' in event:
+                                    usage = event['metadata'].get('usage', {})
+                        pipeline.mark("answer_complete")
+                        pipeline_metrics.record(pipeline)
+                        if follow_up:
+                            # Score (sampled) and cache in the background, before the last frame:
+                            # a complete answer is kept even if every client leaves right after it
+                            evaluation_queue.submit({
+                                "question": request.question, "language": request.language,
+                                "answer": full_answer, "citations": citations,
+                                "relevance_score": relevance_score, "model_used": model_id,
+                            })
+                            spawn(cache_save(request.question, request.language, full_answer,
+                                             citations, relevance_score, routed_model, question_vec, deltas))
+                        yield {'type': 'done', 'timings': pipeline.report(),
+                               'usage': {'model': model_id, 'inputTokens': usage.get('inputTokens', 0),
+                                         'outputTokens': usage.get('outputTokens', 0)}}
+                        return
+                    except Overloaded:
+                        raise  # the fallback shares the same capacity
+                    except Exception as e:
+                        model_failover.record(model_id, time.perf_counter() - started, op="stream", error=e)
+                        if model_id == models[-1]:
+                            raise
+            finally:
+                # A half-open probe that got no verdict (Overloaded, client gone, fallback unused) frees its slot
+                for candidate in models:
+                    model_failover.release(candidate)
 
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-
-    return StreamingResponse(
-        stream_response(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",   # important for nginx proxies
-        }
-    )
+            # retryable: capacity or throttling, worth asking again shortly (scripts/warm_cache.py does)
+            yield {'type': 'error', 'message': str(e),
+                   'retryable': isinstance(e, (Overloaded, UpstreamTimeout)) or admission.is_throttling(e)}
+
+    return stream_response()
+
+async def rag_answer(request: LegalQueryRequest, pipeline: StagedPipeline, question_vec):
+    """rag_events() as SSE frames for /api/rights/stream."""
+    # Deltas are coalesced into fewer, larger frames before they are shared with subscribers
+    return sse.render(await rag_events(request, pipeline, question_vec))
+
+@app.post("/api/rights/stream", tags=["Rights Chatbot"])
+async def legal_query_stream(request: LegalQueryRequest):
+    """
+    Streaming version of the rights chatbot.
+    Returns Server-Sent Events (SSE) — chunks arrive word by word.
+    """
+    if not KNOWLEDGE_BASE_ID:
+        raise HTTPException(status_code=500, detail="Missing AWS_KB_ID in environment.")
+
+    pipeline = StagedPipeline(sequential=PIPELINE_SEQUENTIAL)
+
+    # Embed the question once; the same vector serves the cache lookup and cache save
+    question_vec = None
+    if CACHE_ENABLED:
+        try:
+            question_vec = await pipeline.run("embed", run_blocking(embedder.embed, request.question, timeout="cache"))
+        except Exception:
+            pass
+
+    # STEP 0: Semantic Cache lookup — skip RAG entirely if similar question seen before
+    try:
+        cached = await pipeline.run("cache_lookup", asyncio.wait_for(
+            cache_lookup(request.question, request.language, question_vec), TIMEOUTS["cache"]
+        ))
+    except Exception:
+        cached = None
+    # Not cached in this language: reuse a pivot language's answer, translated
+    if cached is None and question_vec is not None:
+        try:
+            cached = await pipeline.run("cache_translate", asyncio.wait_for(
+                cross_language_lookup(request.question, request.language, question_vec), TIMEOUTS["translate"]
+            ))
+        except Exception:
+            cached = None
+    if cached:
+        citations_event = {'type': 'citations', 'citations': cached['citations'], 'relevance_score': cached['relevance_score'], 'model_used': '💾 Cached', 'from_cache': True, 'similarity': round(cached['similarity'] * 100)}
+        if cached.get('translated_from'):
+            citations_event['translated_from'] = cached['translated_from']
+        if cached.get('sse'):
+            # Frames were rendered when the answer was cached: replay the stored bytes
+            async def cached_response():
+                yield sse.frame(citations_event)
+                async for part in sse.replay(cached['sse'], cached['sse_marks']):
+                    yield part
+                yield sse.frame({'type': 'done'})
+            body = cached_response()
+        else:
+            async def cached_events():
+                yield citations_event
+                # Stream cached answer token by token for consistent UX; render() merges the words into larger frames
+                words = cached['answer'].split(' ')
+                for i, word in enumerate(words):
+                    chunk = word + ('' if i == len(words)-1 else ' ')
+                    yield {'type': 'chunk', 'text': chunk}
+                yield {'type': 'done'}
+            body = sse.render(cached_events())
+        return StreamingResponse(body, media_type="text/event-stream", headers=sse.SSE_HEADERS)
+
+    # Identical questions in flight share one pipeline; later arrivals replay the frames so far
+    subscription = stream_flights.join((normalize_text(request.question), request.language),
+                                       lambda: rag_answer(request, pipeline, question_vec))
+    await subscription.ready()
+    return StreamingResponse(subscription, media_type="text/event-stream", headers=sse.SSE_HEADERS)
+
+@app.get("/api/cache/stats", tags=["Rights Chatbot"])
+async def cache_stats():
+    """Semantic cache size, per-tier hit ratio and lookup latency, and embedding memo counters."""
+    return {
+        "enabled": CACHE_ENABLED,
+        "entries": len(cache_index),
+        "tiers": cache_tiers.stats(),
+        "embeddings": embedder.stats(),
+        "embedding_batches": embedding_batcher.stats(),
+    }
+
+@app.post("/api/cache/invalidate", tags=["Rights Chatbot"])
+async def cache_invalidate(key: str | None = None):
+    """Drop one cache key (or all entries) from the in-process L1 of every worker. Redis is untouched."""
+    removed = await cache_tiers.invalidate(key)
+    return {"removed": removed, "tiers": cache_tiers.stats()}
+
+@app.get("/api/cache/analytics", tags=["Rights Chatbot"])
+async def cache_analytics(top: int = 20):
+    """Per-language budget use, admission/eviction counts, hottest entries, and the
+    lookup similarity histogram with the hit rate each candidate threshold would give."""
+    return {
+        **cache_manager.stats(SIMILARITY_THRESHOLD, max(0, min(top, 200))),
+        "cross_language": cross_stats.stats(),
+    }
+
+@app.get("/api/pipeline/stats", tags=["Rights Chatbot"])
+async def pipeline_stats():
+    """p50/p95 per Self-RAG stage and time-to-first-token for recent streams."""
+    return {
+        "speculative_requery": SPECULATIVE_REQUERY,
+        "sequential": PIPELINE_SEQUENTIAL,
+        "relevance_gate": relevance_gate.stats(),
+        "router": query_router.stats(),
+        "single_flight": stream_flights.stats(),
+        "stages": pipeline_metrics.summary(),
+    }
+
+@app.get("/api/evaluation/stats", tags=["Evaluation"])
+async def evaluation_stats():
+    """Background RAGAS queue counters and mean scores over recent streamed answers."""
+    return evaluation_queue.stats()
+
+@app.get("/api/evaluation/recent", tags=["Evaluation"])
+async def evaluation_recent(limit: int = 50):
+    """Most recent background RAGAS scores."""
+    return {"results": evaluation_queue.recent(limit)}
+
+@app.get("/api/models/health", tags=["Health"])
+async def models_health():
+    """Circuit breaker state, error rate and latency per model, plus hedging counters."""
+    return model_failover.stats()
+
+@app.get("/api/admission/stats", tags=["Health"])
+async def admission_stats():
+    """Adaptive concurrency window, queue depth and admitted/rejected calls per priority, per AWS service."""
+    return admission.stats()
+
+@app.get("/api/retrieval-cache/stats", tags=["Rights Chatbot"])
+async def retrieval_cache_stats():
+    """Hit rate and size of the Knowledge Base retrieval cache."""
+    return retrieval_cache.stats()
+
+@app.post("/api/retrieval-cache/invalidate", tags=["Rights Chatbot"])
+async def invalidate_retrieval_cache(kb_id: str | None = None):
+    """Drop cached retrievals after a Knowledge Base re-sync (all KBs if kb_id is omitted)."""
+    return {"invalidated": retrieval_cache.invalidate(kb_id)}
 
 # ===========================================================
 # 2. VOICE COMPLAINT  ✅ (colleague's work)
@@ -485,12 +916,12 @@ Output ONLY a decimal like 0.8 or 0.5 — nothing else:""")
 @app.post("/api/complaint/voice", tags=["Voice Complaints"])
 async def handle_voice_complaint(file: UploadFile = File(...)):
     job_name = f"nyaya-{uuid.uuid4().hex[:12]}"
-    voice_complaint.start_job(file.file, job_name)
+    await run_blocking(voice_complaint.start_job, file.file, job_name, timeout="voice")
     return {"message": "Job started", "job_name": job_name}
 
 @app.get("/api/complaint/result/{job_name}", tags=["Voice Complaints"])
 async def get_result(job_name: str):
-    return voice_complaint.check_result(job_name)
+    return await run_blocking(voice_complaint.check_result, job_name, timeout="voice")
 
 
 # ===========================================================
@@ -531,10 +962,12 @@ async def analyze_legal_document(
         raise HTTPException(status_code=400, detail="Image size must be under 5MB.")
 
     try:
-        result = legal_lens_with_nova(
+        result = await run_blocking(
+            legal_lens_with_nova,
             image_bytes=image_bytes,
             language_code=language,
-            content_type=image.content_type
+            content_type=image.content_type,
+            timeout="vision"
         )
         return {
             "status": "success",
@@ -545,6 +978,8 @@ async def analyze_legal_document(
             "model": result["model"],
             "response_time": datetime.now().isoformat()
         }
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Legal Lens Error: {type(e).__name__}: {str(e)}")
 
@@ -598,12 +1033,15 @@ async def scan_petition(
         raise HTTPException(status_code=400, detail="Image size must be under 5MB.")
 
     try:
-        result = scan_petition_with_nova(
-            image_bytes=image_bytes,
-            department=department,
-            content_type=image.content_type,
-            language_code=language
-        )
+        with priority(BATCH):  # paperwork can wait behind citizens' chat requests
+            result = await run_blocking(
+                scan_petition_with_nova,
+                image_bytes=image_bytes,
+                department=department,
+                content_type=image.content_type,
+                language_code=language,
+                timeout="vision"
+            )
         return {
             "status": "success",
             "filename": image.filename,
@@ -615,6 +1053,8 @@ async def scan_petition(
             "model": result["model"],
             "response_time": datetime.now().isoformat()
         }
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Officer Mode Error: {type(e).__name__}: {str(e)}")
 
@@ -664,97 +1104,72 @@ class EvalResult(BaseModel):
     overall: float
     verdict: str
 
+evaluation_engine = EvaluationEngine(grade_completion)
+
 @app.post("/api/evaluate", tags=["Evaluation"])
-async def evaluate_response(req: EvalRequest):
+async def evaluate_response(req: EvalRequest, mode: str | None = None):
     """
     RAGAS-style evaluation of a RAG response.
     Scores Faithfulness, Answer Relevance, and Context Precision.
     Returns scores 0.0 - 1.0 for each metric.
+    mode: "single" (one structured call) or "concurrent" (three parallel calls).
     """
-
-    context_block = "\n---\n".join(req.contexts[:5])
-
-    # --- Metric 1: Faithfulness ---
-    # Is every claim in the answer supported by the retrieved context?
-    faithfulness_prompt = f"""You are a RAGAS evaluator measuring Faithfulness.
-
-Question: {req.question}
-
-Retrieved Context:
-{context_block}
-
-Answer to evaluate:
-{req.answer}
-
-Faithfulness measures: Are all claims in the answer supported by the context?
-- 1.0 = every statement is grounded in the context
-- 0.5 = some statements go beyond the context
-- 0.0 = answer contradicts or ignores the context entirely
-
-Respond with ONLY a decimal number between 0.0 and 1.0:"""
-
-    # --- Metric 2: Answer Relevance ---
-    # Does the answer actually address what was asked?
-    relevance_prompt = f"""You are a RAGAS evaluator measuring Answer Relevance.
-
-Question: {req.question}
-
-Answer to evaluate:
-{req.answer}
-
-Answer Relevance measures: Does the answer directly address the question asked?
-- 1.0 = answer fully and directly addresses the question
-- 0.5 = answer is related but incomplete or off-topic in parts
-- 0.0 = answer does not address the question at all
-
-Respond with ONLY a decimal number between 0.0 and 1.0:"""
-
-    # --- Metric 3: Context Precision ---
-    # Were the retrieved chunks actually useful for answering?
-    precision_prompt = f"""You are a RAGAS evaluator measuring Context Precision.
-
-Question: {req.question}
-
-Retrieved Context:
-{context_block}
-
-Context Precision measures: How relevant and useful were the retrieved documents for answering this question?
-- 1.0 = all retrieved chunks are highly relevant to the question
-- 0.5 = some chunks are relevant, others are noise
-- 0.0 = retrieved chunks are completely irrelevant to the question
-
-Respond with ONLY a decimal number between 0.0 and 1.0:"""
-
-    def score(prompt):
-        try:
-            r = bedrock_runtime.converse(
-                modelId=MODEL_ID,
-                messages=[{"role": "user", "content": [{"text": prompt}]}],
-                inferenceConfig={"maxTokens": 10, "temperature": 0.0}
-            )
-            return float(r["output"]["message"]["content"][0]["text"].strip())
-        except:
-            return 0.0
-
-    faithfulness      = score(faithfulness_prompt)
-    answer_relevance  = score(relevance_prompt)
-    context_precision = score(precision_prompt)
-    overall           = round((faithfulness + answer_relevance + context_precision) / 3, 3)
-
-    if overall >= 0.8:
-        verdict = "✅ Excellent — highly accurate and grounded"
-    elif overall >= 0.6:
-        verdict = "⚠️ Good — minor gaps in grounding or relevance"
-    else:
-        verdict = "❌ Poor — answer may be hallucinated or off-topic"
-
-    return EvalResult(
-        faithfulness=round(faithfulness, 3),
-        answer_relevance=round(answer_relevance, 3),
-        context_precision=round(context_precision, 3),
-        overall=overall,
-        verdict=verdict
-    )
+    if mode is not None and mode not in EVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {EVAL_MODES}")
+    result = await evaluation_engine.evaluate(req.question, req.answer, req.contexts, mode=mode)
+    return EvalResult(**result)
+
+# Offline golden-dataset runs: throttled calls retried, failed rows reported instead of scored 0.0
+EVAL_BATCH_DIR = os.getenv("EVAL_BATCH_DIR", "eval_runs")
+batch_engine = EvaluationEngine(grade_completion, retries=EVAL_BATCH_RETRIES, strict=True)
+
+def batch_checkpoint_path(run_id: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", run_id):
+        raise HTTPException(status_code=400, detail="run_id may only contain letters, digits, '-' and '_'")
+    return os.path.join(EVAL_BATCH_DIR, f"{run_id}.jsonl")
+
+@app.post("/api/evaluate/batch", tags=["Evaluation"])
+async def evaluate_batch(
+    dataset: UploadFile = File(..., description="JSONL rows of question, answer, contexts (optional id)"),
+    run_id: str = Form(default="", description="Checkpoint name; re-submit with the same run_id to resume"),
+    mode: str = Form(default=""),
+    concurrency: int = Form(default=EVAL_BATCH_CONCURRENCY)
+):
+    """
+    Grade a whole golden dataset. Streams SSE progress events (one per row)
+    and ends with a 'report' event holding the aggregate scores.
+    """
+    if mode and mode not in EVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {EVAL_MODES}")
+    try:
+        rows = load_dataset((await dataset.read()).splitlines())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid dataset: {e}")
+    checkpoint = None
+    if run_id:
+        checkpoint = batch_checkpoint_path(run_id)
+        os.makedirs(EVAL_BATCH_DIR, exist_ok=True)
+
+    async def progress():
+        with priority(BATCH):  # behind interactive chat for Bedrock capacity
+            try:
+                async for event in run_batch(batch_engine, rows, checkpoint, max(1, min(concurrency, 64)), mode or None):
+                    if event["type"] == "progress":
+                        event = {k: v for k, v in event.items() if k != "row"} | {"id": event["row"]["id"]}
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            except Exception as e:
+                yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+
+    return StreamingResponse(progress(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/evaluate/batch/{run_id}", tags=["Evaluation"])
+async def evaluate_batch_report(run_id: str):
+    """Aggregate report of the rows a batch run has finished so far."""
+    path = batch_checkpoint_path(run_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Unknown run_id")
+    return aggregate(list(load_checkpoint(path).values()))
 
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
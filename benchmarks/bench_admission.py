@@ -0,0 +1,76 @@
+"""
+Admission control under overload
+Drives /api/rights/query in-process against a stub Bedrock that throttles
+every call beyond `--capacity` in flight, at rising concurrency, with the
+adaptive limiter off and on. Without it, everything past capacity turns into
+a 500; with it, calls queue inside the window, goodput plateaus at capacity
+and only requests that wait longer than the queue timeout get a 503.
+
+Usage:
+    python -m benchmarks.bench_admission
+    python -m benchmarks.bench_admission --capacity 16 --latency-ms 100 --concurrency 8 32 128
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import app as api
+from services import admission
+from services.aws_clients import set_client
+from services.stubs import StubBedrockRuntime, StubAgentRuntime
+
+
+async def run(client: httpx.AsyncClient, concurrency: int, total: int):
+    codes = {}
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/api/rights/query",
+                                  json={"question": f"What is RTI? {admission.ADMISSION_CONTROL} c{concurrency} #{i}",
+                                        "language": "en"})
+            codes[r.status_code] = codes.get(r.status_code, 0) + 1
+            if r.status_code == 200:
+                latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else float("nan")
+    limit = admission.stats().get("bedrock-runtime", {}).get("limit", "-")
+    print(f"{'on' if admission.ADMISSION_CONTROL else 'off':>9} | {concurrency:>11} | "
+          f"{codes.get(200, 0) / wall:7.1f} | {codes.get(200, 0):>5} | {codes.get(500, 0):>5} | "
+          f"{codes.get(503, 0):>5} | {p50:6.0f} | {limit}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=16, help="stub calls in flight before throttling")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--requests-per-level", type=int, default=4)
+    args = parser.parse_args()
+
+    api.KNOWLEDGE_BASE_ID = "stub-kb"
+    set_client("bedrock-agent-runtime", StubAgentRuntime(latency=args.latency_ms / 1000))
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"/api/rights/query, stub Bedrock throttles beyond {args.capacity} calls in flight")
+        print("admission | concurrency | ok/s    |  200  |  500  |  503  | p50 ms | window")
+        for enabled in (False, True):
+            admission.ADMISSION_CONTROL = enabled
+            admission._limiters.clear()
+            set_client("bedrock-runtime", StubBedrockRuntime(latency=args.latency_ms / 1000,
+                                                             max_concurrency=args.capacity))
+            for c in args.concurrency:
+                await run(client, c, c * args.requests_per_level)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Semantic cache index benchmark
+Measures cache-probe latency of SemanticIndex as the number of cached
+questions grows. Vectors are synthetic but clustered (many paraphrases per
+legal topic) to resemble real Titan embeddings; each probe is a perturbed copy
+of a stored vector, so recall@1 is reported alongside latency.
+
+Usage:
+    python -m benchmarks.bench_cache_index
+    python -m benchmarks.bench_cache_index --sizes 1000 10000 100000 --dim 512
+"""
+import argparse
+import time
+import numpy as np
+
+from services.semantic_cache import SemanticIndex
+
+
+def clustered_vectors(n: int, dim: int, rng, per_topic: int = 40, chunk: int = 50_000) -> np.ndarray:
+    """n unit vectors grouped around n/per_topic random topic centres."""
+    topics = rng.standard_normal((max(1, n // per_topic), dim), dtype=np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk):
+        stop = min(n, start + chunk)
+        centre = topics[rng.integers(0, len(topics), stop - start)]
+        out[start:stop] = centre + 0.9 * rng.standard_normal((stop - start, dim), dtype=np.float32)
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out
+
+
+def perturb(vec: np.ndarray, rng, similarity: float = 0.95) -> np.ndarray:
+    """A vector with roughly the given cosine similarity to vec (a paraphrase)."""
+    noise = rng.standard_normal(vec.shape, dtype=np.float32)
+    noise -= noise.dot(vec) * vec
+    noise /= np.linalg.norm(noise)
+    return similarity * vec + np.sqrt(1 - similarity ** 2) * noise
+
+
+def run(size: int, dim: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = clustered_vectors(size, dim, rng)
+    keys = [f"nyaya:cache:{i:08x}" for i in range(size)]
+    picks = rng.integers(0, size, queries)
+    probes = [perturb(vectors[i], rng) for i in picks]
+
+    index = SemanticIndex()
+    t0 = time.perf_counter()
+    index.load("hi", keys, vectors)
+    build_s = time.perf_counter() - t0
+    del vectors
+
+    for q in probes[:5]:  # warm up BLAS
+        index.search("hi", q)
+    latencies, hits = [], 0
+    for i, q in zip(picks, probes):
+        t0 = time.perf_counter()
+        key, _ = index.search("hi", q)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += key == keys[i]
+    lat = np.array(latencies)
+    print(f"{size:>9,} | {build_s:8.2f}s | {np.percentile(lat, 50):7.3f} | "
+          f"{np.percentile(lat, 99):7.3f} | {hits / queries:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000, 100_000, 250_000, 500_000])
+    parser.add_argument("--dim", type=int, default=1024, help="Titan v2 default is 1024")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"dim={args.dim}, queries={args.queries}")
+    print("  entries |    build | p50 ms  | p99 ms  | recall@1")
+    for size in args.sizes:
+        run(size, args.dim, args.queries)
+
+
+if __name__ == "__main__":
+    main()
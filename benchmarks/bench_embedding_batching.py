@@ -0,0 +1,95 @@
+"""
+Embedding micro-batching benchmark
+Fires bursts of concurrent embedding requests (drawn from a skewed set of
+popular questions, as during a news-driven spike) at a local Bedrock stub,
+once calling the stub directly per request and once through
+BatchingEmbeddingClient. Reports upstream calls, throttling errors and
+per-request latency for both.
+
+Usage:
+    python -m benchmarks.bench_embedding_batching
+    python -m benchmarks.bench_embedding_batching --callers 64 --stub-limit 8 --window-ms 5
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from services.embeddings import BatchingEmbeddingClient
+from services.stubs import StubBedrockRuntime
+
+
+def make_embed_fn(stub: StubBedrockRuntime):
+    def embed(text: str) -> list:
+        response = stub.invoke_model(
+            modelId="amazon.titan-embed-text-v2:0",
+            body=json.dumps({"inputText": text}),
+            contentType="application/json",
+            accept="application/json",
+        )
+        return json.loads(response["body"].read())["embedding"]
+    return embed
+
+
+def workload(n: int, distinct: int, seed: int = 0) -> list:
+    """n questions with Zipf-like popularity over `distinct` phrasings."""
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, distinct + 1)
+    picks = rng.choice(distinct, n, p=weights / weights.sum())
+    return [f"What are my rights under section {i} of the IPC?" for i in picks]
+
+
+def run(label: str, embed, questions: list, callers: int, stub: StubBedrockRuntime):
+    stub.reset_counters()
+    latencies, errors = [], 0
+
+    def one(q):
+        t0 = time.perf_counter()
+        try:
+            embed(q)
+            return (time.perf_counter() - t0) * 1000, False
+        except Exception:
+            return (time.perf_counter() - t0) * 1000, True
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        for ms, failed in pool.map(one, questions):
+            errors += failed
+            if not failed:
+                latencies.append(ms)
+    wall = time.perf_counter() - t0
+    lat = np.array(latencies or [0.0])
+    print(f"{label:<10} | {stub.calls:>6} | {stub.throttled:>9} | {errors:>6} | "
+          f"{np.percentile(lat, 50):7.1f} | {np.percentile(lat, 99):7.1f} | {len(latencies) / wall:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=300, help="distinct question phrasings")
+    parser.add_argument("--callers", type=int, default=64, help="concurrent request threads")
+    parser.add_argument("--latency-ms", type=float, default=40, help="stub Titan latency")
+    parser.add_argument("--stub-limit", type=int, default=16, help="in-flight calls before the stub throttles")
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    args = parser.parse_args()
+
+    stub = StubBedrockRuntime(latency=args.latency_ms / 1000, max_concurrency=args.stub_limit)
+    embed = make_embed_fn(stub)
+    questions = workload(args.requests, args.distinct)
+    batcher = BatchingEmbeddingClient(embed, window_ms=args.window_ms,
+                                      max_batch=args.max_batch, max_in_flight=args.max_in_flight)
+
+    print(f"{args.requests} requests, {args.callers} concurrent callers, stub {args.latency_ms:.0f} ms, "
+          f"throttles above {args.stub_limit} in flight")
+    print("mode       |  calls | throttled | errors | p50 ms  | p99 ms  |  ok/s   (latency of successful requests)")
+    run("direct", embed, questions, args.callers, stub)
+    run("batched", batcher.embed, questions, args.callers, stub)
+    print(f"batcher: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Parallel SSE streams benchmark
+Opens many simultaneous /api/rights/stream requests in-process against stub
+Bedrock clients whose converse_stream emits one word every --token-ms. If
+the event stream were read on the event loop, streams would run one after
+another; with the async bridge they progress together, so total wall time
+stays close to a single stream's duration. Also reports the event loop's
+worst scheduling lag while the streams run.
+
+Usage:
+    python -m benchmarks.bench_parallel_streams --streams 1 10 50
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+import app as api
+from services.aws_clients import set_client
+from services.stubs import StubBedrockRuntime, StubAgentRuntime
+
+# Questions carry the run and the level, so no stream is served by the semantic
+# or retrieval cache of an earlier level (or an earlier run, with Redis)
+RUN = uuid.uuid4().hex[:8]
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - t0 - interval)
+    return worst
+
+
+async def one_stream(client: httpx.AsyncClient, n: int, i: int) -> float:
+    t0 = time.perf_counter()
+    async with client.stream("POST", "/api/rights/stream",
+                             json={"question": f"Can police arrest without a warrant? ({RUN} n{n} #{i})",
+                                   "language": "en"}) as r:
+        async for _ in r.aiter_lines():
+            pass
+    return time.perf_counter() - t0
+
+
+async def run(client: httpx.AsyncClient, n: int):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_lag(stop))
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(one_stream(client, n, i) for i in range(n)))
+    wall = time.perf_counter() - t0
+    stop.set()
+    duration = sorted(results)
+    print(f"{n:>7} | {wall:7.2f} | {duration[len(duration) // 2]:9.2f} | {await lag * 1000:7.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 10, 25, 50])
+    parser.add_argument("--latency-ms", type=float, default=50, help="stub latency per Bedrock call")
+    parser.add_argument("--token-ms", type=float, default=20, help="stub delay between streamed words")
+    args = parser.parse_args()
+
+    api.KNOWLEDGE_BASE_ID = "stub-kb"
+    set_client("bedrock-runtime", StubBedrockRuntime(latency=args.latency_ms / 1000, token_delay=args.token_ms / 1000))
+    set_client("bedrock-agent-runtime", StubAgentRuntime(latency=args.latency_ms / 1000))
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        print("streams |  wall s | stream s  | max loop lag ms")
+        for n in args.streams:
+            await run(client, n)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
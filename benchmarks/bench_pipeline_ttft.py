@@ -0,0 +1,86 @@
+"""
+Self-RAG pipeline time-to-first-token benchmark
+Sends /api/rights/stream requests in-process against stub Bedrock clients
+and reads the time to the first answer token (from request start, so the
+embed and cache lookup stages are included) from the `done` event.
+Each scenario runs twice: "before" with PIPELINE_SEQUENTIAL on and the
+speculative requery off (every stage one after another), "after" with the
+stages overlapped as served.
+Run once with clearly relevant KB scores (the relevance gate decides without
+the LLM grader) and once with middling KB scores that the grader rates low,
+which takes the rephrase + second retrieval path.
+
+Usage:
+    python -m benchmarks.bench_pipeline_ttft --requests 20 --latency-ms 150
+"""
+import argparse
+import asyncio
+import json
+
+import httpx
+
+import app as api
+from services.aws_clients import set_client
+from services.retrieval_cache import retrieval_cache
+from services.stubs import StubBedrockRuntime, StubAgentRuntime, stub_reply
+
+speculative = api.SPECULATIVE_REQUERY   # the configured setting, used for the "after" runs
+
+def low_relevance(prompt: str) -> str:
+    if "Context precision" in prompt:
+        return "0.2"
+    if "Rephrase" in prompt:
+        # A rephrasing different from the question, so the second retrieval reaches the KB stub
+        return stub_reply(prompt) + " under the Indian Penal Code"
+    return stub_reply(prompt)
+
+
+async def measure(label: str, client: httpx.AsyncClient, requests: int, sequential: bool) -> float:
+    """p50 time to first token, with the stages run one after another or overlapped."""
+    api.PIPELINE_SEQUENTIAL = sequential
+    api.SPECULATIVE_REQUERY = speculative and not sequential
+    # Each run's retrievals must reach its own KB stub, not results cached by the previous one
+    retrieval_cache.invalidate()
+    mode = "before" if sequential else "after"
+    ttft = []
+    for i in range(requests):
+        # Distinct text per run: a repeated question would be a semantic cache hit, with no timings
+        r = await client.post("/api/rights/stream",
+                              json={"question": f"What is the punishment for cheating? ({label}, {mode} #{i})",
+                                    "language": "en"})
+        for line in r.text.splitlines():
+            if line.startswith("data: ") and '"done"' in line:
+                ttft.append(json.loads(line[6:])["timings"]["marks"]["first_token"])
+    ttft.sort()
+    return ttft[len(ttft) // 2]
+
+
+async def scenario(label: str, client: httpx.AsyncClient, requests: int):
+    before = await measure(label, client, requests, sequential=True)
+    after = await measure(label, client, requests, sequential=False)
+    print(f"{label:<18} | {before:9.0f} | {after:8.0f} | {1 - after / before:8.0%}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=150, help="stub latency per Bedrock call")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    api.KNOWLEDGE_BASE_ID = "stub-kb"
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"stub latency {args.latency_ms:.0f} ms per call, speculative requery={speculative}")
+        print("scenario           | before ms | after ms | saved  (p50 ttft)")
+        set_client("bedrock-runtime", StubBedrockRuntime(latency=latency, token_delay=0))
+        set_client("bedrock-agent-runtime", StubAgentRuntime(latency=latency))
+        await scenario("relevant context", client, args.requests)
+        set_client("bedrock-runtime", StubBedrockRuntime(latency=latency, token_delay=0, responder=low_relevance))
+        set_client("bedrock-agent-runtime", StubAgentRuntime(latency=latency, score_scale=0.6))
+        await scenario("low relevance", client, args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
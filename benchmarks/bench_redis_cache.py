@@ -0,0 +1,142 @@
+"""
+Redis cache path benchmark
+Runs semantic-cache reads (HMGET of the entry fields + TTL) and saves
+against a local Redis at rising concurrency, three ways:
+
+  sync-loop     synchronous redis-py called straight from coroutines
+  sync-thread   synchronous redis-py through run_blocking() (the previous path)
+  async         TieredCache on redis.asyncio: tick-batched pipelined reads,
+                MULTI/EXEC saves, one bounded pool (the L1 is disabled)
+
+and reports ops/s, p50/p99 latency per operation, and the event loop's worst
+scheduling lag while the operations run (how long any other request would
+have been stalled).
+
+Needs a Redis it may write to (keys under nyaya:bench:, removed afterwards).
+
+Usage:
+    python -m benchmarks.bench_redis_cache
+    REDIS_URL=redis://localhost:6379/1 python -m benchmarks.bench_redis_cache --concurrency 1 64 512
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import redis
+
+from services.async_bridge import run_blocking
+from services.semantic_cache import ENTRY_FIELDS, encode_entry, cached_entry
+from services.tiered_cache import TieredCache, open_redis, REDIS_URL, REDIS_POOL_SIZE
+
+PREFIX = "nyaya:bench:"
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.001) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - t0 - interval)
+    return worst
+
+
+def entry(i: int) -> tuple:
+    answer = f"Cached answer {i}: " + "Article 21 protects life and personal liberty. " * 20
+    vec = np.random.default_rng(i).standard_normal(1024).astype(np.float32)
+    return (encode_entry(f"question {i}", "en", answer, [{"text": "Article 21", "source": "s3://kb"}], 0.9,
+                         "amazon.nova-lite-v1:0", vec),
+            cached_entry(answer, [], 0.9, "amazon.nova-lite-v1:0"))
+
+
+def sync_read(client: redis.Redis, key: str):
+    pipe = client.pipeline(transaction=False)
+    pipe.hmget(key, *ENTRY_FIELDS)
+    pipe.ttl(key)
+    return pipe.execute()
+
+
+def sync_save(client: redis.Redis, key: str, mapping: dict):
+    client.hset(key, mapping=mapping)
+    client.expire(key, 3600)
+
+
+async def run(label: str, op: str, concurrency: int, total: int, call):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - t0)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_lag(stop))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - t0
+    stop.set()
+    latencies.sort()
+    print(f"{op:>5} | {label:>11} | {concurrency:>11} | {total / wall:8.0f} | "
+          f"{latencies[len(latencies) // 2] * 1000:6.2f} | {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} | "
+          f"{await lag * 1000:11.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 64, 512])
+    parser.add_argument("--ops-per-level", type=int, default=20, help="operations per concurrent caller")
+    parser.add_argument("--keys", type=int, default=200)
+    args = parser.parse_args()
+
+    sync_client = redis.Redis.from_url(REDIS_URL, max_connections=REDIS_POOL_SIZE)
+    try:
+        sync_client.ping()
+    except redis.ConnectionError as e:
+        raise SystemExit(f"Redis at {REDIS_URL} is not reachable: {e}")
+    entries = [entry(i) for i in range(args.keys)]
+    keys = [f"{PREFIX}{i}" for i in range(args.keys)]
+    for key, (mapping, _) in zip(keys, entries):
+        sync_save(sync_client, key, mapping)
+
+    cache = TieredCache(open_redis, ttl=3600, l1_size=0)
+    await cache.start()
+    if not cache.available:
+        raise SystemExit(f"Redis at {REDIS_URL} is not reachable: {cache.last_error}")
+
+    async def async_save(i):
+        mapping, decoded = entries[i % len(keys)]
+        await cache.put(keys[i % len(keys)], "en", mapping, decoded)
+
+    # sync-loop calls block the event loop for the whole round trip, then hand it a no-op awaitable
+    modes = {
+        "read": {
+            "sync-loop":   lambda i: asyncio.sleep(0, sync_read(sync_client, keys[i % len(keys)])),
+            "sync-thread": lambda i: run_blocking(sync_read, sync_client, keys[i % len(keys)]),
+            "async":       lambda i: cache.get(keys[i % len(keys)]),
+        },
+        "save": {
+            "sync-loop":   lambda i: asyncio.sleep(0, sync_save(sync_client, keys[i % len(keys)], entries[i % len(keys)][0])),
+            "sync-thread": lambda i: run_blocking(sync_save, sync_client, keys[i % len(keys)], entries[i % len(keys)][0]),
+            "async":       async_save,
+        },
+    }
+
+    print(f"Redis {REDIS_URL}, pool {REDIS_POOL_SIZE}, {args.keys} keys")
+    print("   op |        mode | concurrency |    ops/s | p50 ms | p99 ms | max lag ms")
+    try:
+        for op, calls in modes.items():
+            for concurrency in args.concurrency:
+                for label, call in calls.items():
+                    await run(label, op, concurrency, concurrency * args.ops_per_level, call)
+        stats = cache.stats()
+        print(f"async reads: {stats['l2_reads']} in {stats['l2_read_batches']} pipelines")
+    finally:
+        await cache.close()
+        sync_client.delete(*keys)
+        sync_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+SSE framing benchmark
+Streams a long Hindi answer from /api/rights/stream, on the live path (stub
+converse_stream, one word per delta) and on the cached path (a semantic
+cache hit), with chunk coalescing off and on, and finally as a cache hit
+replayed from frames pre-rendered when the answer was saved. The app is
+driven as a raw ASGI callable so that only server-side work is timed:
+frames are the body messages StreamingResponse hands to the server, CPU is
+process time spent per stream, TTFT is the time until the first chunk frame.
+
+Usage:
+    python -m benchmarks.bench_sse
+    python -m benchmarks.bench_sse --words 2000 --streams 20 --token-ms 1
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import app as api
+from services import sse
+from services.aws_clients import set_client
+from services.stubs import StubBedrockRuntime, StubAgentRuntime
+
+HINDI_WORDS = ("भारतीय संविधान के अनुच्छेद २१ के अनुसार किसी भी व्यक्ति को विधि द्वारा स्थापित प्रक्रिया "
+               "के बिना उसके जीवन या व्यक्तिगत स्वतंत्रता से वंचित नहीं किया जाएगा").split()
+
+
+def hindi_answer(words: int) -> str:
+    return " ".join(HINDI_WORDS[i % len(HINDI_WORDS)] for i in range(words))
+
+
+async def one_stream(question: str) -> tuple:
+    """(frames, body bytes, seconds to first chunk) for one request, driven over raw ASGI."""
+    body = json.dumps({"question": question, "language": "hi"}).encode()
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/api/rights/stream", "raw_path": b"/api/rights/stream",
+             "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+             "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+    sent = False
+    frames = size = 0
+    first_chunk = None
+    t0 = time.perf_counter()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        nonlocal frames, size, first_chunk
+        if message["type"] == "http.response.body" and message.get("body"):
+            frames += 1
+            size += len(message["body"])
+            if first_chunk is None and b'"chunk"' in message["body"]:
+                first_chunk = time.perf_counter() - t0
+
+    await api.app(scope, receive, send)
+    return frames, size, first_chunk
+
+
+async def run(label: str, coalesce: bool, streams: int, tag: str):
+    sse.SSE_COALESCE = coalesce
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    results = await asyncio.gather(*(one_stream(f"{tag} {coalesce} #{i}") for i in range(streams)))
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    frames = sorted(r[0] for r in results)[streams // 2]
+    size = sorted(r[1] for r in results)[streams // 2]
+    ttft = sorted(r[2] for r in results)[streams // 2] * 1000
+    print(f"{label:>6} | {'on' if coalesce else 'off':>8} | {frames:>6} | {size / 1024:7.1f} | "
+          f"{cpu / streams * 1000:10.1f} | {ttft:7.1f} | {wall:6.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=1500, help="words in the answer")
+    parser.add_argument("--streams", type=int, default=20, help="concurrent streams per run")
+    parser.add_argument("--token-ms", type=float, default=1, help="stub delay between streamed words")
+    parser.add_argument("--latency-ms", type=float, default=20, help="stub latency per Bedrock call")
+    args = parser.parse_args()
+
+    answer = hindi_answer(args.words)
+    api.KNOWLEDGE_BASE_ID = "stub-kb"
+    set_client("bedrock-runtime", StubBedrockRuntime(latency=args.latency_ms / 1000, token_delay=args.token_ms / 1000,
+                                                     responder=lambda prompt: "SIMPLE" if "SIMPLE or COMPLEX" in prompt
+                                                     else "0.8" if "decimal" in prompt else answer))
+    set_client("bedrock-agent-runtime", StubAgentRuntime(latency=args.latency_ms / 1000))
+
+    print(f"{args.words}-word Hindi answer, {args.streams} concurrent streams, "
+          f"flush at {sse.SSE_FLUSH_BYTES} B / {sse.SSE_FLUSH_MS:g} ms")
+    print("  path | coalesce | frames |     KiB | CPU ms/req | TTFT ms | wall s")
+    for coalesce in (False, True):
+        await run("live", coalesce, args.streams, "live")
+
+    hit = {"answer": answer, "citations": [], "relevance_score": 0.9, "similarity": 0.97}
+
+    async def lookup(*args, **kwargs):
+        return hit
+    api.cache_lookup = lookup
+    for coalesce in (False, True):
+        await run("cached", coalesce, args.streams, "cached")
+
+    words = answer.split(" ")
+    deltas = [(w + " " if i < len(words) - 1 else w, i * args.token_ms / 1000) for i, w in enumerate(words)]
+    payload, marks = sse.prerender(deltas)
+    hit |= {"sse": payload, "sse_marks": marks}
+    await run("replay", True, args.streams, "replay")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
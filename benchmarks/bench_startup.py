@@ -0,0 +1,95 @@
+"""
+Startup benchmark
+Measures, in fresh processes:
+  import      - `import app` alone
+  first req   - spawning uvicorn until GET / answers
+  ready       - spawning uvicorn until GET /ready returns 200 (warm-up done)
+Each run is a new interpreter, so module caches are cold except for the
+OS file cache; the first run is discarded as a warm-up.
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --port 8765
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_serve(port: int, timeout: float = 60.0) -> tuple:
+    """Seconds from spawn until GET / answers, and until GET /ready is 200."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - t0 < timeout and ready is None:
+                try:
+                    if first is None:
+                        client.get("/").raise_for_status()
+                        first = time.perf_counter() - t0
+                    if client.get("/ready").status_code == 200:
+                        ready = time.perf_counter() - t0
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.005)
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    return first, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=0, help="0 = pick a free port")
+    args = parser.parse_args()
+
+    imports, firsts, readies = [], [], []
+    for i in range(args.runs + 1):
+        imp = time_import()
+        first, ready = time_serve(args.port or free_port())
+        if i == 0:
+            continue  # warm the OS file cache
+        imports.append(imp)
+        firsts.append(first)
+        readies.append(ready)
+
+    def fmt(values):
+        values = [v for v in values if v is not None]
+        if not values:
+            return "    n/a"
+        return f"{sorted(values)[len(values) // 2] * 1000:7.0f}"
+
+    print(f"{args.runs} runs, median ms")
+    print("import app | first request | ready")
+    print(f"{fmt(imports):>10} | {fmt(firsts):>13} | {fmt(readies):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Async handler load test
+Drives /api/rights/query in-process (httpx ASGI transport) with the Bedrock
+clients swapped for local stubs that sleep like the real service. With
+blocking calls on the event loop, throughput stays at ~1/latency whatever the
+concurrency; with run_blocking() it should scale with concurrency up to the
+size of the blocking pool.
+
+Usage:
+    python -m benchmarks.load_test_async
+    python -m benchmarks.load_test_async --latency-ms 200 --concurrency 1 8 32 64
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+import app as api
+from services.aws_clients import set_client
+from services.stubs import StubBedrockRuntime, StubAgentRuntime
+
+# Questions carry the run and the level, so no request is served by the semantic
+# or retrieval cache of an earlier level (or an earlier run, with Redis)
+RUN = uuid.uuid4().hex[:8]
+
+
+async def run(client: httpx.AsyncClient, concurrency: int, total: int):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/api/rights/query", json={"question": f"What is RTI? ({RUN} c{concurrency} #{i})", "language": "en"})
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    print(f"{concurrency:>11} | {total / wall:9.1f} | {latencies[len(latencies) // 2] * 1000:8.0f} | "
+          f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:8.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=100, help="stub latency per Bedrock call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32, 64])
+    parser.add_argument("--requests-per-level", type=int, default=4,
+                        help="requests sent per unit of concurrency")
+    args = parser.parse_args()
+
+    api.KNOWLEDGE_BASE_ID = "stub-kb"
+    set_client("bedrock-runtime", StubBedrockRuntime(latency=args.latency_ms / 1000))
+    set_client("bedrock-agent-runtime", StubAgentRuntime(latency=args.latency_ms / 1000))
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"/api/rights/query, 2 stub Bedrock calls of {args.latency_ms:.0f} ms per request")
+        print("concurrency |   req/s   |  p50 ms  |  p99 ms")
+        for c in args.concurrency:
+            await run(client, c, c * args.requests_per_level)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
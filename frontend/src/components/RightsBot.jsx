@@ -269,10 +269,6 @@ export default function RightsBot({ apiBase = '', onClose }) {
               setMessages(prev => prev.map(m =>
                 m.id === botIdx ? { ...m, text: snap } : m
               ))
-            } else if (event.type === 'ragas') {
-              setMessages(prev => prev.map(m =>
-                m.id === botIdx ? { ...m, ragas: event } : m
-              ))
             } else if (event.type === 'done') {
               // stream finished
             } else if (event.type === 'error') {
@@ -386,39 +382,6 @@ export default function RightsBot({ apiBase = '', onClose }) {
                                 {m.streaming && m.text !== '' && <span className="rb-cursor" />}
                               </>
                         }
-                        {!m.streaming && m.ragas && (
-                          <div style={{
-                            marginTop: 10, padding: '10px 12px', borderRadius: 10,
-                            background: 'rgba(255,255,255,0.04)',
-                            border: '1px solid rgba(255,255,255,0.08)'
-                          }}>
-                            <div style={{ fontSize: 11, color: '#6b7280', marginBottom: 6, fontWeight: 600, letterSpacing: '0.05em' }}>
-                              RAGAS EVALUATION
-                            </div>
-                            <div style={{ display: 'flex', gap: 8, flexWrap: 'wrap' }}>
-                              {[
-                                { label: 'Faithfulness', val: m.ragas.faithfulness },
-                                { label: 'Relevance', val: m.ragas.answer_relevance },
-                                { label: 'Precision', val: m.ragas.context_precision },
-                              ].map(({ label, val }) => (
-                                <div key={label} style={{ flex: 1, minWidth: 80, textAlign: 'center' }}>
-                                  <div style={{
-                                    fontSize: 16, fontWeight: 700,
-                                    color: val >= 0.8 ? '#34d399' : val >= 0.6 ? '#fbbf24' : '#f87171'
-                                  }}>{Math.round(val * 100)}%</div>
-                                  <div style={{ fontSize: 10, color: '#9ca3af', marginTop: 2 }}>{label}</div>
-                                </div>
-                              ))}
-                              <div style={{ flex: 1, minWidth: 80, textAlign: 'center' }}>
-                                <div style={{
-                                  fontSize: 16, fontWeight: 700,
-                                  color: m.ragas.overall >= 0.8 ? '#34d399' : m.ragas.overall >= 0.6 ? '#fbbf24' : '#f87171'
-                                }}>{Math.round(m.ragas.overall * 100)}%</div>
-                                <div style={{ fontSize: 10, color: '#9ca3af', marginTop: 2 }}>Overall</div>
-                              </div>
-                            </div>
-                          </div>
-                        )}
                         {!m.streaming && m.citations?.length > 0 && (
                           <div className="rb-citations">
                             {m.relevanceScore !== undefined && (
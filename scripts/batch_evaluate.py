@@ -0,0 +1,72 @@
+"""
+Offline RAGAS evaluation of a golden dataset.
+
+Grades every {"question", "answer", "contexts"} row of a JSONL file with the
+/api/evaluate prompts, a few rows at a time, retrying throttled calls.
+Finished rows are appended to the checkpoint file; re-running the same
+command resumes instead of starting over. The aggregate report is printed
+and optionally written to --report.
+
+    python -m scripts.batch_evaluate golden.jsonl --checkpoint run1.jsonl --report run1_report.json
+
+--stub grades against the in-process Bedrock stub, for measuring
+throughput in CI without AWS:
+
+    python -m scripts.batch_evaluate scripts/data/eval_golden.jsonl --stub --stub-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from services.admission import BATCH, priority
+from services.batch_eval import EVAL_BATCH_CONCURRENCY, EVAL_BATCH_RETRIES, load_dataset, run_batch
+from services.evaluation import EVAL_MODE, MODES, EvaluationEngine
+
+
+async def main(args):
+    import app  # real run needs AWS credentials
+
+    if args.stub:
+        from services.aws_clients import set_client
+        from services.stubs import StubBedrockRuntime
+        set_client("bedrock-runtime", StubBedrockRuntime(latency=args.stub_latency,
+                                                         max_concurrency=args.stub_max_concurrency))
+
+    with open(args.dataset, encoding="utf-8") as f:
+        rows = load_dataset(f)
+    if args.repeat > 1:
+        rows = [{**r, "id": f"{r['id']}#{k}"} for k in range(args.repeat) for r in rows]
+
+    engine = EvaluationEngine(app.grade_completion, mode=args.mode, retries=args.retries, strict=True)
+    report = None
+    with priority(BATCH):
+        async for event in run_batch(engine, rows, args.checkpoint, args.concurrency):
+            if event["type"] == "progress":
+                row = event["row"]
+                status = f"error: {row['error']}" if "error" in row else f"overall={row['overall']:.2f}"
+                print(f"[{event['done']}/{event['total']}] {row['id']} {status}", file=sys.stderr)
+            else:
+                report = event
+
+    report["throttled_calls"] = engine.throttled
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", help="JSONL with question, answer, contexts (and optional id)")
+    parser.add_argument("--checkpoint", help="JSONL of finished rows; reused to resume")
+    parser.add_argument("--report", help="write the aggregate report here as JSON")
+    parser.add_argument("--mode", choices=MODES, default=EVAL_MODE)
+    parser.add_argument("--concurrency", type=int, default=EVAL_BATCH_CONCURRENCY)
+    parser.add_argument("--retries", type=int, default=EVAL_BATCH_RETRIES)
+    parser.add_argument("--stub", action="store_true", help="use the local Bedrock stub")
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--stub-max-concurrency", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=1, help="repeat the dataset N times (throughput runs)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,85 @@
+"""
+Evaluate the local query router against a labelled question set.
+
+Reports accuracy, coverage (share of questions the local model is confident
+enough to route on its own) and per-call latency for the local classifier,
+the hybrid router (local + LLM fallback) and, with --llm, the original Nova
+Lite router on its own.
+
+Usage:
+    python -m scripts.eval_router [--data scripts/data/router_eval.jsonl] [--min-confidence 0.5] [--llm]
+"""
+import argparse
+import json
+import os
+import time
+
+from services.query_router import LocalQueryRouter, ROUTER_MIN_CONFIDENCE
+
+DEFAULT_DATA = os.path.join(os.path.dirname(__file__), "data", "router_eval.jsonl")
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def report(name: str, correct: int, total: int, latencies: list, extra: str = ""):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<8} accuracy {correct / total:6.1%} | p50 {p50:9.4f} ms | p99 {p99:9.4f} ms {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--min-confidence", type=float, default=ROUTER_MIN_CONFIDENCE)
+    parser.add_argument("--llm", action="store_true", help="also call the Nova Lite router (needs AWS access)")
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    router = LocalQueryRouter(min_confidence=args.min_confidence)
+    correct = confident = confident_correct = 0
+    latencies = []
+    for row in rows:
+        (label, confidence), ms = timed(router.classify, row["question"])
+        latencies.append(ms)
+        correct += label == row["label"]
+        if confidence >= args.min_confidence:
+            confident += 1
+            confident_correct += label == row["label"]
+        elif not args.llm:
+            print(f"  low confidence ({confidence:.2f}) -> LLM: {row['question']}")
+    report("local", correct, len(rows), latencies,
+           f"| confident on {confident}/{len(rows)} ({confident_correct / max(confident, 1):.1%} correct)")
+
+    if not args.llm:
+        return
+
+    import app  # needs AWS credentials
+    llm_correct, llm_latencies, llm_labels = 0, [], []
+    for row in rows:
+        label, ms = timed(app.llm_classify_query, row["question"])
+        llm_labels.append(label)
+        llm_latencies.append(ms)
+        llm_correct += label == row["label"]
+    report("llm", llm_correct, len(rows), llm_latencies)
+
+    hybrid_correct, hybrid_latencies = 0, []
+    for i, row in enumerate(rows):
+        label, confidence = router.classify(row["question"])
+        ms = 0.0
+        if confidence < args.min_confidence:
+            label, ms = llm_labels[i], llm_latencies[i]
+        hybrid_latencies.append(ms)
+        hybrid_correct += label == row["label"]
+    report("hybrid", hybrid_correct, len(rows), hybrid_latencies,
+           f"| LLM calls {len(rows) - confident}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+One-shot migration of semantic cache entries to the binary vector format.
+Older entries keep the Titan embedding as a JSON string in the `embedding`
+field; this rewrites it as a float32 blob in `vec` and drops the JSON copy.
+Entries without a `size` field (written before the cache budget existed)
+get one, so they count their real bytes against CACHE_MAX_BYTES.
+Entries keep their remaining TTL. Safe to re-run: migrated keys are skipped.
+
+Connects to REDIS_URL, the instance the API uses, unless --url or --host is given.
+
+Usage:
+    python -m scripts.migrate_cache_format [--url redis://localhost:6379/0] [--dry-run]
+    python -m scripts.migrate_cache_format --host localhost --port 6379 --db 0
+"""
+import argparse
+import json
+import redis
+
+from services.semantic_cache import VECTOR_FIELD, LEGACY_FIELD, SCAN_BATCH, encode_vector, entry_size
+from services.tiered_cache import REDIS_URL
+
+CACHE_PREFIX = "nyaya:cache:"
+
+
+def migrate(redis_client, dry_run: bool = False) -> dict:
+    stats = {"scanned": 0, "migrated": 0, "already_binary": 0, "sized": 0, "bytes_before": 0, "bytes_after": 0}
+    batch = []
+
+    def flush():
+        read = redis_client.pipeline(transaction=False)
+        for key in batch:
+            read.hgetall(key)
+        write = redis_client.pipeline(transaction=False)
+        for key, fields in zip(batch, read.execute()):
+            if not fields:
+                continue  # expired since SCAN
+            stats["scanned"] += 1
+            blob, legacy = fields.get(VECTOR_FIELD), fields.get(LEGACY_FIELD)
+            if blob is None and legacy is not None:
+                blob = encode_vector(json.loads(legacy))
+                stats["migrated"] += 1
+                stats["bytes_before"] += len(legacy)
+                stats["bytes_after"] += len(blob)
+                write.hset(key, VECTOR_FIELD, blob)
+                write.hdel(key, LEGACY_FIELD)
+                fields = {**fields, VECTOR_FIELD: blob}
+                fields.pop(LEGACY_FIELD)
+            else:
+                stats["already_binary"] += blob is not None
+            if b"size" not in fields:
+                stats["sized"] += 1
+                write.hset(key, b"size", entry_size(fields))
+        if not dry_run:
+            write.execute()
+        batch.clear()
+
+    for key in redis_client.scan_iter(match=f"{CACHE_PREFIX}*", count=1000):
+        batch.append(key)
+        if len(batch) >= SCAN_BATCH:
+            flush()
+    if batch:
+        flush()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=REDIS_URL, help="Redis URL (default: REDIS_URL, as the API)")
+    parser.add_argument("--host", help="connect by host/port/db instead of --url")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    if args.host:
+        client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    else:
+        client = redis.Redis.from_url(args.url)
+    stats = migrate(client, dry_run=args.dry_run)
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(f"Scanned {stats['scanned']} entries: {stats['migrated']} migrated, "
+          f"{stats['already_binary']} already binary, {stats['sized']} given a size.")
+    if stats["migrated"]:
+        print(f"Embedding storage {stats['bytes_before']:,} -> {stats['bytes_after']:,} bytes "
+              f"({saved:,} saved){' [dry run]' if args.dry_run else ''}.")
+
+
+if __name__ == "__main__":
+    main()
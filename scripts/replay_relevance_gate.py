@@ -0,0 +1,103 @@
+"""
+Offline replay of the relevance gate against the LLM grader.
+
+Step 1 — collect: retrieve each question from the Knowledge Base and grade it
+with the current LLM grader (score_relevance), writing one JSONL row per
+question: {"question", "citations": [{"text", "score"}], "llm_score"}.
+
+    python -m scripts.replay_relevance_gate collect questions.txt relevance_log.jsonl
+
+Step 2 — replay: run RelevanceGate over the log and report how often it
+decides without the LLM and how often those decisions agree with the LLM
+(same side of the 0.5 re-query threshold). --sweep tries a grid of bands.
+
+    python -m scripts.replay_relevance_gate replay relevance_log.jsonl [--high 0.6 --low 0.35] [--sweep]
+"""
+import argparse
+import json
+import sys
+
+from services.relevance import RelevanceGate, RELEVANCE_GATE_HIGH, RELEVANCE_GATE_LOW
+
+REQUERY_THRESHOLD = 0.5
+
+
+def collect(questions_path: str, out_path: str):
+    import app  # needs AWS credentials and AWS_KB_ID
+
+    with open(questions_path, encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+    with open(out_path, "a", encoding="utf-8") as out:
+        for i, question in enumerate(questions, 1):
+            context, citations = app.retrieve_docs(question)
+            llm_score = app.score_relevance(question, context) if citations else 0.0
+            out.write(json.dumps({
+                "question": question,
+                "citations": [{"text": c["text"], "score": c["score"]} for c in citations],
+                "llm_score": llm_score,
+            }, ensure_ascii=False) + "\n")
+            print(f"[{i}/{len(questions)}] llm={llm_score:.2f} top_kb="
+                  f"{max((c['score'] or 0) for c in citations) if citations else 0:.3f}", file=sys.stderr)
+
+
+def replay(rows: list, high: float, low: float, lexical_weight: float) -> dict:
+    gate = RelevanceGate(high=high, low=low, lexical_weight=lexical_weight)
+    decided = agree = 0
+    confusion = {"gate_high_llm_low": 0, "gate_low_llm_high": 0}
+    for row in rows:
+        score, _ = gate.decide(row["question"], row["citations"])
+        if score is None:
+            continue
+        decided += 1
+        gate_ok = score >= REQUERY_THRESHOLD
+        llm_ok = row["llm_score"] >= REQUERY_THRESHOLD
+        if gate_ok == llm_ok:
+            agree += 1
+        elif gate_ok:
+            confusion["gate_high_llm_low"] += 1
+        else:
+            confusion["gate_low_llm_high"] += 1
+    return {
+        "high": high, "low": low, "rows": len(rows), "decided_locally": decided,
+        "llm_calls_avoided": decided / len(rows) if rows else 0.0,
+        "agreement": agree / decided if decided else 1.0, **confusion,
+    }
+
+
+def print_result(r: dict):
+    print(f"high={r['high']:.2f} low={r['low']:.2f} | decided locally {r['decided_locally']}/{r['rows']} "
+          f"({r['llm_calls_avoided']:.1%}) | agreement {r['agreement']:.1%} | "
+          f"false-relevant {r['gate_high_llm_low']} false-irrelevant {r['gate_low_llm_high']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("collect")
+    c.add_argument("questions")
+    c.add_argument("out")
+    r = sub.add_parser("replay")
+    r.add_argument("log")
+    r.add_argument("--high", type=float, default=RELEVANCE_GATE_HIGH)
+    r.add_argument("--low", type=float, default=RELEVANCE_GATE_LOW)
+    r.add_argument("--lexical-weight", type=float, default=0.0)
+    r.add_argument("--sweep", action="store_true", help="try a grid of high/low bands")
+    args = parser.parse_args()
+
+    if args.command == "collect":
+        collect(args.questions, args.out)
+        return
+
+    with open(args.log, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if not args.sweep:
+        print_result(replay(rows, args.high, args.low, args.lexical_weight))
+        return
+    for high in (0.5, 0.55, 0.6, 0.65, 0.7, 0.75):
+        for low in (0.2, 0.25, 0.3, 0.35, 0.4, 0.45):
+            if low < high:
+                print_result(replay(rows, high, low, args.lexical_weight))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Offline semantic cache warm-up for the most common legal questions.
+
+After a deploy or a Redis flush the cache starts empty, and the first users
+pay full Self-RAG latency for the most common questions. This runs every
+FAQ x target language through the same retrieval / relevance / routing /
+generation pipeline as /api/rights/stream (app.rag_events) and stores the
+answers with cache_save(), pre-rendered SSE frames included.
+
+Two phases:
+  prepare   the question in each target language (the FAQ's own text, else
+            Amazon Translate), its embedding, and a cache lookup so that
+            questions already cached are skipped
+  generate  the pipeline for everything left, --concurrency at a time; the
+            answer is saved with the embedding computed in phase one
+
+Throttled calls (ThrottlingException, Overloaded, timeouts) are retried with
+exponential backoff and jitter; other errors are recorded and retried on the
+next run. Finished items are appended to the checkpoint file, so re-running
+the same command resumes. The report gives throughput and the estimated AWS
+cost (generation tokens, embeddings, Translate; routing and grading calls are
+not counted).
+
+    python -m scripts.warm_cache scripts/data/faq_warmup.jsonl --languages hi,ta,en --checkpoint warm.jsonl
+
+--stub runs against the in-process Bedrock, Knowledge Base and Translate
+stubs; --no-redis keeps answers in this process only (throughput runs in CI):
+
+    python -m scripts.warm_cache scripts/data/faq_warmup.jsonl --stub --no-redis --stub-max-concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from contextlib import aclosing
+
+from services.admission import BATCH, Overloaded, is_throttling, priority
+from services.async_bridge import UpstreamTimeout, run_blocking
+from services.batch_eval import load_checkpoint
+from services.cross_language import TRANSLATE_COST_PER_MILLION, TRANSLATE_LANGUAGES, translate_answer
+from services.legal_lens import INDIAN_LANGUAGES
+from services.pipeline import StagedPipeline
+
+# On-demand USD per 1,000 tokens (input, output); override with --prices
+PRICES = {
+    "amazon.nova-lite-v1:0":           (0.00006, 0.00024),
+    "amazon.nova-pro-v1:0":            (0.0008, 0.0032),
+    "meta.llama3-3-70b-instruct-v1:0": (0.00072, 0.00072),
+    "amazon.titan-embed-text-v2:0":    (0.00002, 0.0),
+}
+CHARS_PER_EMBEDDING_TOKEN = 4   # Titan's token count is not returned to us; estimated from characters
+
+
+def load_faqs(lines) -> list:
+    """
+    Parse JSONL rows: {"id", "question", "language" (default en), "questions": {code: text}}.
+    Only question is required; rows without an id get their line number.
+    """
+    faqs = []
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {n}: invalid JSON ({e})") from None
+        if not row.get("question"):
+            raise ValueError(f"line {n}: missing question")
+        row["id"] = str(row.get("id", n))
+        row.setdefault("language", "en")
+        row["questions"] = {row["language"]: row["question"], **row.get("questions", {})}
+        faqs.append(row)
+    return faqs
+
+
+class StreamError(RuntimeError):
+    """An error event from the answer stream; `retryable` as classified by the pipeline."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def retryable(error: Exception) -> bool:
+    if isinstance(error, StreamError):
+        return error.retryable
+    return isinstance(error, (Overloaded, UpstreamTimeout)) or is_throttling(error)
+
+
+async def with_retries(call, args, counters: dict):
+    """await call(), retrying throttling with exponential backoff and jitter."""
+    for attempt in range(args.retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == args.retries or not retryable(e):
+                raise
+            counters["throttled_retries"] += 1
+            delay = min(args.max_backoff, args.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(max(delay, getattr(e, "retry_after", 0)))
+
+
+async def bounded(items: list, concurrency: int, fn):
+    """fn(item) for every item, `concurrency` at a time, yielded as they finish."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with semaphore:
+            return await fn(item)
+
+    tasks = [asyncio.ensure_future(one(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def generate(app, question: str, language: str, vec) -> dict | None:
+    """One pass of the /api/rights/stream pipeline; None if the Knowledge Base had nothing."""
+    events = await app.rag_events(app.LegalQueryRequest(question=question, language=language),
+                                  StagedPipeline(), vec, follow_up=False)
+    result, texts, deltas, first = None, [], [], None
+    async with aclosing(events) as events:
+        async for event in events:
+            if event["type"] == "citations":
+                result = {"citations": event["citations"], "relevance_score": event["relevance_score"],
+                          "model_used": event["model_used"]}
+            elif event["type"] == "chunk":
+                now = time.perf_counter()
+                first = first or now
+                texts.append(event["text"])
+                deltas.append((event["text"], now - first))
+            elif event["type"] == "error":
+                raise StreamError(event["message"], event.get("retryable", False))
+            elif event["type"] == "done" and result is not None:
+                result["usage"] = event.get("usage", {})
+    if result is None:
+        return None
+    return {**result, "answer": "".join(texts), "deltas": deltas}
+
+
+def cost_report(records: list, prices: dict) -> dict:
+    tokens = {}
+    for r in records:
+        usage = r.get("usage")
+        if usage:
+            model = tokens.setdefault(usage["model"], {"inputTokens": 0, "outputTokens": 0})
+            model["inputTokens"] += usage["inputTokens"]
+            model["outputTokens"] += usage["outputTokens"]
+    generation = sum(
+        t["inputTokens"] / 1000 * prices.get(m, (0, 0))[0] + t["outputTokens"] / 1000 * prices.get(m, (0, 0))[1]
+        for m, t in tokens.items()
+    )
+    embedding_chars = sum(r.get("embedding_chars", 0) for r in records)
+    embeddings = embedding_chars / CHARS_PER_EMBEDDING_TOKEN / 1000 * prices.get("amazon.titan-embed-text-v2:0", (0, 0))[0]
+    translated_chars = sum(r.get("translated_chars", 0) for r in records)
+    translate = translated_chars / 1e6 * TRANSLATE_COST_PER_MILLION
+    return {
+        "generation_tokens": tokens,
+        "embedding_chars": embedding_chars,
+        "translated_chars": translated_chars,
+        "usd": {"generation": round(generation, 6), "embeddings": round(embeddings, 6),
+                "translate": round(translate, 6), "total": round(generation + embeddings + translate, 6)},
+    }
+
+
+async def warm(app, items: list, args, prices: dict) -> dict:
+    previous = load_checkpoint(args.checkpoint)
+    pending = [item for item in items if item["id"] not in previous]
+    records = [previous[item["id"]] for item in items if item["id"] in previous]
+    counters = {"throttled_retries": 0}
+    checkpoint = open(args.checkpoint, "a", encoding="utf-8") if args.checkpoint else None
+
+    def finish(record: dict):
+        records.append(record)
+        if checkpoint:
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+        status = f"error: {record['error']}" if "error" in record else record["status"]
+        print(f"[{len(records)}/{len(items)}] {record['id']} {status}", file=sys.stderr)
+
+    async def prepare(item: dict) -> dict:
+        language = item["language"]
+        record = {"id": item["id"], "faq": item["faq"], "language": language}
+        try:
+            question = item["questions"].get(language)
+            if question is None:
+                source = item["source_language"]
+                if language not in TRANSLATE_LANGUAGES or source not in TRANSLATE_LANGUAGES:
+                    return {**record, "status": "untranslatable"}
+                question = await with_retries(lambda: run_blocking(
+                    translate_answer, item["questions"][source], source, language, timeout="translate"
+                ), args, counters)
+                record["translated_chars"] = len(item["questions"][source])
+            record["question"] = question
+            vec = await with_retries(lambda: run_blocking(app.embedder.embed, question, timeout="cache"),
+                                     args, counters)
+            record["embedding_chars"] = len(question)
+            if not args.force and await app.cache_lookup(question, language, vec):
+                return {**record, "status": "already_cached"}
+            return {**record, "vec": vec}
+        except Exception as e:
+            return {**record, "error": f"{type(e).__name__}: {e}"}
+
+    async def answer(record: dict) -> dict:
+        vec = record.pop("vec")
+        started = time.perf_counter()
+        try:
+            result = await with_retries(lambda: generate(app, record["question"], record["language"], vec),
+                                        args, counters)
+            if result is None:
+                return {**record, "status": "no_documents"}
+            stored = await app.cache_save(record["question"], record["language"], result["answer"],
+                                          result["citations"], result["relevance_score"], result["model_used"],
+                                          vec, result["deltas"])
+            return {**record, "status": "cached" if stored else "not_admitted", "usage": result["usage"],
+                    "answer_chars": len(result["answer"]), "seconds": round(time.perf_counter() - started, 3)}
+        except Exception as e:
+            return {**record, "error": f"{type(e).__name__}: {e}"}
+
+    t0 = time.perf_counter()
+    to_generate = []
+    try:
+        async for record in bounded(pending, args.prepare_concurrency, prepare):
+            if "vec" in record:
+                to_generate.append(record)
+            else:
+                finish(record)
+        prepared = time.perf_counter()
+        async for record in bounded(to_generate, args.concurrency, answer):
+            finish(record)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+    elapsed = time.perf_counter() - t0
+    generate_s = time.perf_counter() - prepared
+
+    this_run = records[len(previous):]
+    statuses = {}
+    for r in records:
+        key = "error" if "error" in r else r["status"]
+        statuses[key] = statuses.get(key, 0) + 1
+    seconds = sorted(r["seconds"] for r in this_run if "seconds" in r)
+    return {
+        "items": len(items),
+        "resumed": len(previous),
+        "statuses": statuses,
+        "errors": statuses.get("error", 0),
+        "throttled_retries": counters["throttled_retries"],
+        "elapsed_s": round(elapsed, 2),
+        "prepare_s": round(elapsed - generate_s, 2),
+        "generate_s": round(generate_s, 2),
+        "items_per_s": round(len(this_run) / elapsed, 2) if elapsed and this_run else 0.0,
+        "answers_per_s": round(len(seconds) / generate_s, 2) if generate_s and seconds else 0.0,
+        "answer_p50_s": seconds[len(seconds) // 2] if seconds else None,
+        "answer_p95_s": seconds[int(len(seconds) * 0.95)] if seconds else None,
+        "cost": {"this_run": cost_report(this_run, prices), "all_runs": cost_report(records, prices)},
+    }
+
+
+async def main(args):
+    import app  # real run needs AWS credentials
+
+    if args.stub:
+        from services.aws_clients import set_client
+        from services.stubs import StubAgentRuntime, StubBedrockRuntime, StubTranslate
+        set_client("bedrock-runtime", StubBedrockRuntime(latency=args.stub_latency, token_delay=args.stub_token_ms / 1000,
+                                                         max_concurrency=args.stub_max_concurrency))
+        set_client("bedrock-agent-runtime", StubAgentRuntime(latency=args.stub_latency))
+        set_client("translate", StubTranslate(latency=args.stub_latency))
+        app.KNOWLEDGE_BASE_ID = app.KNOWLEDGE_BASE_ID or "stub-kb"
+    if not app.KNOWLEDGE_BASE_ID:
+        raise SystemExit("Missing AWS_KB_ID in environment.")
+    if not app.CACHE_ENABLED:
+        raise SystemExit("SEMANTIC_CACHE=0: nothing to warm.")
+
+    languages = [code for code in args.languages.split(",") if code]
+    unknown = [code for code in languages if code not in INDIAN_LANGUAGES]
+    if unknown:
+        raise SystemExit(f"Unsupported language code(s) {unknown}. Supported: {list(INDIAN_LANGUAGES)}")
+    with open(args.faqs, encoding="utf-8") as f:
+        faqs = load_faqs(f)
+    if args.limit:
+        faqs = faqs[:args.limit]
+    items = [{"id": f"{faq['id']}:{code}", "faq": faq["id"], "language": code,
+              "questions": faq["questions"], "source_language": faq["language"]}
+             for faq in faqs for code in languages]
+    prices = {**PRICES, **(json.loads(args.prices) if args.prices else {})}
+
+    if not args.no_redis and not await app.connect_cache():
+        await app.cache_tiers.close()
+        raise SystemExit(f"Redis at {app.REDIS_URL} is not reachable: {app.cache_tiers.last_error} "
+                         "(--no-redis to run without it)")
+    try:
+        with priority(BATCH):
+            report = await warm(app, items, args, prices)
+        report["languages"] = languages
+        report["cache"] = {"entries": len(app.cache_index), "redis": app.cache_tiers.stats()["redis"]}
+    finally:
+        await app.cache_tiers.close()
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("faqs", help="JSONL with question (and optional id, language, questions per language)")
+    parser.add_argument("--languages", default=",".join(INDIAN_LANGUAGES), help="comma-separated target language codes")
+    parser.add_argument("--checkpoint", help="JSONL of finished items; reused to resume")
+    parser.add_argument("--report", help="write the report here as JSON")
+    parser.add_argument("--concurrency", type=int, default=4, help="pipelines run at once")
+    parser.add_argument("--prepare-concurrency", type=int, default=32, help="translations / embeddings at once")
+    parser.add_argument("--retries", type=int, default=6, help="per call, on throttling")
+    parser.add_argument("--backoff", type=float, default=1.0, help="first retry delay in seconds, doubled per retry")
+    parser.add_argument("--max-backoff", type=float, default=30.0)
+    parser.add_argument("--force", action="store_true", help="regenerate questions that are already cached")
+    parser.add_argument("--limit", type=int, help="only the first N FAQs")
+    parser.add_argument("--prices", help='JSON {"model id": [usd per 1k input, per 1k output]} merged over PRICES')
+    parser.add_argument("--no-redis", action="store_true", help="run without Redis; answers are not persisted")
+    parser.add_argument("--stub", action="store_true", help="use the local AWS stubs")
+    parser.add_argument("--stub-latency", type=float, default=0.05)
+    parser.add_argument("--stub-token-ms", type=float, default=1.0)
+    parser.add_argument("--stub-max-concurrency", type=int, default=32)
+    sys.exit(asyncio.run(main(parser.parse_args())))
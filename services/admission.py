@@ -0,0 +1,218 @@
+"""
+Admission Control - adaptive concurrency limits for Bedrock calls
+Every converse / converse_stream / invoke_model / retrieve call (and
+Amazon Translate's translate_text) passes through an AdaptiveLimiter for its AWS service (wired in by LazyClient in
+services/aws_clients.py). The limiter keeps an AIMD concurrency window:
++1/limit per successful call, x ADMISSION_BACKOFF on a throttling response
+(at most once per round trip, capped at ADMISSION_COOLDOWN seconds). Calls beyond the window
+wait in a bounded priority queue, where interactive chat goes ahead of
+batch work (Officer Mode, bulk evaluation) and background RAGAS scoring.
+A call that cannot get a slot in time raises Overloaded, which the API
+turns into a 503 with Retry-After.
+
+A throttled call is retried (up to ADMISSION_RETRIES times) after
+re-queueing, so a throttling response shrinks the window instead of failing
+the request.
+
+The priority of a call comes from the request_priority context variable;
+run_blocking() and the worker pools copy it into their threads, and run
+batch and background calls on a separate pool so they cannot tie up the
+threads interactive calls queue from. A call made through run_blocking()
+with a timeout also stops waiting for a slot once that timeout has passed
+(call_deadline), instead of holding its thread after the caller gave up.
+"""
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ADMISSION_CONTROL   = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_INITIAL   = float(os.getenv("ADMISSION_INITIAL", "16"))    # starting window per service
+ADMISSION_MIN       = float(os.getenv("ADMISSION_MIN", "2"))
+ADMISSION_MAX       = float(os.getenv("ADMISSION_MAX", "256"))
+ADMISSION_BACKOFF   = float(os.getenv("ADMISSION_BACKOFF", "0.7"))   # multiplicative decrease
+ADMISSION_COOLDOWN  = float(os.getenv("ADMISSION_COOLDOWN", "1.0"))  # max seconds between decreases
+ADMISSION_RETRIES   = int(os.getenv("ADMISSION_RETRIES", "3"))        # re-queues after throttling
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "256"))  # waiting calls per service
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))  # seconds, sent with 503s
+
+INTERACTIVE, BATCH, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+# Longest time a call of each class may wait for a slot
+QUEUE_TIMEOUTS = {
+    INTERACTIVE: float(os.getenv("ADMISSION_TIMEOUT_INTERACTIVE", "10")),
+    BATCH:       float(os.getenv("ADMISSION_TIMEOUT_BATCH", "30")),
+    BACKGROUND:  float(os.getenv("ADMISSION_TIMEOUT_BACKGROUND", "60")),
+}
+
+request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+# time.monotonic() after which the caller no longer waits for the result (set by run_blocking)
+call_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("call_deadline", default=None)
+
+
+class Overloaded(Exception):
+    """No Bedrock capacity within the queue timeout; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int = ADMISSION_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_throttling(error: Exception) -> bool:
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code", "")
+    return code in ("ThrottlingException", "TooManyRequestsException") or "Throttling" in str(error)
+
+
+@contextmanager
+def priority(level: int):
+    """Run the enclosed calls (and threads started via run_blocking) at `level`."""
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        try:
+            request_priority.reset(token)
+        except ValueError:  # generator finalized from another context
+            pass
+
+
+class _Waiter:
+    __slots__ = ("granted", "abandoned")
+
+    def __init__(self):
+        self.granted = False
+        self.abandoned = False
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, initial: float = ADMISSION_INITIAL, min_limit: float = ADMISSION_MIN,
+                 max_limit: float = ADMISSION_MAX, backoff: float = ADMISSION_BACKOFF,
+                 cooldown: float = ADMISSION_COOLDOWN, queue_size: int = ADMISSION_QUEUE_SIZE):
+        self.name = name
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self._waiters: list = []   # heap of (priority, seq, _Waiter)
+        self._waiting = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._last_decrease = 0.0
+        self._rtt = None           # EWMA of successful call latency
+        self.admitted = {p: 0 for p in PRIORITY_NAMES}
+        self.rejected = {p: 0 for p in PRIORITY_NAMES}
+        self.throttled = 0
+
+    def _grant(self):
+        while self._waiters and self.in_flight < math.floor(self.limit):
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.abandoned:
+                continue
+            waiter.granted = True
+            self.in_flight += 1
+            self._waiting -= 1
+        self._cond.notify_all()
+
+    def acquire(self, level: int | None = None):
+        level = request_priority.get() if level is None else level
+        with self._cond:
+            while self._waiters and self._waiters[0][2].abandoned:
+                heapq.heappop(self._waiters)
+            if not self._waiters and self.in_flight < math.floor(self.limit):
+                self.in_flight += 1
+                self.admitted[level] += 1
+                return
+            if self._waiting >= self.queue_size:
+                self.rejected[level] += 1
+                raise Overloaded(f"{self.name}: admission queue full")
+            waiter = _Waiter()
+            heapq.heappush(self._waiters, (level, next(self._seq), waiter))
+            self._waiting += 1
+            deadline = time.monotonic() + QUEUE_TIMEOUTS[level]
+            caller_deadline = call_deadline.get()
+            if caller_deadline is not None:
+                deadline = min(deadline, caller_deadline)
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    waiter.abandoned = True
+                    self._waiting -= 1
+                    self.rejected[level] += 1
+                    raise Overloaded(f"{self.name}: no capacity before the call's deadline")
+                self._cond.wait(remaining)
+            self.admitted[level] += 1
+
+    def release(self, throttled: bool = False, ok: bool = True, latency: float | None = None):
+        with self._cond:
+            saturated = self.in_flight >= math.floor(self.limit)
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= min(self.cooldown, self._rtt or self.cooldown):
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+            elif ok:
+                if latency is not None:
+                    self._rtt = latency if self._rtt is None else 0.8 * self._rtt + 0.2 * latency
+                if saturated:  # only grow a window that is actually in use
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._grant()
+
+    def wrap(self, fn):
+        """fn with a slot held for the duration of each call; throttled calls re-queue and retry."""
+        def limited(*args, **kwargs):
+            for attempt in range(ADMISSION_RETRIES + 1):
+                self.acquire()
+                started = time.monotonic()
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    throttled = is_throttling(e)
+                    self.release(throttled=throttled, ok=False)
+                    if throttled and attempt < ADMISSION_RETRIES:
+                        continue
+                    raise
+                self.release(latency=time.monotonic() - started)
+                return result
+        limited.__name__ = limited.__qualname__ = getattr(fn, "__name__", "call")
+        return limited
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit":     round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting":   self._waiting,
+                "throttled": self.throttled,
+                "admitted":  {PRIORITY_NAMES[p]: n for p, n in self.admitted.items()},
+                "rejected":  {PRIORITY_NAMES[p]: n for p, n in self.rejected.items()},
+            }
+
+
+LIMITED_OPERATIONS = {"converse", "converse_stream", "invoke_model", "retrieve", "translate_text"}
+
+_limiters: dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(service_name: str) -> AdaptiveLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(service_name)
+        if limiter is None:
+            limiter = _limiters[service_name] = AdaptiveLimiter(service_name)
+        return limiter
+
+
+def stats() -> dict:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {"enabled": ADMISSION_CONTROL, **{name: l.stats() for name, l in limiters.items()}}
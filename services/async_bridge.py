@@ -0,0 +1,200 @@
+"""
+Async Bridge - run blocking AWS and Redis calls off the event loop
+boto3 and redis-py are synchronous. Calling them straight from an async
+FastAPI handler freezes uvicorn's event loop for every other user until the
+call returns, so every handler goes through run_blocking(), which uses one
+dedicated, sized thread pool and a per-call timeout. Batch and background
+calls (see services/admission.py) get their own small pool: they can wait
+up to a minute for an admission slot, and must not hold the threads that
+interactive requests need to reach the limiter's priority queue.
+
+Streaming responses (converse_stream) get the same treatment through
+iterate_blocking(): a reader thread pulls events off the blocking botocore
+stream into a bounded asyncio queue that the async handler consumes.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.admission import INTERACTIVE, request_priority, call_deadline
+
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "64"))
+LOW_PRIORITY_POOL_SIZE = int(os.getenv("LOW_PRIORITY_POOL_SIZE", "16"))  # batch + background calls
+STREAM_POOL_SIZE   = int(os.getenv("STREAM_POOL_SIZE", "128"))   # max concurrent upstream streams
+STREAM_QUEUE_SIZE  = 64                                          # events buffered per stream
+STREAM_IDLE_TIMEOUT  = float(os.getenv("STREAM_IDLE_TIMEOUT", "30"))    # max gap between events
+STREAM_TOTAL_TIMEOUT = float(os.getenv("STREAM_TOTAL_TIMEOUT", "300"))  # max length of one stream
+
+# Per-call timeouts in seconds, by kind of work
+TIMEOUTS = {
+    "cache":    float(os.getenv("TIMEOUT_CACHE", "3")),      # Redis + Titan embedding
+    "retrieve": float(os.getenv("TIMEOUT_RETRIEVE", "15")),  # Knowledge Base retrieve
+    "grade":    float(os.getenv("TIMEOUT_GRADE", "20")),     # short scoring / routing calls
+    "generate": float(os.getenv("TIMEOUT_GENERATE", "60")),  # full answers
+    "vision":   float(os.getenv("TIMEOUT_VISION", "90")),    # Legal Lens / Officer Mode
+    "voice":    float(os.getenv("TIMEOUT_VOICE", "60")),     # S3 upload, Transcribe, Translate
+    "translate": float(os.getenv("TIMEOUT_TRANSLATE", "10")),  # cross-language cache answers
+}
+
+_pool = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+_low_pool = ThreadPoolExecutor(max_workers=LOW_PRIORITY_POOL_SIZE, thread_name_prefix="blocking-low")
+# Stream readers live as long as the stream, so they get their own pool and
+# can never starve short calls of workers.
+_stream_pool = ThreadPoolExecutor(max_workers=STREAM_POOL_SIZE, thread_name_prefix="stream")
+
+_END = object()
+
+
+class UpstreamTimeout(TimeoutError):
+    """A blocking call did not finish within its timeout."""
+
+
+class _Raised:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _pool_for_priority() -> ThreadPoolExecutor:
+    return _pool if request_priority.get() == INTERACTIVE else _low_pool
+
+
+async def run_blocking(fn, *args, timeout: float | str | None = None, **kwargs):
+    """
+    Await fn(*args, **kwargs) on the blocking pool.
+    `timeout` is seconds or a key of TIMEOUTS. On timeout the caller gets
+    UpstreamTimeout; the worker thread finishes in the background, but an
+    admission wait inside it gives up at the same deadline.
+    Context variables are carried into the worker thread.
+    """
+    if isinstance(timeout, str):
+        timeout = TIMEOUTS[timeout]
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    if timeout is not None:
+        context.run(call_deadline.set, time.monotonic() + timeout)
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    future = loop.run_in_executor(_pool_for_priority(), call)
+    if timeout is None:
+        return await future
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        name = getattr(fn, "__qualname__", repr(fn))
+        raise UpstreamTimeout(f"{name} timed out after {timeout:g}s") from None
+
+
+_background: set = set()   # spawned tasks, referenced until they finish
+
+
+def spawn(coro) -> asyncio.Task:
+    """
+    Fire-and-forget a coroutine on the running loop, for async work the
+    response does not wait on (e.g. cache writes). Errors are logged.
+    """
+    task = asyncio.get_running_loop().create_task(coro)
+    _background.add(task)
+
+    def report(t):
+        _background.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            print(f"Background {t.get_coro().__qualname__} failed: {t.exception()}")
+
+    task.add_done_callback(report)
+    return task
+
+
+def submit_blocking(fn, *args, **kwargs) -> concurrent.futures.Future:
+    """
+    Fire-and-forget fn(*args, **kwargs) on the blocking pool, for work the
+    response does not wait on (e.g. cache writes). Errors are logged.
+    """
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    future = _pool_for_priority().submit(call)
+
+    def report(f):
+        if not f.cancelled() and f.exception() is not None:
+            name = getattr(fn, "__qualname__", repr(fn))
+            print(f"Background {name} failed: {f.exception()}")
+
+    future.add_done_callback(report)
+    return future
+
+
+async def iterate_blocking(iterable, idle_timeout: float | None = STREAM_IDLE_TIMEOUT,
+                           total_timeout: float | None = STREAM_TOTAL_TIMEOUT,
+                           max_queued: int = STREAM_QUEUE_SIZE):
+    """
+    Async-iterate a blocking iterable such as a botocore EventStream.
+
+    A reader thread feeds a queue of at most `max_queued` items; when the
+    consumer falls behind, the reader blocks, so a slow client applies
+    backpressure to the upstream stream instead of buffering it all.
+    If the consumer stops early (client disconnect, cancellation, timeout)
+    the reader is stopped and the upstream stream is closed. Raises
+    UpstreamTimeout if no item arrives within `idle_timeout` seconds or the
+    stream runs past `total_timeout`.
+
+    Use with contextlib.aclosing() so cleanup runs as soon as the consumer
+    is done rather than at garbage collection.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        try:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:  # event loop already closed
+            return False
+        while not stop.is_set():
+            try:
+                future.result(timeout=0.25)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+        return False
+
+    def reader():
+        try:
+            for item in iterable:
+                if stop.is_set() or not put(item):
+                    return
+        except BaseException as e:
+            if not stop.is_set():
+                put(_Raised(e))
+            return
+        put(_END)
+
+    loop.run_in_executor(_stream_pool, reader)
+    deadline = loop.time() + total_timeout if total_timeout else None
+    try:
+        while True:
+            wait = idle_timeout
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise UpstreamTimeout(f"stream exceeded {total_timeout:g}s")
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                item = await asyncio.wait_for(queue.get(), wait)
+            except asyncio.TimeoutError:
+                raise UpstreamTimeout(f"no stream event for {wait:g}s") from None
+            if item is _END:
+                return
+            if isinstance(item, _Raised):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
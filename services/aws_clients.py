@@ -0,0 +1,120 @@
+"""
+AWS Clients - one shared, lazily-created boto3 client per service
+Every module asks this registry for its clients instead of calling
+boto3.client() at import time, so the process starts without building any
+clients, each service has exactly one client (and one connection pool)
+shared by app.py and all services, and every client gets the same tuned
+botocore Config and region.
+
+boto3 itself is only imported when the first client is built, which keeps
+it out of the API's import time.
+
+Model and retrieval operations on LazyClient handles go through the
+per-service adaptive limiter in services/admission.py. The limiter owns
+throttling retries and backoff for those services, so their clients make a
+single botocore attempt (LIMITER_RETRIES); otherwise botocore's own retries
+and adaptive rate limiter would absorb throttles before the window sees them.
+
+Set BEDROCK_ENDPOINT_URL to point bedrock-runtime and bedrock-agent-runtime
+at a local stub server; in-process stubs can be installed with set_client().
+"""
+import os
+import threading
+
+from services import admission
+
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "128"))  # >= BLOCKING_POOL_SIZE
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT    = float(os.getenv("AWS_READ_TIMEOUT", "120"))   # long generations and stream gaps
+AWS_MAX_ATTEMPTS    = int(os.getenv("AWS_MAX_ATTEMPTS", "4"))
+BEDROCK_ENDPOINT_URL = os.getenv("BEDROCK_ENDPOINT_URL", "")
+
+# botocore Config arguments shared by every client
+DEFAULT_CONFIG = dict(
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    connect_timeout=AWS_CONNECT_TIMEOUT,
+    read_timeout=AWS_READ_TIMEOUT,
+    retries={"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS},
+    tcp_keepalive=True,
+)
+
+# Per-service overrides merged over DEFAULT_CONFIG
+SERVICE_CONFIGS = {
+    "bedrock-agent-runtime": dict(read_timeout=30),
+    "translate":             dict(read_timeout=30),
+}
+
+# Services with LIMITED_OPERATIONS: retried by the admission limiter, not botocore
+LIMITED_SERVICES = ("bedrock-runtime", "bedrock-agent-runtime", "translate")
+LIMITER_RETRIES = {"mode": "standard", "total_max_attempts": 1}   # no botocore retries
+
+ENDPOINT_OVERRIDES = {
+    "bedrock-runtime":       BEDROCK_ENDPOINT_URL,
+    "bedrock-agent-runtime": BEDROCK_ENDPOINT_URL,
+}
+
+_clients: dict[str, object] = {}
+_lock = threading.Lock()
+_session = None
+
+
+def get_client(service_name: str):
+    """The shared client for `service_name`, created on first use."""
+    client = _clients.get(service_name)
+    if client is not None:
+        return client
+    # boto3 client creation is not thread-safe on a shared session
+    global _session
+    with _lock:
+        client = _clients.get(service_name)
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            if _session is None:
+                _session = boto3.session.Session(region_name=AWS_REGION)
+            options = {**DEFAULT_CONFIG, **SERVICE_CONFIGS.get(service_name, {})}
+            if admission.ADMISSION_CONTROL and service_name in LIMITED_SERVICES:
+                options["retries"] = LIMITER_RETRIES
+            config = Config(**options)
+            client = _session.client(service_name, config=config,
+                                     endpoint_url=ENDPOINT_OVERRIDES.get(service_name) or None)
+            _clients[service_name] = client
+        return client
+
+
+def set_client(service_name: str, client):
+    """Install a client (e.g. a stub from services.stubs) for every caller."""
+    with _lock:
+        _clients[service_name] = client
+
+
+def reset_clients():
+    with _lock:
+        _clients.clear()
+
+
+def created_clients() -> list:
+    return sorted(_clients)
+
+
+class LazyClient:
+    """
+    Stand-in for a boto3 client held in a module or attribute: attribute
+    access resolves through get_client(), so nothing is created until the
+    first call and set_client() overrides apply everywhere.
+    """
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+
+    def __getattr__(self, name):
+        attr = getattr(get_client(self.service_name), name)
+        if admission.ADMISSION_CONTROL and name in admission.LIMITED_OPERATIONS:
+            return admission.limiter_for(self.service_name).wrap(attr)
+        return attr
+
+    def __repr__(self):
+        return f"LazyClient({self.service_name!r})"
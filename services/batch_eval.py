@@ -0,0 +1,123 @@
+"""
+Batch Evaluation - golden-dataset regression runs
+Grades a JSONL dataset of {"question", "answer", "contexts"} rows with the
+same RAGAS prompts as /api/evaluate, a bounded number of rows at a time.
+Throttled Bedrock calls are retried by the EvaluationEngine; every finished
+row is appended to a checkpoint file, so a crashed or interrupted run picks
+up where it left off. Used by scripts/batch_evaluate.py and
+POST /api/evaluate/batch.
+"""
+import asyncio
+import json
+import os
+import time
+
+from services.evaluation import METRICS
+
+EVAL_BATCH_CONCURRENCY = int(os.getenv("EVAL_BATCH_CONCURRENCY", "8"))   # rows graded at once
+EVAL_BATCH_RETRIES     = int(os.getenv("EVAL_BATCH_RETRIES", "6"))       # per call, on throttling
+
+
+def load_dataset(lines) -> list:
+    """Parse JSONL rows; each needs question, answer and contexts (list of str). Rows without an id get their line number."""
+    rows = []
+    for n, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {n}: invalid JSON ({e})") from None
+        missing = [k for k in ("question", "answer", "contexts") if k not in row]
+        if missing:
+            raise ValueError(f"line {n}: missing {', '.join(missing)}")
+        if not isinstance(row["contexts"], list):
+            raise ValueError(f"line {n}: contexts must be a list")
+        row["id"] = str(row.get("id", n))
+        rows.append(row)
+    return rows
+
+
+def load_checkpoint(path: str | None) -> dict:
+    """Successfully graded rows from an earlier run, by id. Failed rows are retried."""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            if "error" not in record:
+                done[record["id"]] = record
+    return done
+
+
+def aggregate(records: list, worst: int = 10) -> dict:
+    graded = [r for r in records if "error" not in r]
+    report = {"rows": len(records), "graded": len(graded), "errors": len(records) - len(graded)}
+    for metric in (*METRICS, "overall"):
+        values = sorted(r[metric] for r in graded)
+        if values:
+            report[metric] = {
+                "mean": round(sum(values) / len(values), 3),
+                "p10":  values[int(len(values) * 0.1)],
+                "min":  values[0],
+            }
+    verdicts = {}
+    for r in graded:
+        verdicts[r["verdict"]] = verdicts.get(r["verdict"], 0) + 1
+    report["verdicts"] = verdicts
+    report["worst"] = [{"id": r["id"], "overall": r["overall"], "question": r["question"]}
+                       for r in sorted(graded, key=lambda r: r["overall"])[:worst]]
+    return report
+
+
+async def run_batch(engine, rows: list, checkpoint_path: str | None = None,
+                    concurrency: int = EVAL_BATCH_CONCURRENCY, mode: str | None = None):
+    """
+    Async generator of progress events:
+      {"type": "progress", "done", "total", "errors", "resumed", "row"}  after each row
+      {"type": "report", ...aggregate(), "elapsed_s", "rows_per_s"}      at the end
+    `engine` should be strict (errors raised, not scored 0.0) with retries.
+    """
+    previous = load_checkpoint(checkpoint_path)
+    pending = [r for r in rows if r["id"] not in previous]
+    records = [previous[r["id"]] for r in rows if r["id"] in previous]
+    total, errors = len(rows), 0
+    semaphore = asyncio.Semaphore(concurrency)
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    t0 = time.perf_counter()
+
+    async def grade(row):
+        async with semaphore:
+            try:
+                scores = await engine.evaluate(row["question"], row["answer"], row["contexts"], mode=mode)
+                return {"id": row["id"], "question": row["question"], **scores}
+            except Exception as e:
+                return {"id": row["id"], "question": row["question"], "error": str(e)}
+
+    tasks = [asyncio.ensure_future(grade(r)) for r in pending]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            record = await next_done
+            records.append(record)
+            errors += "error" in record
+            if checkpoint:
+                checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+            yield {"type": "progress", "done": len(records), "total": total, "errors": errors,
+                   "resumed": len(previous), "row": record}
+    finally:
+        for t in tasks:
+            t.cancel()
+        if checkpoint:
+            checkpoint.close()
+
+    elapsed = time.perf_counter() - t0
+    yield {"type": "report", **aggregate(records), "resumed": len(previous),
+           "elapsed_s": round(elapsed, 2),
+           "rows_per_s": round(len(pending) / elapsed, 2) if elapsed and pending else 0.0}
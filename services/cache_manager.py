@@ -0,0 +1,253 @@
+"""
+Cache Manager - budgets, TinyLFU admission and hit analytics for the semantic cache
+Entries used to live for a flat CACHE_TTL whether anyone asked for them
+again or not, with no bound on how many piled up. CacheManager tracks every
+indexed entry (per language: count, bytes, hits) and:
+
+  - enforces CACHE_MAX_ENTRIES and CACHE_MAX_BYTES per language. A new
+    answer that would exceed the budget is only admitted if its question
+    has been asked more often than the coldest of a random sample of
+    CACHE_EVICTION_SAMPLE resident entries, which is then evicted
+    (TinyLFU: frequencies come from an aging count-min sketch, so one-off
+    questions cannot flush out popular answers)
+  - counts hits per entry (the TTL refresh on hit is done by TieredCache)
+  - keeps a histogram of the best similarity score of every lookup, so
+    SIMILARITY_THRESHOLD can be tuned from the hit rate each candidate
+    threshold would have produced
+
+Event-loop only, like the rest of the cache path.
+"""
+import os
+import random
+import time
+
+import numpy as np
+
+CACHE_MAX_ENTRIES     = int(os.getenv("CACHE_MAX_ENTRIES", "20000"))                  # per language
+CACHE_MAX_BYTES       = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))     # per language
+CACHE_EVICTION_SAMPLE = int(os.getenv("CACHE_EVICTION_SAMPLE", "16"))
+SKETCH_WIDTH          = 1 << 16     # counters per row
+SKETCH_ROWS           = 4
+SIMILARITY_BINS       = 100         # histogram bins over [0, 1]
+THRESHOLD_CANDIDATES  = (0.80, 0.85, 0.88, 0.90, 0.92, 0.94, 0.96, 0.98)
+
+
+class FrequencySketch:
+    """
+    Count-min sketch of how often each key was asked for. Every
+    `sample_size` increments all counters are halved, so frequencies reflect
+    recent popularity rather than all-time totals.
+    """
+
+    def __init__(self, width: int = SKETCH_WIDTH, rows: int = SKETCH_ROWS, sample_size: int | None = None):
+        self.mask = width - 1
+        self.rows = rows
+        self.table = np.zeros((rows, width), dtype=np.uint16)
+        self.sample_size = sample_size or 10 * width
+        self.additions = 0
+        self.resets = 0
+
+    def _slots(self, key: str):
+        h = hash(key)
+        return [(h >> (16 * i)) & self.mask for i in range(self.rows)]
+
+    def increment(self, key: str):
+        for row, col in enumerate(self._slots(key)):
+            if self.table[row, col] < 0xFFFF:
+                self.table[row, col] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table >>= 1
+            self.additions //= 2
+            self.resets += 1
+
+    def frequency(self, key: str) -> int:
+        return int(min(self.table[row, col] for row, col in enumerate(self._slots(key))))
+
+
+class _Entry:
+    __slots__ = ("language", "size", "hits", "question", "created", "last_hit")
+
+    def __init__(self, language: str, size: int, hits: int, question: str):
+        self.language = language
+        self.size = size
+        self.hits = hits
+        self.question = question
+        self.created = time.time()
+        self.last_hit = None
+
+
+class CacheManager:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 sample: int = CACHE_EVICTION_SAMPLE):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sample = sample
+        self.sketch = FrequencySketch()
+        self._entries: dict[str, _Entry] = {}
+        self._by_language: dict[str, list] = {}   # language -> keys, for O(1) random sampling
+        self._slot: dict[str, int] = {}           # key -> position in its language's list
+        self._bytes: dict[str, int] = {}
+        self._similarity = [0] * SIMILARITY_BINS
+        self.empty_lookups = 0                    # nothing indexed for the language yet
+        self.admitted = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.expired = 0
+
+    # --- tracking --------------------------------------------------------------
+
+    def track(self, key: str, language: str, size: int, hits: int = 0, question: str = ""):
+        """Start (or refresh) tracking an entry that is in the index."""
+        if key in self._entries:
+            self.forget(key)
+        self._entries[key] = _Entry(language, size, hits, question[:200])
+        keys = self._by_language.setdefault(language, [])
+        self._slot[key] = len(keys)
+        keys.append(key)
+        self._bytes[language] = self._bytes.get(language, 0) + size
+
+    def forget(self, key: str, expired: bool = False) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        keys = self._by_language[entry.language]
+        i = self._slot.pop(key)
+        last = keys.pop()
+        if last != key:
+            keys[i] = last
+            self._slot[last] = i
+        self._bytes[entry.language] -= entry.size
+        if expired:
+            self.expired += 1
+        return True
+
+    def load(self, language: str, rows: list):
+        """Replace a language's tracked entries (index rebuilds); rows are (key, size, hits, question)."""
+        for key in list(self._by_language.get(language, [])):
+            self.forget(key)
+        for key, size, hits, question in rows:
+            self.track(key, language, size, hits, question)
+
+    # --- lookups -----------------------------------------------------------------
+
+    def record_lookup(self, candidate_key: str, best_score: float | None, hit_key: str | None = None):
+        """
+        One cache lookup: `candidate_key` is the key this question would be
+        saved under, `best_score` the nearest neighbour's similarity (None if
+        nothing is indexed), `hit_key` the entry served, if any.
+        """
+        self.sketch.increment(candidate_key)
+        if best_score is None:
+            self.empty_lookups += 1
+        else:
+            self._similarity[min(SIMILARITY_BINS - 1, max(0, int(best_score * SIMILARITY_BINS)))] += 1
+        if hit_key is not None:
+            self.record_hit(hit_key, candidate_key)
+
+    def record_hit(self, key: str, candidate_key: str | None = None):
+        """An entry was served (to a lookup that was saved under `candidate_key`)."""
+        if key != candidate_key:
+            self.sketch.increment(key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.hits += 1
+            entry.last_hit = time.time()
+
+    # --- admission -----------------------------------------------------------------
+
+    def _over_budget(self, language: str, extra_entries: int, extra_bytes: int) -> bool:
+        return (len(self._by_language.get(language, ())) + extra_entries > self.max_entries or
+                self._bytes.get(language, 0) + extra_bytes > self.max_bytes)
+
+    def admit(self, key: str, language: str, size: int) -> list | None:
+        """
+        Whether a new entry fits its language's budget. Returns the keys to
+        evict to make room (often none), or None if the entry is rejected
+        because it is colder than what it would displace.
+        """
+        if key in self._entries:
+            self.admitted += 1
+            return []  # overwrite in place
+        if size > self.max_bytes:
+            self.rejected += 1
+            return None
+        frequency = self.sketch.frequency(key)
+        victims, freed_entries, freed_bytes = [], 0, 0
+        keys = self._by_language.get(language, [])
+        while self._over_budget(language, 1 - freed_entries, size - freed_bytes):
+            pool = [k for k in random.sample(keys, min(self.sample, len(keys))) if k not in victims]
+            if not pool:
+                self.rejected += 1
+                return None
+            victim = min(pool, key=self.sketch.frequency)
+            if self.sketch.frequency(victim) >= frequency:
+                self.rejected += 1
+                return None
+            victims.append(victim)
+            freed_entries += 1
+            freed_bytes += self._entries[victim].size
+        for victim in victims:
+            self.forget(victim)
+        self.evicted += len(victims)
+        self.admitted += 1
+        return victims
+
+    # --- analytics -------------------------------------------------------------------
+
+    def similarity_stats(self, threshold: float) -> dict:
+        lookups = sum(self._similarity)
+        above = [0] * (SIMILARITY_BINS + 1)  # above[i] = lookups with score >= i / BINS
+        for i in range(SIMILARITY_BINS - 1, -1, -1):
+            above[i] = above[i + 1] + self._similarity[i]
+
+        def hit_rate(t: float) -> float:
+            return round(above[min(SIMILARITY_BINS, int(round(t * SIMILARITY_BINS)))] / lookups, 4) if lookups else 0.0
+
+        return {
+            "lookups_with_candidate": lookups,
+            "lookups_without_candidate": self.empty_lookups,
+            "threshold": threshold,
+            "hit_rate": hit_rate(threshold),
+            "hit_rate_at": {f"{t:.2f}": hit_rate(t) for t in THRESHOLD_CANDIDATES},
+            "histogram": [
+                {"min": round(i / SIMILARITY_BINS, 2), "max": round((i + 1) / SIMILARITY_BINS, 2), "lookups": n}
+                for i, n in enumerate(self._similarity) if n
+            ],
+        }
+
+    def stats(self, threshold: float, top: int = 20) -> dict:
+        now = time.time()
+        hottest = sorted(self._entries.items(), key=lambda item: item[1].hits, reverse=True)[:top]
+        return {
+            "budget": {"max_entries_per_language": self.max_entries, "max_bytes_per_language": self.max_bytes},
+            "languages": {
+                language: {
+                    "entries": len(keys),
+                    "bytes": self._bytes.get(language, 0),
+                    "hits": sum(self._entries[k].hits for k in keys),
+                }
+                for language, keys in self._by_language.items() if keys
+            },
+            "admission": {
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "sketch_resets": self.sketch.resets,
+            },
+            "top_entries": [
+                {
+                    "key": key,
+                    "language": e.language,
+                    "question": e.question,
+                    "hits": e.hits,
+                    "bytes": e.size,
+                    "frequency": self.sketch.frequency(key),
+                    "tracked_s": round(now - e.created),
+                    "last_hit_s_ago": round(now - e.last_hit) if e.last_hit else None,
+                }
+                for key, e in hottest
+            ],
+            "similarity": self.similarity_stats(threshold),
+        }
@@ -0,0 +1,118 @@
+"""
+Cross-Language Cache - serve a cache miss from an answer cached in a pivot language
+The semantic cache is sharded by language, so the same question asked in
+Hindi, Tamil and English ran the full retrieve / grade / route / generate
+pipeline once per language. Titan v2 embeddings are multilingual, so a
+Tamil question lands close to its English counterpart.
+
+On a same-language miss, the question's embedding is searched in the
+CACHE_PIVOT_LANGUAGES shards. A candidate is served only if:
+  - its similarity reaches CROSS_LANGUAGE_THRESHOLD (translations score
+    lower than paraphrases in one language, so this has its own setting)
+  - its cached relevance score reaches CROSS_LANGUAGE_MIN_RELEVANCE
+  - both languages are Amazon Translate languages (TRANSLATE_LANGUAGES)
+The cached answer is translated with Amazon Translate, as Officer Mode and
+Voice Complaint already do, and saved under the requested language so the
+next ask is a direct hit.
+
+CrossLanguageStats counts, per supported language, how many full pipelines
+were avoided and why the others were not, plus the translated characters
+and what they cost.
+"""
+import os
+
+from services.aws_clients import LazyClient
+from services.legal_lens import INDIAN_LANGUAGES
+
+translate_client = LazyClient('translate')
+
+CROSS_LANGUAGE_CACHE         = os.getenv("CROSS_LANGUAGE_CACHE", "1") == "1"
+CACHE_PIVOT_LANGUAGES        = tuple(l for l in os.getenv("CACHE_PIVOT_LANGUAGES", "en").split(",") if l)
+CROSS_LANGUAGE_THRESHOLD     = float(os.getenv("CROSS_LANGUAGE_THRESHOLD", "0.85"))
+CROSS_LANGUAGE_MIN_RELEVANCE = float(os.getenv("CROSS_LANGUAGE_MIN_RELEVANCE", "0.6"))
+TRANSLATE_COST_PER_MILLION   = float(os.getenv("TRANSLATE_COST_PER_MILLION", "15"))   # USD per million characters
+TRANSLATE_CHUNK_BYTES        = 9000   # TranslateText accepts 10,000 UTF-8 bytes per call
+
+# INDIAN_LANGUAGES codes Amazon Translate supports; Odia and Assamese always run the full pipeline
+TRANSLATE_LANGUAGES = frozenset(os.getenv(
+    "TRANSLATE_LANGUAGES", "en,hi,bn,te,mr,ta,gu,kn,ml,pa,ur"
+).split(","))
+
+# Outcomes of a cross-language lookup
+TRANSLATED     = "translated"        # served from a pivot answer: one full pipeline avoided
+NO_CANDIDATE   = "no_candidate"      # nothing in a pivot shard at CROSS_LANGUAGE_THRESHOLD
+LOW_RELEVANCE  = "low_relevance"     # candidate's answer was graded below CROSS_LANGUAGE_MIN_RELEVANCE
+UNSUPPORTED    = "unsupported"       # language not in TRANSLATE_LANGUAGES
+FAILED         = "translate_failed"  # Translate error or timeout
+OUTCOMES = (TRANSLATED, NO_CANDIDATE, LOW_RELEVANCE, UNSUPPORTED, FAILED)
+
+
+def pivots_for(language: str) -> tuple:
+    """Pivot languages to search for a miss in `language` (empty if it cannot be translated into)."""
+    if not CROSS_LANGUAGE_CACHE or language not in TRANSLATE_LANGUAGES:
+        return ()
+    return tuple(p for p in CACHE_PIVOT_LANGUAGES if p != language and p in TRANSLATE_LANGUAGES)
+
+
+def _chunks(text: str, limit: int = TRANSLATE_CHUNK_BYTES) -> list:
+    """
+    Split on line breaks into pieces of at most `limit` UTF-8 bytes, as
+    [(piece, separator)]: joining piece + separator in order gives `text` back.
+    """
+    chunks, current, size = [], [], 0
+    for line in text.split("\n"):
+        n = len(line.encode()) + 1
+        if current and size + n > limit:
+            chunks.append(("\n".join(current), "\n"))
+            current, size = [], 0
+        while n > limit:  # one very long line: cut it by characters
+            cut = len(line.encode()[:limit].decode(errors="ignore"))
+            chunks.append((line[:cut], ""))
+            line = line[cut:]
+            n = len(line.encode()) + 1
+        current.append(line)
+        size += n
+    chunks.append(("\n".join(current), ""))
+    return chunks
+
+
+def translate_answer(text: str, source: str, target: str) -> str:
+    """Blocking: `text` translated from `source` into `target` with Amazon Translate."""
+    return "".join(
+        (translate_client.translate_text(
+            Text=chunk, SourceLanguageCode=source, TargetLanguageCode=target
+        )['TranslatedText'] if chunk.strip() else chunk) + separator
+        for chunk, separator in _chunks(text)
+    )
+
+
+class CrossLanguageStats:
+    """Cross-language lookup outcomes per language. Event-loop only."""
+
+    def __init__(self):
+        self.outcomes = {code: dict.fromkeys(OUTCOMES, 0) for code in INDIAN_LANGUAGES}
+        self.pivot_hits = {}
+        self.translated_chars = 0
+
+    def record(self, language: str, outcome: str, pivot: str | None = None, chars: int = 0):
+        counts = self.outcomes.setdefault(language, dict.fromkeys(OUTCOMES, 0))
+        counts[outcome] += 1
+        if pivot is not None:
+            self.pivot_hits[pivot] = self.pivot_hits.get(pivot, 0) + 1
+        self.translated_chars += chars
+
+    def stats(self) -> dict:
+        return {
+            "enabled": CROSS_LANGUAGE_CACHE,
+            "pivots": list(CACHE_PIVOT_LANGUAGES),
+            "threshold": CROSS_LANGUAGE_THRESHOLD,
+            "min_relevance": CROSS_LANGUAGE_MIN_RELEVANCE,
+            "pipelines_avoided": sum(c[TRANSLATED] for c in self.outcomes.values()),
+            "languages": {
+                code: {"name": INDIAN_LANGUAGES.get(code, code), "translatable": code in TRANSLATE_LANGUAGES, **counts}
+                for code, counts in self.outcomes.items()
+            },
+            "pivot_hits": self.pivot_hits,
+            "translated_chars": self.translated_chars,
+            "translate_cost_usd": round(self.translated_chars / 1e6 * TRANSLATE_COST_PER_MILLION, 4),
+        }
@@ -0,0 +1,236 @@
+"""
+Embedding Service - memoized Titan embeddings
+Wraps a single-text embedding function with a bounded in-process LRU and an
+optional Redis second tier, so the same question is only sent to Bedrock
+once no matter how many times it is looked up, saved, or re-asked.
+BatchingEmbeddingClient sits underneath and coalesces concurrent misses.
+"""
+import hashlib
+import queue
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from services.semantic_cache import encode_vector, decode_vector
+
+EMBEDDING_PREFIX = "nyaya:emb:"
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for memo keys: NFKC, case-folded, single spaces."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+class EmbeddingService:
+    """
+    Memoizing front for `embed_fn(text) -> list[float]`.
+    Entries are keyed by a hash of the model ID and the normalized text.
+    """
+
+    def __init__(self, embed_fn, model_id: str, max_entries: int = 4096,
+                 redis_client=None, redis_ttl: int = 60 * 60 * 24 * 7):
+        self.embed_fn = embed_fn
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.redis_ttl = redis_ttl
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.model_id}\0{normalize_text(text)}".encode()).hexdigest()
+        return f"{EMBEDDING_PREFIX}{digest}"
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return the embedding for text, calling Bedrock only on a full miss."""
+        key = self.key(text)
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.l1_hits += 1
+                return vec
+
+        vec = self._l2_get(key)
+        if vec is not None:
+            with self._lock:
+                self.l2_hits += 1
+        else:
+            vec = np.asarray(self.embed_fn(text), dtype=np.float32)
+            with self._lock:
+                self.misses += 1
+            self._l2_set(key, vec)
+
+        self._remember(key, vec)
+        return vec
+
+    def _remember(self, key: str, vec: np.ndarray):
+        with self._lock:
+            self._lru[key] = vec
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _l2_get(self, key: str):
+        if self.redis_client is None:
+            return None
+        try:
+            blob = self.redis_client.get(key)
+            return decode_vector(blob) if blob else None
+        except Exception:
+            return None
+
+    def _l2_set(self, key: str, vec: np.ndarray):
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.set(key, encode_vector(vec), ex=self.redis_ttl)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.l1_hits + self.l2_hits + self.misses
+            return {
+                "model_id":             self.model_id,
+                "l1_entries":           len(self._lru),
+                "l1_hits":              self.l1_hits,
+                "l2_hits":              self.l2_hits,
+                "misses":               self.misses,
+                "bedrock_calls_saved":  self.l1_hits + self.l2_hits,
+                "hit_rate":             round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+class BatchingEmbeddingClient:
+    """
+    Coalesces embedding requests that arrive within `window_ms` of each other.
+
+    Identical texts in a window share one upstream call, a window closes early
+    once it holds `max_batch` distinct texts, and at most `max_in_flight`
+    upstream calls run at once; callers beyond that wait in the queue (and
+    make the next window larger) instead of piling onto Bedrock.
+
+    Titan v2 embeds one text per InvokeModel call, so by default a batch is
+    fanned out as concurrent single-text calls. Pass `batch_fn(texts) -> list`
+    for models that accept several inputs per request.
+    """
+
+    def __init__(self, embed_fn=None, batch_fn=None, window_ms: float = 5.0,
+                 max_batch: int = 16, max_in_flight: int = 8):
+        if embed_fn is None and batch_fn is None:
+            raise ValueError("embed_fn or batch_fn is required")
+        self.embed_fn = embed_fn
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed-batch")
+        self._lock = threading.Lock()
+        self._dispatcher = None
+        self.requests = 0
+        self.batches = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.throttled = 0
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        with self._lock:
+            self.requests += 1
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._dispatcher.start()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: float | None = None) -> list:
+        """Blocking single-text API, drop-in for get_embedding()."""
+        return self.submit(text).result(timeout)
+
+    def _run(self):
+        while True:
+            pending = {}
+            text, future = self._queue.get()
+            pending.setdefault(text, []).append(future)
+            deadline = time.monotonic() + self.window
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    text, future = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.setdefault(text, []).append(future)
+            self._dispatch(pending)
+
+    def _dispatch(self, pending: dict):
+        with self._lock:
+            self.batches += 1
+            self.coalesced += sum(len(f) for f in pending.values()) - len(pending)
+        if self.batch_fn is not None:
+            self._slots.acquire()
+            self._pool.submit(self._call_batch, pending)
+            return
+        for text, futures in pending.items():
+            self._slots.acquire()
+            self._pool.submit(self._call_single, text, futures)
+
+    def _call_single(self, text: str, futures: list):
+        try:
+            self._count_call()
+            self._resolve(futures, result=self.embed_fn(text))
+        except Exception as e:
+            self._fail(futures, e)
+        finally:
+            self._slots.release()
+
+    def _call_batch(self, pending: dict):
+        texts = list(pending)
+        try:
+            self._count_call()
+            for text, vec in zip(texts, self.batch_fn(texts)):
+                self._resolve(pending[text], result=vec)
+        except Exception as e:
+            for text in texts:
+                self._fail(pending[text], e)
+        finally:
+            self._slots.release()
+
+    def _count_call(self):
+        with self._lock:
+            self.upstream_calls += 1
+
+    def _fail(self, futures: list, error: Exception):
+        if "Throttling" in str(error):
+            with self._lock:
+                self.throttled += 1
+        for f in futures:
+            if not f.done():
+                f.set_exception(error)
+
+    @staticmethod
+    def _resolve(futures: list, result):
+        for f in futures:
+            f.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests":         self.requests,
+                "batches":          self.batches,
+                "upstream_calls":   self.upstream_calls,
+                "coalesced":        self.coalesced,
+                "throttled":        self.throttled,
+                "mean_batch_size":  round(self.requests / self.batches, 2) if self.batches else 0.0,
+            }
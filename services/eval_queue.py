@@ -0,0 +1,172 @@
+"""
+Evaluation Queue - RAGAS scoring off the request path
+Finished answers are submitted to a bounded queue and scored by a small pool
+of worker threads, so the SSE stream can close right after `done` and
+evaluation never competes with serving for connections or request workers.
+Each worker takes up to EVAL_BATCH_SIZE queued answers and scores them
+concurrently on its own event loop.
+Only a sampled fraction of answers is scored; when the queue is full new
+jobs are dropped rather than blocking the caller. Scores are kept in a
+rolling window for /api/evaluation/stats and can be appended to a JSONL file.
+stop() (called from the API's lifespan shutdown) lets workers finish their
+current batch and drops the rest; jobs cut short by shutdown - including
+interpreter exit without stop() - are counted as dropped, not failed.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+EVAL_SAMPLE_RATE = float(os.getenv("EVAL_SAMPLE_RATE", "1.0"))    # fraction of answers scored
+EVAL_QUEUE_SIZE  = int(os.getenv("EVAL_QUEUE_SIZE", "1000"))
+EVAL_WORKERS     = int(os.getenv("EVAL_WORKERS", "2"))
+EVAL_BATCH_SIZE  = int(os.getenv("EVAL_BATCH_SIZE", "8"))
+EVAL_RESULTS_PATH = os.getenv("EVAL_RESULTS_PATH", "")             # optional JSONL sink
+
+METRICS = ("faithfulness", "answer_relevance", "context_precision", "overall")
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationQueue:
+    """
+    `async score_fn(job) -> dict` does the actual grading; a worker awaits
+    it for up to `batch_size` queued jobs at once.
+    """
+
+    def __init__(self, score_fn, max_queued: int = EVAL_QUEUE_SIZE, workers: int = EVAL_WORKERS,
+                 batch_size: int = EVAL_BATCH_SIZE, sample_rate: float = EVAL_SAMPLE_RATE,
+                 history: int = 1000, results_path: str = EVAL_RESULTS_PATH):
+        self.score_fn = score_fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.sample_rate = sample_rate
+        self.results_path = results_path
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queued)
+        self._results: deque = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self.submitted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.scored = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, job: dict) -> bool:
+        """Queue a finished answer for scoring. Never blocks; returns False if skipped."""
+        with self._lock:
+            self.submitted += 1
+            if random.random() >= self.sample_rate:
+                self.sampled_out += 1
+                return False
+            if self._stop.is_set():
+                self.dropped += 1
+                return False
+            if not self._threads:
+                self._start()
+        try:
+            self._queue.put_nowait({**job, "submitted_at": time.time()})
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _stopping(self) -> bool:
+        # stop() was called, or the interpreter is exiting (the main thread has finished)
+        return self._stop.is_set() or not threading.main_thread().is_alive()
+
+    def stop(self, timeout: float = 10.0):
+        """Blocking: stop taking batches and wait up to `timeout` seconds for the current ones."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+
+    def _start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"eval-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        while not self._stopping():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                self.batches += 1
+            loop.run_until_complete(self._score_batch(batch))
+        loop.close()
+
+    async def _score_batch(self, batch: list):
+        await asyncio.gather(*(self._score(job) for job in batch))
+
+    async def _score(self, job: dict):
+        try:
+            scores = await self.score_fn(job)
+        except Exception as e:
+            if self._stopping():  # e.g. the blocking pool already shut down: not an evaluation error
+                with self._lock:
+                    self.dropped += 1
+                return
+            with self._lock:
+                self.failed += 1
+            logger.warning("Evaluation error: %s", e)
+            return
+        record = {
+            "question":    job.get("question"),
+            "language":    job.get("language"),
+            "model_used":  job.get("model_used"),
+            **scores,
+            "lag_seconds": round(time.time() - job["submitted_at"], 3),
+        }
+        with self._lock:
+            self.scored += 1
+            self._results.append(record)
+            if self.results_path:
+                try:
+                    with open(self.results_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                except OSError as e:
+                    logger.warning("Evaluation sink error: %s", e)
+
+    def recent(self, limit: int = 50) -> list:
+        with self._lock:
+            return list(self._results)[-limit:]
+
+    def stats(self) -> dict:
+        with self._lock:
+            results = list(self._results)
+            means = {}
+            for metric in METRICS:
+                values = [r[metric] for r in results if isinstance(r.get(metric), (int, float))]
+                if values:
+                    means[metric] = round(sum(values) / len(values), 3)
+            return {
+                "sample_rate": self.sample_rate,
+                "queued":      self._queue.qsize(),
+                "workers":     self.workers,
+                "submitted":   self.submitted,
+                "sampled_out": self.sampled_out,
+                "dropped":     self.dropped,
+                "scored":      self.scored,
+                "failed":      self.failed,
+                "batches":     self.batches,
+                "window":      len(results),
+                "mean":        means,
+            }
@@ -0,0 +1,233 @@
+"""
+Evaluation Engine - RAGAS-style grading for /api/evaluate
+Two modes:
+  single     - one structured-output call returns all three metrics as JSON
+  concurrent - the three per-metric prompts run at the same time
+Either way an evaluation costs one round trip of latency instead of three
+serial ones. Model output goes through parse_score(), which tolerates extra
+text ("Score: 0.8", "8/10", "80%") instead of failing to 0.0.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+
+from services.admission import is_throttling
+from services.async_bridge import run_blocking
+
+EVAL_MODE = os.getenv("EVAL_MODE", "single")   # single | concurrent
+MODES = ("single", "concurrent")
+METRICS = ("faithfulness", "answer_relevance", "context_precision")
+
+_NUMBER = re.compile(r"(\d+(?:\.\d+)?|\.\d+)\s*(?:(%)|/\s*(\d+(?:\.\d+)?))?")
+
+
+def parse_score(text: str, default: float = 0.0) -> float:
+    """First number in the model output, scaled to 0.0 - 1.0 ("N/M" is read as N over M)."""
+    if not text:
+        return default
+    m = _NUMBER.search(text)
+    if not m:
+        return default
+    value = float(m.group(1))
+    percent, denominator = m.group(2), m.group(3)
+    if denominator is not None and float(denominator) > 0:
+        value /= float(denominator)
+    elif percent:
+        value /= 100
+    elif 1 < value <= 10 and "." not in m.group(1):
+        value /= 10
+    elif value > 10:
+        value /= 100
+    return min(max(value, 0.0), 1.0)
+
+
+def parse_scores(text: str) -> dict:
+    """
+    Metrics from a structured reply. Accepts a bare JSON object, JSON wrapped
+    in prose or code fences, or "metric: value" lines; missing metrics are
+    left out so the caller can grade them separately.
+    """
+    scores = {}
+    m = re.search(r"\{.*?\}", text or "", re.DOTALL)
+    if m:
+        try:
+            data = json.loads(m.group(0))
+            for metric in METRICS:
+                if metric in data:
+                    scores[metric] = parse_score(str(data[metric]))
+        except (ValueError, TypeError):
+            pass
+    for metric in METRICS:
+        if metric not in scores:
+            line = re.search(rf"{metric}\W+([^\n,}}]+)", text or "", re.IGNORECASE)
+            if line and _NUMBER.search(line.group(1)):
+                scores[metric] = parse_score(line.group(1))
+    return scores
+
+
+def faithfulness_prompt(question: str, context_block: str, answer: str) -> str:
+    # Is every claim in the answer supported by the retrieved context?
+    return f"""You are a RAGAS evaluator measuring Faithfulness.
+
+Question: {question}
+
+Retrieved Context:
+{context_block}
+
+Answer to evaluate:
+{answer}
+
+Faithfulness measures: Are all claims in the answer supported by the context?
+- 1.0 = every statement is grounded in the context
+- 0.5 = some statements go beyond the context
+- 0.0 = answer contradicts or ignores the context entirely
+
+Respond with ONLY a decimal number between 0.0 and 1.0:"""
+
+
+def relevance_prompt(question: str, context_block: str, answer: str) -> str:
+    # Does the answer actually address what was asked?
+    return f"""You are a RAGAS evaluator measuring Answer Relevance.
+
+Question: {question}
+
+Answer to evaluate:
+{answer}
+
+Answer Relevance measures: Does the answer directly address the question asked?
+- 1.0 = answer fully and directly addresses the question
+- 0.5 = answer is related but incomplete or off-topic in parts
+- 0.0 = answer does not address the question at all
+
+Respond with ONLY a decimal number between 0.0 and 1.0:"""
+
+
+def precision_prompt(question: str, context_block: str, answer: str) -> str:
+    # Were the retrieved chunks actually useful for answering?
+    return f"""You are a RAGAS evaluator measuring Context Precision.
+
+Question: {question}
+
+Retrieved Context:
+{context_block}
+
+Context Precision measures: How relevant and useful were the retrieved documents for answering this question?
+- 1.0 = all retrieved chunks are highly relevant to the question
+- 0.5 = some chunks are relevant, others are noise
+- 0.0 = retrieved chunks are completely irrelevant to the question
+
+Respond with ONLY a decimal number between 0.0 and 1.0:"""
+
+
+def combined_prompt(question: str, context_block: str, answer: str) -> str:
+    return f"""You are a RAGAS evaluator. Score the answer on three metrics.
+
+Question: {question}
+
+Retrieved Context:
+{context_block}
+
+Answer to evaluate:
+{answer}
+
+faithfulness: Are all claims in the answer supported by the context?
+  1.0 = every statement is grounded, 0.5 = some statements go beyond the context, 0.0 = contradicts or ignores it
+answer_relevance: Does the answer directly address the question asked?
+  1.0 = fully and directly, 0.5 = related but incomplete, 0.0 = does not address it
+context_precision: How relevant and useful were the retrieved documents for this question?
+  1.0 = all chunks highly relevant, 0.5 = some relevant, some noise, 0.0 = completely irrelevant
+
+Respond with ONLY a JSON object, no other text:
+{{"faithfulness": 0.0, "answer_relevance": 0.0, "context_precision": 0.0}}"""
+
+
+PROMPTS = {
+    "faithfulness":      faithfulness_prompt,
+    "answer_relevance":  relevance_prompt,
+    "context_precision": precision_prompt,
+}
+
+
+def verdict_for(overall: float) -> str:
+    if overall >= 0.8:
+        return "✅ Excellent — highly accurate and grounded"
+    elif overall >= 0.6:
+        return "⚠️ Good — minor gaps in grounding or relevance"
+    return "❌ Poor — answer may be hallucinated or off-topic"
+
+
+class EvaluationEngine:
+    """
+    `complete(prompt, max_tokens) -> str` sends one prompt to the grading
+    model; it is blocking and runs on the async bridge's thread pool.
+
+    Throttled calls are retried up to `retries` times with jittered
+    exponential backoff. By default a metric whose call still fails scores
+    0.0; with `strict=True` the error is raised instead, so batch runs can
+    tell a failed row from a bad answer.
+    """
+
+    def __init__(self, complete, mode: str = EVAL_MODE, retries: int = 0,
+                 backoff: float = 0.5, strict: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.complete = complete
+        self.mode = mode
+        self.retries = retries
+        self.backoff = backoff
+        self.strict = strict
+        self.throttled = 0
+
+    async def _call(self, prompt: str, max_tokens: int) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                return await run_blocking(self.complete, prompt, max_tokens, timeout="grade")
+            except Exception as e:
+                if not is_throttling(e):
+                    raise
+                self.throttled += 1
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def _grade(self, metric: str, question: str, context_block: str, answer: str) -> float:
+        try:
+            prompt = PROMPTS[metric](question, context_block, answer)
+            return parse_score(await self._call(prompt, 10))
+        except Exception:
+            if self.strict:
+                raise
+            return 0.0
+
+    async def _grade_each(self, metrics, question: str, context_block: str, answer: str) -> dict:
+        values = await asyncio.gather(*(self._grade(m, question, context_block, answer) for m in metrics))
+        return dict(zip(metrics, values))
+
+    async def evaluate(self, question: str, answer: str, contexts: list, mode: str | None = None) -> dict:
+        """Scores for all METRICS plus overall and verdict."""
+        mode = mode or self.mode
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        context_block = "\n---\n".join(contexts[:5])
+
+        scores = {}
+        if mode == "single":
+            try:
+                scores = parse_scores(await self._call(combined_prompt(question, context_block, answer), 60))
+            except Exception:
+                if self.strict:
+                    raise
+                scores = {}
+        missing = [m for m in METRICS if m not in scores]
+        if missing:
+            # concurrent mode, or a structured reply that left metrics out
+            scores.update(await self._grade_each(missing, question, context_block, answer))
+
+        overall = round(sum(scores[m] for m in METRICS) / len(METRICS), 3)
+        return {
+            **{m: round(scores[m], 3) for m in METRICS},
+            "overall": overall,
+            "verdict": verdict_for(overall),
+        }
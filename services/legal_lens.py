@@ -1,8 +1,10 @@
-import boto3
 import json
 import base64
 
-bedrock = boto3.client(service_name='bedrock-runtime', region_name='us-east-1')
+from services.aws_clients import LazyClient
+from services.model_failover import model_failover, VISION_HEDGING
+
+bedrock = LazyClient('bedrock-runtime')
 
 MODEL_ID          = "amazon.nova-lite-v1:0"
 FALLBACK_MODEL_ID = "amazon.nova-pro-v1:0"  # fallback — also supports vision
@@ -73,16 +75,11 @@ If the document is not clearly visible or readable, say so clearly in {language_
         "inferenceConfig": {"max_new_tokens": 1024, "temperature": 0.3}
     }
 
-    output_text = None
-    used_model = MODEL_ID
-    for model_id in [MODEL_ID, FALLBACK_MODEL_ID]:
-        try:
-            output_text = _invoke(model_id, body)
-            used_model = model_id
-            break
-        except Exception:
-            if model_id == FALLBACK_MODEL_ID:
-                raise
+    # Skips an unhealthy primary; hedges slow calls to the fallback only with VISION_HEDGING
+    output_text, used_model = model_failover.call(
+        [MODEL_ID, FALLBACK_MODEL_ID], lambda model_id: _invoke(model_id, body), op="legal_lens",
+        hedge=VISION_HEDGING
+    )
 
     return {
         "language": language_name,
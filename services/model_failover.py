@@ -0,0 +1,264 @@
+"""
+Model Failover - circuit breakers and hedged requests for Bedrock models
+Every generation call site used to try the primary model and fall back only
+after it raised, so during a provider brownout each request first sat
+through the primary's full timeout. Calls now go through ModelFailover:
+
+  - per-model health (error rate over a rolling window, consecutive errors)
+    opens a circuit that skips an unhealthy model for `cooldown` seconds,
+    then lets a single probe request through (half-open)
+  - per-model, per-operation latency; once the primary has enough samples,
+    a hedged request goes to the fallback if the primary is slower than its
+    recent `hedge_percentile` latency, and the first success wins; vision
+    calls are not hedged unless VISION_HEDGING is set, since a hedge sends
+    the whole image payload twice
+
+Breaker state is reported by stats() at /api/models/health.
+"""
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from services.admission import Overloaded
+
+BREAKER_WINDOW        = int(os.getenv("BREAKER_WINDOW", "50"))            # recent calls per model
+BREAKER_MIN_CALLS     = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE    = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))     # open at/above this rate
+BREAKER_CONSECUTIVE   = int(os.getenv("BREAKER_CONSECUTIVE", "5"))        # ...or this many errors in a row
+BREAKER_COOLDOWN      = float(os.getenv("BREAKER_COOLDOWN", "30"))        # seconds before a probe
+MODEL_HEDGING         = os.getenv("MODEL_HEDGING", "1") == "1"
+HEDGE_PERCENTILE      = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES     = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_POOL_SIZE       = int(os.getenv("HEDGE_POOL_SIZE", "32"))
+VISION_HEDGING        = os.getenv("VISION_HEDGING", "0") == "1"          # Legal Lens / Officer Mode
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Errors caused by the request itself, not by the model being unhealthy
+CALLER_ERRORS = ("ValidationException", "AccessDeniedException", "ResourceNotFoundException")
+
+
+def _error_code(error: Exception) -> str:
+    return getattr(error, "response", {}).get("Error", {}).get("Code", "")
+
+
+class _ModelHealth:
+    def __init__(self, window: int):
+        self.outcomes: deque = deque(maxlen=window)   # True = success
+        self.latencies: dict[str, deque] = {}         # op -> recent successful latencies
+        self.state = CLOSED
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+        self.opened = 0
+        self.calls = 0
+        self.errors = 0
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ModelFailover:
+    def __init__(self, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, consecutive: int = BREAKER_CONSECUTIVE,
+                 cooldown: float = BREAKER_COOLDOWN, hedging: bool = MODEL_HEDGING,
+                 hedge_percentile: float = HEDGE_PERCENTILE, hedge_min_samples: int = HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.consecutive = consecutive
+        self.cooldown = cooldown
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._models: dict[str, _ModelHealth] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+        self.skipped = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _health(self, model_id: str) -> _ModelHealth:
+        health = self._models.get(model_id)
+        if health is None:
+            health = self._models.setdefault(model_id, _ModelHealth(self.window))
+        return health
+
+    # --- breaker ---------------------------------------------------------
+
+    def allow(self, model_id: str) -> bool:
+        """Whether a call to model_id may go out now. Half-open admits one probe per cooldown."""
+        now = time.monotonic()
+        with self._lock:
+            h = self._health(model_id)
+            if h.state == CLOSED:
+                return True
+            if h.state == OPEN and now - h.opened_at < self.cooldown:
+                return False
+            if h.state == HALF_OPEN and now - h.probe_at < self.cooldown:
+                return False  # a probe is already out
+            h.state, h.probe_at = HALF_OPEN, now
+            return True
+
+    def release(self, model_id: str):
+        """
+        Give back a half-open probe slot that ended without a verdict (caller
+        error, Overloaded, cancellation, or a candidate never tried), so the
+        next call can probe instead of waiting out another cooldown.
+        No-op once the probe has closed or reopened the circuit.
+        """
+        with self._lock:
+            h = self._health(model_id)
+            if h.state == HALF_OPEN:
+                h.probe_at = 0.0
+
+    def order(self, models: list) -> list:
+        """Candidate models in preference order with open circuits skipped (all of them if none is healthy)."""
+        allowed = [m for m in models if self.allow(m)]
+        if len(allowed) < len(models):
+            with self._lock:
+                self.skipped += 1
+        return allowed or list(models)
+
+    def record(self, model_id: str, latency: float, op: str = "default", error: Exception | None = None):
+        with self._lock:
+            h = self._health(model_id)
+            if error is not None and (_error_code(error) in CALLER_ERRORS or isinstance(error, Overloaded)):
+                if h.state == HALF_OPEN:
+                    h.probe_at = 0.0  # not the model's fault: no verdict, free the probe
+                return
+            h.calls += 1
+            ok = error is None
+            h.outcomes.append(ok)
+            if ok:
+                h.consecutive = 0
+                h.latencies.setdefault(op, deque(maxlen=self.window)).append(latency)
+                if h.state == HALF_OPEN:
+                    h.state = CLOSED
+                    h.outcomes.clear()
+                return
+            h.errors += 1
+            h.consecutive += 1
+            tripped = (h.consecutive >= self.consecutive or
+                       (len(h.outcomes) >= self.min_calls and h.error_rate() >= self.error_rate))
+            if h.state == HALF_OPEN or (h.state == CLOSED and tripped):
+                h.state, h.opened_at = OPEN, time.monotonic()
+                h.opened += 1
+
+    # --- invocation --------------------------------------------------------
+
+    def hedge_delay(self, model_id: str, op: str) -> float | None:
+        with self._lock:
+            samples = self._health(model_id).latencies.get(op)
+            if not self.hedging or samples is None or len(samples) < self.hedge_min_samples:
+                return None
+            ordered = sorted(samples)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile))]
+
+    def _timed(self, model_id: str, fn, op: str):
+        started = time.perf_counter()
+        try:
+            result = fn(model_id)
+        except Exception as e:
+            self.record(model_id, time.perf_counter() - started, op, error=e)
+            raise
+        self.record(model_id, time.perf_counter() - started, op)
+        return result
+
+    def _submit(self, model_id: str, fn, op: str) -> concurrent.futures.Future:
+        call = functools.partial(contextvars.copy_context().run, self._timed, model_id, fn, op)
+        return self._pool.submit(call)
+
+    def call(self, models: list, fn, op: str = "default", hedge: bool = True) -> tuple:
+        """
+        Blocking: return (fn(model_id), model_id) for the first model that
+        succeeds. `fn(model_id)` performs one model call. Models are tried in
+        order with unhealthy ones skipped; with `hedge`, the primary may be hedged.
+        """
+        candidates = self.order(models)
+        try:
+            delay = self.hedge_delay(candidates[0], op) if hedge and len(candidates) > 1 else None
+            if delay is not None:
+                return self._hedged(candidates, fn, op, delay)
+            last_error = None
+            for model_id in candidates:
+                try:
+                    return self._timed(model_id, fn, op), model_id
+                except Overloaded:
+                    raise  # the fallback shares the same capacity
+                except Exception as e:
+                    last_error = e
+            raise last_error
+        finally:
+            for model_id in candidates:
+                self.release(model_id)
+
+    def _hedged(self, candidates: list, fn, op: str, delay: float) -> tuple:
+        primary, backup = candidates[0], candidates[1]
+        futures = {self._submit(primary, fn, op): primary}
+        done, _ = concurrent.futures.wait(futures, timeout=delay)
+        if not done:
+            with self._lock:
+                self.hedges += 1
+            futures[self._submit(backup, fn, op)] = backup
+        last_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    model_id = futures[future]
+                    if model_id == backup and len(futures) > 1:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result(), model_id
+                last_error = future.exception()
+            if not pending and len(futures) == 1:
+                if isinstance(last_error, Overloaded):
+                    raise last_error  # the fallback shares the same capacity
+                # primary failed before the hedge went out: plain failover
+                for model_id in candidates[1:]:
+                    try:
+                        return self._timed(model_id, fn, op), model_id
+                    except Overloaded:
+                        raise
+                    except Exception as e:
+                        last_error = e
+        raise last_error
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = {}
+            for model_id, h in self._models.items():
+                latency = {}
+                for op, samples in h.latencies.items():
+                    ordered = sorted(samples)
+                    latency[op] = {
+                        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                    }
+                models[model_id] = {
+                    "state":       h.state,
+                    "calls":       h.calls,
+                    "errors":      h.errors,
+                    "error_rate":  round(h.error_rate(), 3),
+                    "consecutive_errors": h.consecutive,
+                    "times_opened": h.opened,
+                    "latency":     latency,
+                }
+            return {
+                "hedging": self.hedging,
+                "skipped_unhealthy": self.skipped,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "models": models,
+            }
+
+
+# Shared by app.py and the services so health is tracked per model, process-wide
+model_failover = ModelFailover()
@@ -1,9 +1,11 @@
-import boto3
 import json
 import base64
 
-bedrock = boto3.client(service_name='bedrock-runtime', region_name='us-east-1')
-translate_client = boto3.client('translate', region_name='us-east-1')
+from services.aws_clients import LazyClient
+from services.model_failover import model_failover, VISION_HEDGING
+
+bedrock = LazyClient('bedrock-runtime')
+translate_client = LazyClient('translate')
 
 MODEL_ID          = "amazon.nova-lite-v1:0"
 FALLBACK_MODEL_ID = "amazon.nova-pro-v1:0"  # fallback — also supports vision
@@ -119,16 +121,11 @@ Important rules:
         "inferenceConfig": {"max_new_tokens": 2048, "temperature": 0.2}
     }
 
-    full_output = None
-    used_model = MODEL_ID
-    for model_id in [MODEL_ID, FALLBACK_MODEL_ID]:
-        try:
-            full_output = _invoke(model_id, body)
-            used_model = model_id
-            break
-        except Exception:
-            if model_id == FALLBACK_MODEL_ID:
-                raise
+    # Skips an unhealthy primary; hedges slow calls to the fallback only with VISION_HEDGING
+    full_output, used_model = model_failover.call(
+        [MODEL_ID, FALLBACK_MODEL_ID], lambda model_id: _invoke(model_id, body), op="officer_mode",
+        hedge=VISION_HEDGING
+    )
 
     transcription = ""
     formal_document = ""
@@ -0,0 +1,108 @@
+"""
+Staged Pipeline - run independent request stages concurrently
+A request-scoped helper for the Self-RAG flow: each stage is an awaitable
+started as its own task, so stages that only depend on the question can
+overlap; speculative stages can be cancelled once they are known to be
+unnecessary. Start/finish times are recorded per stage and aggregated in
+PipelineMetrics for /api/pipeline/stats.
+With sequential=True every stage waits for the previously started one to
+finish, reproducing the one-after-another flow for before/after benchmarks.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class StagedPipeline:
+    def __init__(self, sequential: bool = False):
+        self.t0 = time.perf_counter()
+        self.sequential = sequential
+        self._last: asyncio.Task | None = None
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.timings: dict[str, dict] = {}
+        self.marks: dict[str, float] = {}
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+    async def _timed(self, name: str, awaitable):
+        start = self._now_ms()
+        self.timings[name] = {"start_ms": round(start, 1)}
+        try:
+            return await awaitable
+        finally:
+            end = self._now_ms()
+            self.timings[name].update(end_ms=round(end, 1), ms=round(end - start, 1))
+
+    async def _after(self, previous: asyncio.Task, name: str, awaitable):
+        await asyncio.wait({previous})
+        return await self._timed(name, awaitable)
+
+    def start(self, name: str, awaitable) -> asyncio.Task:
+        """Begin a stage in the background; fetch its value with result()."""
+        if self.sequential and self._last is not None:
+            task = asyncio.ensure_future(self._after(self._last, name, awaitable))
+        else:
+            task = asyncio.ensure_future(self._timed(name, awaitable))
+        self._last = task
+        # Speculative stages may never be awaited; consume their errors here
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._tasks[name] = task
+        return task
+
+    def started(self, name: str) -> bool:
+        return name in self._tasks
+
+    async def result(self, name: str):
+        return await self._tasks[name]
+
+    async def run(self, name: str, awaitable):
+        """Start a stage and wait for it (a stage on the critical path)."""
+        return await self.start(name, awaitable)
+
+    def cancel(self, name: str):
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            task.cancel()
+            self.timings.setdefault(name, {})["cancelled"] = True
+
+    def cancel_all(self):
+        for name in list(self._tasks):
+            self.cancel(name)
+
+    def mark(self, name: str):
+        """Record a milestone (e.g. first_token) relative to pipeline start."""
+        self.marks[name] = round(self._now_ms(), 1)
+
+    def report(self) -> dict:
+        return {"stages": self.timings, "marks": self.marks}
+
+
+class PipelineMetrics:
+    """Rolling per-stage durations and milestones across recent requests."""
+
+    def __init__(self, window: int = 500):
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.window = window
+
+    def record(self, pipeline: StagedPipeline):
+        with self._lock:
+            for name, t in pipeline.timings.items():
+                if "ms" in t and not t.get("cancelled"):
+                    self._samples.setdefault(name, deque(maxlen=self.window)).append(t["ms"])
+            for name, ms in pipeline.marks.items():
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(ms)
+
+    def summary(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, values in self._samples.items():
+                ordered = sorted(values)
+                out[name] = {
+                    "count": len(ordered),
+                    "p50_ms": ordered[len(ordered) // 2],
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                }
+            return out
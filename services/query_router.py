@@ -0,0 +1,110 @@
+"""
+Query Router - local SIMPLE / COMPLEX classification of legal questions
+A keyword and feature based logistic scorer that runs in microseconds, so
+most questions are routed without the Nova Lite call route_query used to
+make. Low-confidence questions still go to the LLM router; every decision
+(local or LLM) is memoized by normalized question text.
+"""
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from services.embeddings import normalize_text
+
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.5"))  # |2p-1| needed to skip the LLM
+ROUTER_MEMO_SIZE      = int(os.getenv("ROUTER_MEMO_SIZE", "10000"))
+
+SIMPLE, COMPLEX = "SIMPLE", "COMPLEX"
+
+# (pattern, weight) — positive pushes towards COMPLEX, negative towards SIMPLE
+FEATURES = [
+    # definition / lookup phrasing
+    (r"^(what is|what's|what are|what does|who is|define|meaning of|full form)\b", -1.6),
+    (r"\b(stand for|mean|meaning|definition|full form)\b", -0.8),
+    (r"^(how many|how much|how long|when (was|is|did)|which (article|section|act))\b", -1.2),
+    (r"(क्या है|क्या होता है|मतलब|अर्थ)", -1.4),
+    # comparison, strategy, multi-step reasoning
+    (r"\b(compare|comparison|versus|vs\.?|difference between|differ)\b", 2.4),
+    (r"\b(step by step|steps|strategy|options|remedies|what should i do|what can i do|how (do|can|should) i)\b", 1.6),
+    (r"\b(fight|challenge|appeal|sue|file a case|legal action|recourse)\b", 1.2),
+    (r"\b(process|procedure|how to)\b", 1.0),
+    (r"\b(refuse[sd]?|denied|harass\w*|wrongful\w*|illegal\w*|threaten\w*|cheated|evict\w*|fired|terminated)\b", 1.0),
+    (r"\b(my|me|i am|i was|i have|our)\b", 0.7),
+    (r"\b(if|when|after|despite|even though|unless)\b.*\b(can|will|should|would|do)\b", 0.8),
+    (r"\b(and|or)\b.*\b(act|ipc|bns|crpc|article|section)\b", 0.6),
+    (r"(तुलना|अंतर|क्या करूँ|क्या करें|कैसे लड़ें|मेरे|मुझे)", 1.4),
+]
+_COMPILED = [(re.compile(p, re.IGNORECASE), w) for p, w in FEATURES]
+_LAW_REF = re.compile(r"\b(ipc|bns|bnss|crpc|cpc|pocso|rti|article \d+|section \d+|\w+ act)\b", re.IGNORECASE)
+BIAS = -0.6
+
+
+class LocalQueryRouter:
+    def __init__(self, min_confidence: float = ROUTER_MIN_CONFIDENCE, memo_size: int = ROUTER_MEMO_SIZE):
+        self.min_confidence = min_confidence
+        self.memo_size = memo_size
+        self._memo: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"memo": 0, "local": 0, "llm": 0, "llm_failed": 0}
+
+    @staticmethod
+    def score(question: str) -> float:
+        """Probability that the question is COMPLEX."""
+        q = question.strip()
+        z = BIAS
+        for pattern, weight in _COMPILED:
+            if pattern.search(q):
+                z += weight
+        words = len(q.split())
+        z += 0.05 * max(0, words - 12)            # long, scenario-style questions
+        z -= 0.6 if words <= 6 else 0.0           # very short lookups
+        z += 0.9 * max(0, len(set(m.lower() for m in _LAW_REF.findall(q))) - 1)  # several laws involved
+        z += 0.7 * max(0, q.count("?") - 1)       # several questions at once
+        return 1 / (1 + math.exp(-z))
+
+    def classify(self, question: str) -> tuple:
+        """(label, confidence) from the local model only; confidence is |2p - 1|."""
+        p = self.score(question)
+        return (COMPLEX if p >= 0.5 else SIMPLE), abs(2 * p - 1)
+
+    def route(self, question: str, llm_fallback=None) -> tuple:
+        """
+        Return (label, source) where source is 'memo', 'local', 'llm' or
+        'llm_failed'. `llm_fallback(question) -> label` is only called when the
+        local classifier is less confident than min_confidence; if it raises,
+        the local guess is returned but not memoized, so the next ask retries.
+        """
+        key = normalize_text(question)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.counts["memo"] += 1
+                return self._memo[key], "memo"
+
+        label, confidence = self.classify(question)
+        source = "local"
+        if confidence < self.min_confidence and llm_fallback is not None:
+            try:
+                label, source = llm_fallback(question), "llm"
+            except Exception:
+                with self._lock:
+                    self.counts["llm_failed"] += 1
+                return label, "llm_failed"
+
+        with self._lock:
+            self.counts[source] += 1
+            self._memo[key] = label
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return label, source
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                "min_confidence": self.min_confidence,
+                **self.counts,
+                "llm_calls_avoided": round(1 - (self.counts["llm"] + self.counts["llm_failed"]) / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,83 @@
+"""
+Relevance Gate - decide Self-RAG relevance without a model call when possible
+bedrock_agent_runtime.retrieve already returns a similarity score per
+passage. When the best score is clearly high or clearly low, that decides
+relevance directly; only the uncertain middle band is sent to the LLM grader
+(score_relevance). An optional lexical-overlap signal between the question
+and the passages can be blended in for English queries.
+"""
+import os
+import re
+import threading
+
+RELEVANCE_GATE_HIGH   = float(os.getenv("RELEVANCE_GATE_HIGH", "0.60"))  # KB score at/above -> relevant
+RELEVANCE_GATE_LOW    = float(os.getenv("RELEVANCE_GATE_LOW", "0.35"))   # KB score at/below -> not relevant
+RELEVANCE_LEXICAL_WEIGHT = float(os.getenv("RELEVANCE_LEXICAL_WEIGHT", "0"))  # 0 = KB score only
+
+STOPWORDS = {
+    "the", "and", "for", "are", "what", "which", "who", "whom", "how", "can", "does", "did", "was",
+    "were", "will", "with", "this", "that", "there", "from", "have", "has", "into", "about", "under",
+    "any", "not", "your", "you", "my", "our", "his", "her", "their", "when", "where", "why", "should",
+    "would", "could", "is", "of", "to", "in", "on", "a", "an", "or", "me", "i", "if", "be", "do",
+}
+
+
+def lexical_overlap(question: str, passages: list) -> float:
+    """Fraction of the question's content words found in the passages (0-1)."""
+    words = {w for w in re.findall(r"[a-z0-9]+", question.lower()) if w not in STOPWORDS and len(w) > 2}
+    if not words:
+        return 0.0
+    text = " ".join(passages).lower()
+    return sum(1 for w in words if w in text) / len(words)
+
+
+class RelevanceGate:
+    """
+    decide() returns (score, reason). score is None when the KB signal is
+    inconclusive and the LLM grader should be asked. Conclusive scores are
+    mapped onto the grader's scale: the high band to 0.75-1.0, the low band
+    to 0.0-0.35, so the existing < 0.5 re-query rule keeps working.
+    """
+
+    def __init__(self, high: float = RELEVANCE_GATE_HIGH, low: float = RELEVANCE_GATE_LOW,
+                 lexical_weight: float = RELEVANCE_LEXICAL_WEIGHT):
+        self.high = high
+        self.low = low
+        self.lexical_weight = lexical_weight
+        self._lock = threading.Lock()
+        self.counts = {"kb_high": 0, "kb_low": 0, "llm": 0}
+
+    def signal(self, question: str, citations: list) -> float | None:
+        scores = [c["score"] for c in citations if c.get("score") is not None]
+        if not scores:
+            return None
+        kb = max(scores)
+        # Lexical overlap only means something when question and KB share a script
+        if self.lexical_weight and question.isascii():
+            lex = lexical_overlap(question, [c["text"] for c in citations[:3]])
+            return (1 - self.lexical_weight) * kb + self.lexical_weight * lex
+        return kb
+
+    def decide(self, question: str, citations: list) -> tuple:
+        s = self.signal(question, citations)
+        if s is None or self.low < s < self.high:
+            decision = (None, "llm")
+        elif s >= self.high:
+            span = max(1e-6, 1 - self.high)
+            decision = (round(0.75 + 0.25 * min(1.0, (s - self.high) / span), 3), "kb_high")
+        else:
+            decision = (round(0.35 * max(0.0, s) / max(1e-6, self.low), 3), "kb_low")
+        with self._lock:
+            self.counts[decision[1]] += 1
+        return decision
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                "high": self.high,
+                "low": self.low,
+                "lexical_weight": self.lexical_weight,
+                **self.counts,
+                "llm_calls_avoided": round(1 - self.counts["llm"] / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,98 @@
+"""
+Retrieval Cache - memoized Knowledge Base retrieve() results
+The same questions ("what is RTI", "IPC 420") reach the Knowledge Base over
+and over. Results are cached in-process by normalized query text, KB ID and
+numberOfResults, with a TTL and LRU eviction. Call invalidate() after a KB
+re-sync so no stale passages are served.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.embeddings import normalize_text
+
+RETRIEVAL_CACHE_TTL  = int(os.getenv("RETRIEVAL_CACHE_TTL", str(60 * 60)))  # 1 hour
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+
+
+class RetrievalCache:
+    def __init__(self, ttl: int = RETRIEVAL_CACHE_TTL, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query: str, kb_id: str, number_of_results: int) -> tuple:
+        return normalize_text(query), kb_id, number_of_results
+
+    def get(self, query: str, kb_id: str, number_of_results: int = 5):
+        key = self.key(query, kb_id, number_of_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, kb_id: str, number_of_results: int, response: dict):
+        key = self.key(query, kb_id, number_of_results)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def retrieve(self, client, query: str, kb_id: str, number_of_results: int = 5) -> dict:
+        """Cached drop-in for client.retrieve(...) on bedrock-agent-runtime."""
+        response = self.get(query, kb_id, number_of_results)
+        if response is None:
+            response = client.retrieve(
+                retrievalQuery={'text': query},
+                knowledgeBaseId=kb_id,
+                retrievalConfiguration={'vectorSearchConfiguration': {'numberOfResults': number_of_results}}
+            )
+            response = {"retrievalResults": response.get("retrievalResults", [])}
+            self.put(query, kb_id, number_of_results, response)
+        return response
+
+    def invalidate(self, kb_id: str | None = None) -> int:
+        """Drop every entry, or only those for one Knowledge Base. Returns the count removed."""
+        with self._lock:
+            if kb_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [k for k in self._entries if k[1] == kb_id]
+                for k in stale:
+                    del self._entries[k]
+                removed = len(stale)
+            self.invalidations += 1
+            return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries":       len(self._entries),
+                "ttl_seconds":   self.ttl,
+                "hits":          self.hits,
+                "misses":        self.misses,
+                "hit_rate":      round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions":     self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared by app.py and RightsChatbotService
+retrieval_cache = RetrievalCache()
@@ -1,22 +1,19 @@
-import boto3
 import os
 from dotenv import load_dotenv
 
+from services.async_bridge import run_blocking
+from services.aws_clients import LazyClient
+from services.retrieval_cache import retrieval_cache
+
 load_dotenv()
 
 class RightsChatbotService:
     def __init__(self):
         # AWS Bedrock - Knowledge Base Retrieval
-        self.bedrock_agent_runtime = boto3.client(
-            service_name='bedrock-agent-runtime',
-            region_name=os.getenv("AWS_REGION", "us-east-1")
-        )
+        self.bedrock_agent_runtime = LazyClient('bedrock-agent-runtime')
 
         # AWS Bedrock - Text Generation (Amazon Nova)
-        self.bedrock_runtime = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=os.getenv("AWS_REGION", "us-east-1")
-        )
+        self.bedrock_runtime = LazyClient('bedrock-runtime')
 
         # Amazon Nova Lite - no Marketplace subscription needed
         self.model_id = "amazon.nova-lite-v1:0"
@@ -25,12 +22,9 @@ class RightsChatbotService:
     async def answer_legal_query(self, question: str):
         try:
             # STEP 1: RETRIEVE from AWS Knowledge Base
-            kb_response = self.bedrock_agent_runtime.retrieve(
-                retrievalQuery={'text': question},
-                knowledgeBaseId=self.kb_id,
-                retrievalConfiguration={
-                    'vectorSearchConfiguration': {'numberOfResults': 5}
-                }
+            kb_response = await run_blocking(
+                retrieval_cache.retrieve, self.bedrock_agent_runtime, question, self.kb_id, 5,
+                timeout="retrieve"
             )
 
             # STEP 2: Process Context & Citations
@@ -56,14 +50,16 @@ Context:
 User Question: {question}
 """
 
-            nova_response = self.bedrock_runtime.converse(
+            nova_response = await run_blocking(
+                self.bedrock_runtime.converse,
                 modelId=self.model_id,
                 messages=[
                     {
                         "role": "user",
                         "content": [{"text": prompt}]
                     }
-                ]
+                ],
+                timeout="generate"
             )
 
             answer = nova_response["output"]["message"]["content"][0]["text"]
@@ -0,0 +1,364 @@
+"""
+Semantic Cache Index - in-process vector search over cached questions
+Keeps the embeddings of every cached question in memory as pre-normalized
+float32 matrices, one set per language, so a cache probe is a handful of
+matrix-vector products instead of one Redis round trip per cached entry.
+
+Small languages are searched exactly over a single contiguous matrix. Once a
+language grows past IVF_MIN_ENTRIES it switches to an inverted-file layout
+(spherical k-means cells, each its own contiguous matrix) and a probe only
+scans the IVF_PROBES closest cells, which keeps lookup cost roughly flat as
+the cache grows.
+
+Cache entries are Redis hashes. The embedding is stored as a raw
+little-endian float32 blob in the `vec` field and read back with
+np.frombuffer; answer and citations live in their own fields so building or
+probing the index never transfers or parses them. Answers saved from a
+stream also carry their chunk frames pre-rendered by services/sse.py,
+zlib-compressed in `sse`, with the frame boundaries and timings in
+`sse_marks`.
+"""
+import json
+import threading
+import zlib
+import numpy as np
+
+IVF_MIN_ENTRIES = 20_000   # below this, exact search over one matrix is fastest
+IVF_PROBES      = 16       # cells scanned per lookup once IVF is active
+KMEANS_ITERS    = 8
+KMEANS_SAMPLE   = 32_768   # vectors sampled to train the cell centroids
+ASSIGN_CHUNK    = 8_192    # rows per matmul when assigning vectors to cells
+
+VECTOR_FIELD    = b"vec"         # float32 little-endian blob
+LEGACY_FIELD    = b"embedding"   # pre-binary format: JSON list of floats
+ENTRY_FIELDS    = (b"answer", b"citations", b"relevance_score", b"model_used", b"sse", b"sse_marks")
+META_FIELDS     = (b"size", b"hits", b"question")   # bookkeeping for services/cache_manager.py
+SCAN_BATCH      = 500            # keys per pipelined HMGET round trip
+
+
+def normalize(vec) -> np.ndarray:
+    """Return vec as a unit-length float32 array (cosine == dot product)."""
+    v = np.asarray(vec, dtype=np.float32).ravel()
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+def encode_vector(vec) -> bytes:
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+
+def decode_vector(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f4")
+
+
+def entry_size(fields: dict) -> int:
+    """Bytes of an entry's stored fields, as counted against the cache budget (size and hits excluded)."""
+    return sum(len(v.encode() if isinstance(v, str) else v) for k, v in fields.items()
+               if k not in ("size", "hits", b"size", b"hits"))
+
+
+def encode_entry(question: str, language: str, answer: str, citations: list,
+                 relevance_score: float, model_used: str, embedding, rendered: tuple | None = None) -> dict:
+    """Redis hash mapping for one cached answer; `rendered` is (payload, marks) from sse.prerender()."""
+    entry = {
+        "question":        question,
+        "language":        language,
+        "answer":          answer,
+        "citations":       json.dumps(citations),
+        "relevance_score": str(relevance_score),
+        "model_used":      model_used,
+        "vec":             encode_vector(embedding),
+    }
+    if rendered is not None:
+        payload, marks = rendered
+        entry["sse"] = zlib.compress(payload)
+        entry["sse_marks"] = json.dumps(marks)
+    entry["size"] = str(entry_size(entry))   # for the cache budget
+    return entry
+
+
+def cached_entry(answer: str, citations: list, relevance_score: float, model_used: str,
+                 rendered: tuple | None = None) -> dict:
+    """An entry in the decoded form decode_entry() returns, built without a Redis round trip."""
+    return {
+        "answer":          answer,
+        "citations":       citations,
+        "relevance_score": float(relevance_score),
+        "model_used":      model_used,
+        "sse":             rendered[0] if rendered else None,
+        "sse_marks":       rendered[1] if rendered else None,
+    }
+
+
+def decode_entry(values: list) -> dict | None:
+    """Decode the HMGET reply for ENTRY_FIELDS; None if the key has expired."""
+    answer, citations, relevance_score, model_used, sse, sse_marks = values
+    if answer is None:
+        return None
+    return {
+        "answer":          answer.decode(),
+        "citations":       json.loads(citations) if citations else [],
+        "relevance_score": float(relevance_score or 0.8),
+        "model_used":      model_used.decode() if model_used else "cached",
+        "sse":             zlib.decompress(sse) if sse else None,
+        "sse_marks":       json.loads(sse_marks) if sse_marks else None,
+    }
+
+
+async def scan_vectors(redis_client, prefix: str):
+    """
+    Yield (key, language, vector, meta) for every cached entry, reading only
+    the language, embedding and bookkeeping fields in pipelined batches of
+    SCAN_BATCH keys; meta holds the entry's size, hit count and question.
+    Entries still in the legacy JSON format are decoded too. `redis_client`
+    is a redis.asyncio client.
+    """
+    batch = []
+
+    async def fetch() -> list:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in batch:
+            pipe.hmget(key, b"language", VECTOR_FIELD, LEGACY_FIELD, *META_FIELDS)
+        rows = []
+        for key, (language, blob, legacy, size, hits, question) in zip(batch, await pipe.execute()):
+            if language is None:
+                continue
+            meta = {"size": int(size or 0), "hits": int(hits or 0), "question": question.decode() if question else ""}
+            if blob is not None:
+                rows.append((key.decode(), language.decode(), decode_vector(blob), meta))
+            elif legacy is not None:
+                rows.append((key.decode(), language.decode(), np.asarray(json.loads(legacy), dtype=np.float32), meta))
+        batch.clear()
+        return rows
+
+    async for key in redis_client.scan_iter(match=f"{prefix}*", count=1000):
+        batch.append(key)
+        if len(batch) >= SCAN_BATCH:
+            for row in await fetch():
+                yield row
+    if batch:
+        for row in await fetch():
+            yield row
+
+
+def _nearest_cells(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid for every row, computed in chunks."""
+    out = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), ASSIGN_CHUNK):
+        chunk = matrix[start:start + ASSIGN_CHUNK]
+        out[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return out
+
+
+def _train_centroids(sample: np.ndarray, n_cells: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over unit vectors; returns unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_cells, replace=False)].copy()
+    for _ in range(KMEANS_ITERS):
+        assign = _nearest_cells(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        cells, starts = np.unique(assign[order], return_index=True)
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids[cells] = sums / np.maximum(norms, 1e-10)  # empty cells keep their centroid
+    return centroids
+
+
+def _cell_count(n: int) -> int:
+    return int(min(8192, max(64, 4 * np.sqrt(n))))
+
+
+class _Block:
+    """Growable contiguous float32 matrix with a parallel list of cache keys."""
+
+    def __init__(self, dim: int, matrix: np.ndarray | None = None, keys: list | None = None):
+        if matrix is None:
+            matrix = np.empty((256, dim), dtype=np.float32)
+        self.matrix = matrix
+        self.keys = keys or []
+
+    def append(self, key: str, vec: np.ndarray) -> int:
+        row = len(self.keys)
+        if row == self.matrix.shape[0]:
+            grown = np.empty((max(256, row * 2), self.matrix.shape[1]), dtype=np.float32)
+            grown[:row] = self.matrix[:row]
+            self.matrix = grown
+        self.matrix[row] = vec
+        self.keys.append(key)
+        return row
+
+    def pop(self, row: int) -> str | None:
+        """Delete a row by moving the last row into its place.
+        Returns the key that moved (its row changed), or None."""
+        last = len(self.keys) - 1
+        moved = None
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            moved = self.keys[last]
+            self.keys[row] = moved
+        self.keys.pop()
+        return moved
+
+    def best(self, query: np.ndarray):
+        if not self.keys:
+            return None, -1.0
+        scores = self.matrix[:len(self.keys)] @ query
+        i = int(np.argmax(scores))
+        return self.keys[i], float(scores[i])
+
+
+class _LanguageShard:
+    """All cached vectors for one language: exact mode or IVF mode."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.centroids = None          # (cells, dim) once IVF is active
+        self.blocks = [_Block(dim)]    # one block in exact mode, one per cell in IVF mode
+        self.where = {}                # key -> (block index, row)
+        self.trained_size = 0
+
+    def __len__(self):
+        return len(self.where)
+
+    def add(self, key: str, vec: np.ndarray):
+        if key in self.where:
+            self.remove(key)
+        b = 0 if self.centroids is None else int(np.argmax(self.centroids @ vec))
+        self.where[key] = (b, self.blocks[b].append(key, vec))
+
+    def remove(self, key: str) -> bool:
+        loc = self.where.pop(key, None)
+        if loc is None:
+            return False
+        b, row = loc
+        moved = self.blocks[b].pop(row)
+        if moved is not None:
+            self.where[moved] = (b, row)
+        return True
+
+    def search(self, query: np.ndarray):
+        if self.centroids is None:
+            return self.blocks[0].best(query)
+        cell_scores = self.centroids @ query
+        probes = min(IVF_PROBES, len(cell_scores))
+        best_key, best_score = None, -1.0
+        for b in np.argpartition(-cell_scores, probes - 1)[:probes]:
+            key, score = self.blocks[b].best(query)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    def needs_training(self) -> bool:
+        n = len(self)
+        return n >= IVF_MIN_ENTRIES and n >= 2 * self.trained_size
+
+    def training_sample(self, seed: int = 0) -> np.ndarray:
+        """Copy of up to KMEANS_SAMPLE stored vectors, for centroid training."""
+        parts = [blk.matrix[:len(blk.keys)] for blk in self.blocks if blk.keys]
+        sizes = np.array([len(p) for p in parts])
+        take = np.minimum(sizes, np.ceil(sizes / sizes.sum() * KMEANS_SAMPLE).astype(int))
+        rng = np.random.default_rng(seed)
+        return np.concatenate([p[rng.choice(len(p), t, replace=False)] for p, t in zip(parts, take)])
+
+    def reassign(self, centroids: np.ndarray):
+        """Redistribute every stored vector into the cells of `centroids`."""
+        n_cells = len(centroids)
+        new_blocks = [_Block(self.dim) for _ in range(n_cells)]
+        where = {}
+        for blk in self.blocks:
+            rows = blk.matrix[:len(blk.keys)]
+            for key, vec, cell in zip(blk.keys, rows, _nearest_cells(rows, centroids)):
+                where[key] = (int(cell), new_blocks[cell].append(key, vec))
+        self.blocks, self.where, self.centroids = new_blocks, where, centroids
+        self.trained_size = len(where)
+
+    @classmethod
+    def from_matrix(cls, keys: list, matrix: np.ndarray, seed: int = 0) -> "_LanguageShard":
+        """Build a shard in one pass from unit vectors (used by bulk loads)."""
+        shard = cls(matrix.shape[1])
+        if len(keys) < IVF_MIN_ENTRIES:
+            shard.blocks = [_Block(shard.dim, matrix, list(keys))]
+            shard.where = {k: (0, i) for i, k in enumerate(keys)}
+            return shard
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(len(matrix), min(len(matrix), KMEANS_SAMPLE), replace=False)]
+        centroids = _train_centroids(sample, _cell_count(len(keys)), seed)
+        assign = _nearest_cells(matrix, centroids)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        shard.blocks = []
+        for cell in range(len(centroids)):
+            idx = order[bounds[cell]:bounds[cell + 1]]
+            cell_keys = [keys[i] for i in idx]
+            shard.blocks.append(_Block(shard.dim, matrix[idx], cell_keys))
+            for row, key in enumerate(cell_keys):
+                shard.where[key] = (cell, row)
+        shard.centroids = centroids
+        shard.trained_size = len(keys)
+        return shard
+
+
+class SemanticIndex:
+    """
+    Thread-safe nearest-neighbour index of cached question embeddings.
+    Keys are the Redis cache keys; vectors are stored pre-normalized so the
+    returned score is the cosine similarity.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._shards: dict[str, _LanguageShard] = {}
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(s) for s in self._shards.values())
+
+    def size(self, language: str) -> int:
+        with self._lock:
+            shard = self._shards.get(language)
+            return len(shard) if shard else 0
+
+    def add(self, language: str, key: str, vec):
+        v = normalize(vec)
+        with self._lock:
+            shard = self._shards.get(language)
+            if shard is None or shard.dim != len(v):
+                shard = self._shards[language] = _LanguageShard(len(v))
+            shard.add(key, v)
+            if not shard.needs_training():
+                return
+            sample = shard.training_sample()
+        # k-means on the sample runs outside the lock; only the final
+        # reassignment of stored vectors blocks lookups.
+        centroids = _train_centroids(sample, _cell_count(len(shard)))
+        with self._lock:
+            if self._shards.get(language) is shard and shard.needs_training():
+                shard.reassign(centroids)
+
+    def remove(self, language: str, key: str) -> bool:
+        with self._lock:
+            shard = self._shards.get(language)
+            return shard.remove(key) if shard else False
+
+    def search(self, language: str, vec):
+        """Return (key, cosine similarity) of the closest cached question,
+        or (None, 0.0) if nothing is indexed for this language."""
+        q = normalize(vec)
+        with self._lock:
+            shard = self._shards.get(language)
+            if not shard or not len(shard) or shard.dim != len(q):
+                return None, 0.0
+            return shard.search(q)
+
+    def load(self, language: str, keys: list, vectors):
+        """Replace a language's entries in bulk (startup rebuilds, benchmarks)."""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-10)
+        shard = _LanguageShard.from_matrix(list(keys), matrix)
+        with self._lock:
+            self._shards[language] = shard
+
+    def clear(self):
+        with self._lock:
+            self._shards.clear()
@@ -0,0 +1,207 @@
+"""
+Single Flight - share one in-flight answer between identical questions
+When many users ask the same question at once, they all miss the semantic
+cache (it is only written once an answer finishes) and each would run its
+own retrieval, scoring and generation. SingleFlight runs the pipeline once
+per key in its own task and fans its SSE frames out to every subscriber;
+subscribers that join late first replay the frames already produced.
+
+The producer does not belong to any one client connection: it keeps running
+while any subscriber is still reading, and is cancelled (closing the
+upstream Bedrock stream) when the last one disconnects. Only a completed
+answer is cached.
+
+Late joiners need every frame from the start, so a flight buffers its
+frames until they pass SINGLE_FLIGHT_REPLAY_BYTES. After that it stops
+taking new subscribers (they start a flight of their own) and drops the
+frames every current subscriber has already read.
+
+join() returns a Subscription, which holds the caller's place from the
+moment it joins: until it starts reading it counts as waiting (frames are
+kept for it), and it gives that place up when closed, when ready() is
+cancelled or fails, or when a response that never started iterating is
+garbage collected.
+Event-loop only; not thread-safe.
+"""
+import asyncio
+import os
+
+SINGLE_FLIGHT_REPLAY_BYTES = int(os.getenv("SINGLE_FLIGHT_REPLAY_BYTES", str(1024 * 1024)))
+
+
+class Flight:
+    def __init__(self, max_replay_bytes: int = SINGLE_FLIGHT_REPLAY_BYTES):
+        self.frames: list = []
+        self.base = 0             # index of frames[0] in the whole stream
+        self.size = 0             # length of the buffered frames
+        self.max_replay_bytes = max_replay_bytes
+        self.joinable = True
+        self.waiting = 0          # joined but not reading yet
+        self.subscribers = 0      # subscribe() generators running
+        self.done = False
+        self.error: BaseException | None = None
+        self.task: asyncio.Task | None = None
+        self._cursors: dict = {}  # subscriber -> index of its next frame
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _trim(self):
+        """Drop frames every subscriber has read; never while someone has yet to start reading."""
+        if self.waiting or not self._cursors:
+            return
+        drop = min(self._cursors.values()) - self.base
+        if drop > 0:
+            self.size -= sum(len(f) for f in self.frames[:drop])
+            del self.frames[:drop]
+            self.base += drop
+
+    def publish(self, frame):
+        self.frames.append(frame)
+        self.size += len(frame)
+        if self.size > self.max_replay_bytes:
+            self.joinable = False
+        if not self.joinable:
+            self._trim()
+        self._notify()
+
+    def close(self, error: BaseException | None = None):
+        self.error = error
+        self.done = True
+        self.joinable = False
+        self._notify()
+
+    def _release(self):
+        """After a subscriber leaves: with nobody left, stop generating for nobody."""
+        if not self.subscribers and not self.waiting and not self.done and self.task is not None:
+            self.joinable = False
+            self.task.cancel()
+
+    async def ready(self):
+        """Wait for the first frame; re-raises the producer's error if it failed before producing any."""
+        while not self.frames and not self.done:
+            await self._changed.wait()
+        if self.error is not None and not self.frames:
+            raise self.error
+
+    async def subscribe(self):
+        """Every frame from the start, then live frames until the producer finishes."""
+        me = object()
+        self.waiting -= 1
+        self.subscribers += 1
+        i = self.base
+        self._cursors[me] = i
+        try:
+            while True:
+                while i < self.base + len(self.frames):
+                    yield self.frames[i - self.base]
+                    i += 1
+                    self._cursors[me] = i
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            del self._cursors[me]
+            self.subscribers -= 1
+            self._release()
+
+
+class Subscription:
+    """
+    One caller's place in a flight: await ready(), then async-iterate the
+    frames (e.g. as a StreamingResponse body). Waiting until iterated.
+    """
+
+    def __init__(self, flight: Flight):
+        self.flight = flight
+        self._frames = None       # flight.subscribe() once reading starts
+        self._closed = False
+        flight.waiting += 1
+
+    async def ready(self):
+        try:
+            await self.flight.ready()
+        except BaseException:  # producer failed, or this caller was cancelled
+            self.close()
+            raise
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        if self._frames is None:
+            self._frames = self.flight.subscribe()   # takes over the waiting place
+        try:
+            return await self._frames.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    def close(self):
+        """Give up the place without reading (the subscribe() generator cleans up after itself)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._frames is None:
+            self.flight.waiting -= 1
+            self.flight._release()
+
+    async def aclose(self):
+        frames = self._frames
+        self.close()
+        if frames is not None:
+            await frames.aclose()
+
+    def __del__(self):
+        # A response dropped before its body was iterated never calls close()
+        if not self._closed and self._frames is None:
+            self.close()
+
+
+class SingleFlight:
+    def __init__(self, max_replay_bytes: int = SINGLE_FLIGHT_REPLAY_BYTES):
+        self._flights: dict = {}
+        self.max_replay_bytes = max_replay_bytes
+        self.leaders = 0
+        self.followers = 0
+
+    def join(self, key, start) -> Subscription:
+        """
+        Attach to the flight for `key`, starting it if there is none (or it
+        no longer takes subscribers). `start()` is awaited once and must
+        return an async iterator of frames.
+        """
+        flight = self._flights.get(key)
+        if flight is not None and flight.joinable:
+            self.followers += 1
+            return Subscription(flight)
+        flight = self._flights[key] = Flight(self.max_replay_bytes)
+        self.leaders += 1
+        subscription = Subscription(flight)
+        flight.task = asyncio.create_task(self._run(key, flight, start))
+        return subscription
+
+    async def _run(self, key, flight: Flight, start):
+        error = None
+        try:
+            async for frame in await start():
+                flight.publish(frame)
+        except BaseException as e:  # includes cancellation when every subscriber left
+            error = e
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.close(error)
+
+    def stats(self) -> dict:
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._flights),
+            "leaders":   self.leaders,
+            "followers": self.followers,
+            "upstream_pipelines_saved": round(self.followers / total, 4) if total else 0.0,
+        }
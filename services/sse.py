@@ -0,0 +1,186 @@
+"""
+SSE - Server-Sent Event framing and chunk coalescing
+Answers used to go out as one `data:` frame per model delta (one per word on
+the cached path). A long Hindi answer then meant thousands of tiny writes,
+each with its own json.dumps and ASGI send, and proxies flushing every one.
+
+render() turns an async iterator of event dicts into SSE frames and merges
+consecutive 'chunk' events into one frame. A merged chunk is flushed when:
+  - its text reaches SSE_FLUSH_BYTES (UTF-8), or
+  - SSE_FLUSH_MS have passed since its first delta arrived, or
+  - any other event (citations, done, error) has to go out.
+The first chunk of an answer is always sent immediately, so coalescing never
+delays time-to-first-token. SSE_COALESCE=0 restores one frame per event.
+
+Semantic cache hits skip all of that: prerender() groups a finished answer's
+deltas into the frames render() would have sent, once, when the answer is
+cached, and replay() writes the stored bytes back out - in a few large
+writes (SSE_REPLAY=burst) or at the original pacing (SSE_REPLAY=paced,
+sped up by SSE_REPLAY_SPEED).
+"""
+import asyncio
+import contextlib
+import json
+import os
+
+from services.async_bridge import STREAM_QUEUE_SIZE
+
+SSE_COALESCE    = os.getenv("SSE_COALESCE", "1") == "1"
+SSE_FLUSH_BYTES = int(os.getenv("SSE_FLUSH_BYTES", "512"))
+SSE_FLUSH_MS    = float(os.getenv("SSE_FLUSH_MS", "25"))
+SSE_PRERENDER   = os.getenv("SSE_PRERENDER", "1") == "1"          # store rendered frames with cache entries
+SSE_REPLAY      = os.getenv("SSE_REPLAY", "burst")                # burst | paced
+SSE_REPLAY_SPEED = float(os.getenv("SSE_REPLAY_SPEED", "1"))      # paced replay speed-up
+SSE_REPLAY_WRITE_BYTES = int(os.getenv("SSE_REPLAY_WRITE_BYTES", "65536"))
+
+_END = object()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",   # important for nginx proxies
+}
+
+
+def frame(event: dict) -> str:
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def render(events, enabled: bool | None = None, flush_bytes: int | None = None,
+                 flush_ms: float | None = None):
+    """SSE frames for `events` (async iterator of dicts), with 'chunk' events coalesced."""
+    enabled = SSE_COALESCE if enabled is None else enabled
+    if not enabled:
+        async for event in events:
+            yield frame(event)
+        return
+    flush_bytes = SSE_FLUSH_BYTES if flush_bytes is None else flush_bytes
+    flush_delay = (SSE_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+
+    # The source runs in its own task so a flush timer can fire without
+    # cancelling it mid-event; everything it has queued is drained in one go.
+    # The queue is bounded, so a slow client still holds back the upstream stream.
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(_END)
+
+    producer = asyncio.create_task(pump())
+    pending: list = []    # chunk texts not yet sent
+    size = 0
+    deadline = 0.0
+    first = True
+
+    def merged() -> str:
+        text = "".join(pending)
+        pending.clear()
+        return frame({"type": "chunk", "text": text})
+
+    try:
+        while True:
+            if pending and queue.empty():
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        event = await queue.get()
+                except TimeoutError:
+                    size = 0
+                    yield merged()
+                    continue
+            else:
+                event = await queue.get()
+            if event is _END:
+                break
+            if isinstance(event, Exception):
+                raise event
+
+            if event.get("type") != "chunk":
+                if pending:
+                    size = 0
+                    yield merged()
+                yield frame(event)
+                continue
+            if first:
+                first = False
+                yield frame(event)
+                continue
+            if not pending:
+                deadline = loop.time() + flush_delay
+            pending.append(event["text"])
+            size += len(event["text"].encode())
+            if size >= flush_bytes or loop.time() >= deadline:
+                size = 0
+                yield merged()
+        if pending:
+            yield merged()
+    finally:
+        producer.cancel()
+        with contextlib.suppress(BaseException):
+            await producer
+
+
+def prerender(deltas: list, flush_bytes: int | None = None, flush_ms: float | None = None) -> tuple:
+    """
+    Chunk frames for a finished answer, grouped the way render() sends them live.
+    `deltas` is [(text, seconds after the first delta)]. Returns (payload, marks):
+    the UTF-8 frames back to back, and [end offset, ms after the first delta] per frame.
+    """
+    flush_bytes = SSE_FLUSH_BYTES if flush_bytes is None else flush_bytes
+    flush_delay = (SSE_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+    frames, marks = [], []
+    offset = 0
+
+    def emit(texts: list, at: float):
+        nonlocal offset
+        data = frame({"type": "chunk", "text": "".join(texts)}).encode()
+        frames.append(data)
+        offset += len(data)
+        marks.append([offset, round(at * 1000, 1)])
+
+    pending: list = []
+    size = 0
+    deadline = 0.0
+    for i, (text, at) in enumerate(deltas):
+        if i == 0:
+            emit([text], at)
+            continue
+        if pending and at >= deadline:
+            emit(pending, deadline)
+            pending, size = [], 0
+        if not pending:
+            deadline = at + flush_delay
+        pending.append(text)
+        size += len(text.encode())
+        if size >= flush_bytes:
+            emit(pending, at)
+            pending, size = [], 0
+    if pending:
+        emit(pending, min(deadline, deltas[-1][1]))
+    return b"".join(frames), marks
+
+
+async def replay(payload: bytes, marks: list | None = None, paced: bool | None = None,
+                 speed: float | None = None):
+    """Stored frames from prerender(): SSE_REPLAY_WRITE_BYTES at a time, or at their original pacing."""
+    paced = (SSE_REPLAY == "paced") if paced is None else paced
+    if not paced or not marks:
+        for start in range(0, len(payload), SSE_REPLAY_WRITE_BYTES):
+            yield payload[start:start + SSE_REPLAY_WRITE_BYTES]
+        return
+    speed = SSE_REPLAY_SPEED if speed is None else speed
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sent = 0
+    for i, (end, at_ms) in enumerate(marks):
+        # Frames already due go out together; wait only for the next one in the future
+        if i + 1 < len(marks) and started + marks[i + 1][1] / 1000 / speed <= loop.time():
+            continue
+        delay = started + at_ms / 1000 / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield payload[sent:end]
+        sent = end
@@ -0,0 +1,202 @@
+"""
+Local AWS stubs - in-process stand-ins for Bedrock and Translate clients
+Used by benchmarks and offline tools to exercise the real code paths without
+network access or AWS cost. Latency is simulated with sleeps and throttling
+is raised as a botocore ClientError, the same shape the real client uses.
+"""
+import hashlib
+import io
+import json
+import threading
+import time
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+
+def throttling_error(operation: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Too many requests (stub)"}},
+        operation,
+    )
+
+
+STUB_ANSWER = (
+    "Under Article 21 of the Constitution of India, no person shall be deprived of life or "
+    "personal liberty except according to procedure established by law. You may approach the "
+    "nearest police station, and if they refuse to act you can write to the Superintendent of "
+    "Police or file a complaint before the Magistrate under Section 156(3) CrPC."
+)
+
+
+def stub_reply(prompt: str) -> str:
+    """Canned model output matching what each NyayaBharat prompt asks for."""
+    if "SIMPLE or COMPLEX" in prompt:
+        return "SIMPLE"
+    if "JSON object" in prompt and "faithfulness" in prompt:
+        return 'Scores:\n{"faithfulness": 0.8, "answer_relevance": 0.9, "context_precision": 0.7}'
+    if "decimal" in prompt:
+        return "0.8"
+    if "Rephrase" in prompt:
+        return prompt.rsplit("Original:", 1)[-1].split("\n")[0].strip()
+    return STUB_ANSWER
+
+
+def stub_embedding(text: str, dim: int = 1024) -> list:
+    """Deterministic pseudo-embedding: identical text -> identical vector."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+class StubEventStream:
+    """Blocking iterable of converse_stream events, one word per delta."""
+
+    def __init__(self, text: str, token_delay: float, input_tokens: int = 0):
+        self.words = text.split(" ")
+        self.token_delay = token_delay
+        self.input_tokens = input_tokens
+        self.closed = False
+
+    def __iter__(self):
+        yield {"messageStart": {"role": "assistant"}}
+        for i, word in enumerate(self.words):
+            if self.closed:
+                return
+            time.sleep(self.token_delay)
+            text = word if i == len(self.words) - 1 else word + " "
+            yield {"contentBlockDelta": {"delta": {"text": text}, "contentBlockIndex": 0}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {"metadata": {"usage": {"inputTokens": self.input_tokens, "outputTokens": len(self.words)}}}
+
+    def close(self):
+        self.closed = True
+
+
+class StubBedrockRuntime:
+    """
+    Minimal bedrock-runtime stand-in. `latency` is seconds per call and
+    `token_delay` seconds per streamed word; calls beyond `max_concurrency`
+    in flight raise ThrottlingException. `responder(prompt) -> str` supplies
+    the model output.
+    """
+
+    def __init__(self, latency: float = 0.05, max_concurrency: int = 1_000_000, dim: int = 1024,
+                 token_delay: float = 0.01, responder=stub_reply):
+        self.responder = responder
+        self.latency = latency
+        self.token_delay = token_delay
+        self.max_concurrency = max_concurrency
+        self.dim = dim
+        self.calls = 0
+        self.throttled = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, operation: str):
+        with self._lock:
+            self.calls += 1
+            if self._in_flight >= self.max_concurrency:
+                self.throttled += 1
+                raise throttling_error(operation)
+            self._in_flight += 1
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def invoke_model(self, modelId: str, body: str, **kwargs):
+        self._enter("InvokeModel")
+        try:
+            time.sleep(self.latency)
+            text = json.loads(body).get("inputText", "")
+            payload = {"embedding": stub_embedding(text, self.dim), "inputTextTokenCount": len(text.split())}
+            return {"body": io.BytesIO(json.dumps(payload).encode())}
+        finally:
+            self._exit()
+
+    def converse(self, modelId: str, messages: list, **kwargs):
+        self._enter("Converse")
+        try:
+            time.sleep(self.latency)
+            prompt = messages[-1]["content"][-1].get("text", "")
+            text = self.responder(prompt)
+            return {
+                "output": {"message": {"role": "assistant", "content": [{"text": text}]}},
+                "usage": {"inputTokens": len(prompt.split()), "outputTokens": len(text.split())},
+                "stopReason": "end_turn",
+            }
+        finally:
+            self._exit()
+
+    def converse_stream(self, modelId: str, messages: list, **kwargs):
+        self._enter("ConverseStream")
+        try:
+            time.sleep(self.latency)
+            prompt = messages[-1]["content"][-1].get("text", "")
+        finally:
+            self._exit()
+        return {"stream": StubEventStream(self.responder(prompt), self.token_delay, len(prompt.split()))}
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.throttled = 0
+
+
+class StubAgentRuntime:
+    """Minimal bedrock-agent-runtime stand-in returning fixed KB passages."""
+
+    PASSAGES = [
+        ("Article 21: No person shall be deprived of his life or personal liberty except "
+         "according to procedure established by law.", "s3://stub-kb/constitution.pdf", 0.71),
+        ("Section 154 CrPC: Every information relating to the commission of a cognizable offence "
+         "shall be reduced to writing by the officer in charge of a police station.", "s3://stub-kb/crpc.pdf", 0.64),
+        ("Section 6 RTI Act: A person who desires to obtain any information shall make a request "
+         "in writing to the Public Information Officer.", "s3://stub-kb/rti.pdf", 0.52),
+    ]
+
+    def __init__(self, latency: float = 0.05, score_scale: float = 1.0):
+        self.latency = latency
+        self.score_scale = score_scale  # < 1 makes every passage look less relevant
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def retrieve(self, retrievalQuery: dict, knowledgeBaseId: str, retrievalConfiguration: dict | None = None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        n = (retrievalConfiguration or {}).get("vectorSearchConfiguration", {}).get("numberOfResults", 5)
+        return {"retrievalResults": [
+            {"content": {"text": text}, "location": {"s3Location": {"uri": uri}}, "score": score * self.score_scale}
+            for text, uri, score in self.PASSAGES[:n]
+        ]}
+
+
+class StubTranslate:
+    """Minimal translate stand-in: tags the text with its target language and counts characters."""
+
+    def __init__(self, latency: float = 0.05, max_concurrency: int = 1_000_000):
+        self.latency = latency
+        self.max_concurrency = max_concurrency
+        self.calls = 0
+        self.throttled = 0
+        self.characters = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def translate_text(self, Text: str, SourceLanguageCode: str, TargetLanguageCode: str, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self._in_flight >= self.max_concurrency:
+                self.throttled += 1
+                raise throttling_error("TranslateText")
+            self._in_flight += 1
+            self.characters += len(Text)
+        try:
+            time.sleep(self.latency)
+            return {"TranslatedText": f"[{TargetLanguageCode}] {Text}",
+                    "SourceLanguageCode": SourceLanguageCode, "TargetLanguageCode": TargetLanguageCode}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
@@ -0,0 +1,455 @@
+"""
+Tiered Cache - in-process L1 in front of the Redis semantic cache (L2)
+The semantic index already lives in process, but every hit still fetched its
+answer from Redis, and a Redis that was down at startup turned the cache off
+for the life of the process. TieredCache adds:
+
+  - L1: a bounded LRU of decoded entries by cache key, each expiring with
+    the key's remaining Redis TTL, so hot answers skip the network hop
+  - background reconnect with exponential backoff; while Redis is away,
+    lookups and saves keep working against L1 and saves are replayed to
+    Redis once it is back
+  - cross-worker invalidation over Redis pub/sub: a save or invalidate in
+    one worker drops the key from every other worker's L1 (and lets them
+    index the new question)
+  - per-tier hit counts and lookup latency, reported by stats()
+  - touch() on every hit: the entry's TTL starts over and its `hits` field
+    is incremented, batched like reads
+
+Redis is reached through redis.asyncio on one bounded connection pool
+(REDIS_URL, REDIS_POOL_SIZE), so cache traffic never holds a thread or the
+event loop. L2 reads issued in the same event-loop tick share one pipelined
+round trip, and a save (HSET + EXPIRE + the invalidation PUBLISH) is a
+single MULTI/EXEC. Everything that touches Redis is a coroutine and must run
+on the event loop.
+"""
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+import redis
+import redis.asyncio as aioredis
+
+from services.semantic_cache import ENTRY_FIELDS, decode_entry
+
+REDIS_URL             = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_POOL_SIZE       = int(os.getenv("REDIS_POOL_SIZE", "64"))
+REDIS_POOL_TIMEOUT    = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))      # wait for a free connection
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1"))
+REDIS_SOCKET_TIMEOUT  = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
+REDIS_RECONNECT_MIN   = float(os.getenv("REDIS_RECONNECT_MIN", "1"))     # seconds before the first retry
+REDIS_RECONNECT_MAX   = float(os.getenv("REDIS_RECONNECT_MAX", "30"))
+L1_CACHE_SIZE         = int(os.getenv("L1_CACHE_SIZE", "1024"))
+INVALIDATION_CHANNEL  = os.getenv("CACHE_INVALIDATION_CHANNEL", "nyaya:cache:invalidate")
+
+# Identifies this process on the invalidation channel so it can skip its own messages
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Errors that mean Redis is unreachable, as opposed to a bad command
+L2_ERRORS = (redis.ConnectionError, redis.TimeoutError, OSError)
+
+L1, L2, MISS, EXPIRED = "l1", "l2", "miss", "expired"
+
+
+async def open_redis(url: str = REDIS_URL, pool_size: int = REDIS_POOL_SIZE) -> aioredis.Redis:
+    """A connected async client on a bounded, blocking pool; raises if Redis is unreachable."""
+    # Probe without redis-py's connection retries so a missing Redis fails in ms, not seconds
+    probe = aioredis.Redis.from_url(url, retry=None, socket_connect_timeout=REDIS_CONNECT_TIMEOUT)
+    try:
+        await probe.ping()
+    finally:
+        await probe.aclose()
+    pool = aioredis.BlockingConnectionPool.from_url(  # raw bytes: embeddings are float32 blobs
+        url, max_connections=pool_size, timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT, socket_timeout=REDIS_SOCKET_TIMEOUT,
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+
+class L1Cache:
+    """LRU of decoded cache entries keyed by Redis key, with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple] = OrderedDict()  # key -> (expires_at, entry)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, entry: dict, ttl: float | None = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def touch(self, key: str):
+        """Restart an entry's expiry (its Redis TTL was just refreshed)."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                self._entries[key] = (time.monotonic() + self.ttl, item[1])
+
+    def discard(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+
+
+class TieredCache:
+    """
+    `connect()` is a coroutine returning a connected async Redis client or
+    raising. Async callbacks: on_connect(client) after every (re)connect,
+    on_remote(op, key, language, client) for another worker's change; plain
+    callback on_disconnect() when Redis is lost.
+    """
+
+    def __init__(self, connect=open_redis, ttl: int = 60 * 60 * 24, l1_size: int = L1_CACHE_SIZE,
+                 on_connect=None, on_disconnect=None, on_remote=None):
+        self._connect = connect
+        self.ttl = ttl
+        self.l1 = L1Cache(l1_size, ttl)
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.on_remote = on_remote
+        self.redis = None
+        self._pending: OrderedDict[str, tuple] = OrderedDict()  # saves made while Redis was away
+        self._reads: list = []                                   # (key, future) for the next pipeline
+        self._touches: dict[str, int] = {}                       # key -> hits since the last flush
+        self._listener: asyncio.Task | None = None
+        self._reconnect: asyncio.Task | None = None
+        self._closed = False
+        self._counts = {L1: 0, L2: 0, MISS: 0}
+        self._latency = {tier: deque(maxlen=1000) for tier in self._counts}
+        self.connects = 0
+        self.disconnects = 0
+        self.l2_errors = 0
+        self.l2_reads = 0
+        self.l2_read_batches = 0
+        self.l2_writes = 0
+        self.touches = 0
+        self.deletes = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+        self.last_error = None
+
+    @property
+    def available(self) -> bool:
+        return self.redis is not None
+
+    # --- connection ----------------------------------------------------------
+
+    async def connect(self):
+        """Connect, replay saves made while disconnected, then subscribe. Raises if Redis is unreachable."""
+        client = await self._connect()
+        try:
+            await self._flush_pending(client)
+            if self.on_connect:
+                await self.on_connect(client)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+        except BaseException:
+            await client.aclose(close_connection_pool=True)
+            raise
+        self.redis = client
+        self.connects += 1
+        self._listener = asyncio.create_task(self._listen(client, pubsub))
+        await self._flush_pending(client)  # saves that raced the reconnect
+
+    async def start(self) -> bool:
+        """Connect now if possible; otherwise keep serving from L1 and retry in the background."""
+        try:
+            await self.connect()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self._reconnect_later()
+            return False
+
+    async def close(self):
+        self._closed = True
+        for task in (self._reconnect, self._listener):
+            if task is not None:
+                task.cancel()
+        client, self.redis = self.redis, None
+        if client is not None:
+            await client.aclose(close_connection_pool=True)
+
+    def _reconnect_later(self):
+        if self._closed or (self._reconnect is not None and not self._reconnect.done()):
+            return
+        self._reconnect = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        delay = REDIS_RECONNECT_MIN
+        while not self._closed:
+            await asyncio.sleep(delay)
+            try:
+                await self.connect()
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                delay = min(delay * 2, REDIS_RECONNECT_MAX)
+
+    def _lost(self, client, error: Exception):
+        """A Redis call failed at the connection level: serve from L1 until it is back."""
+        self.l2_errors += 1
+        if self.redis is not client:
+            return  # already handled
+        self.redis = None
+        self.disconnects += 1
+        self.last_error = str(error)
+        if self._listener is not None and self._listener is not asyncio.current_task():
+            self._listener.cancel()
+        asyncio.get_running_loop().create_task(client.aclose(close_connection_pool=True))
+        if self.on_disconnect:
+            self.on_disconnect()
+        self._reconnect_later()
+
+    async def _write(self, client, key: str, mapping: dict, language: str | None):
+        """HSET + EXPIRE + the invalidation PUBLISH as one MULTI/EXEC round trip."""
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self.ttl)
+            pipe.publish(INVALIDATION_CHANNEL, self._message("put", key, language))
+            await pipe.execute()
+        self.l2_writes += 1
+        self.invalidations_sent += 1
+
+    async def _flush_pending(self, client):
+        while self._pending:
+            key, (language, mapping) = next(iter(self._pending.items()))
+            await self._write(client, key, mapping, language)
+            if self._pending.get(key, (None, None))[1] is mapping:
+                del self._pending[key]
+
+    # --- entries -------------------------------------------------------------
+
+    async def get(self, key: str) -> tuple:
+        """
+        (entry, tier) for a cache key: tier is L1 or L2 on a hit, EXPIRED if
+        Redis no longer has the key, None if Redis is unavailable.
+        """
+        entry = self.l1.get(key)
+        if entry is not None:
+            return entry, L1
+        client = self.redis
+        if client is None:
+            return None, None
+        try:
+            values, ttl = await self._read(client, key)
+        except L2_ERRORS as e:
+            self._lost(client, e)
+            return None, None
+        entry = decode_entry(values)
+        if entry is None:
+            return None, EXPIRED
+        self.l1.put(key, entry, ttl if ttl and ttl > 0 else None)
+        return entry, L2
+
+    def _read(self, client, key: str) -> asyncio.Future:
+        """(HMGET ENTRY_FIELDS, TTL) for key, pipelined with every other read issued this tick."""
+        future = asyncio.get_running_loop().create_future()
+        self._reads.append((key, future))
+        if len(self._reads) == 1:
+            asyncio.get_running_loop().call_soon(self._send_reads, client)
+        return future
+
+    def _send_reads(self, client):
+        batch, self._reads = self._reads, []
+        self.l2_reads += len(batch)
+        self.l2_read_batches += 1
+        asyncio.create_task(self._execute_reads(client, batch))
+
+    async def _execute_reads(self, client, batch: list):
+        keys = list(dict.fromkeys(key for key, _ in batch))  # the same hot key is read once
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, *ENTRY_FIELDS)
+            pipe.ttl(key)
+        try:
+            replies = await pipe.execute()
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        results = {key: (replies[2 * i], replies[2 * i + 1]) for i, key in enumerate(keys)}
+        for key, future in batch:
+            if not future.done():
+                future.set_result(results[key])
+
+    def touch(self, key: str):
+        """A hit on key: refresh its TTL and count the hit in Redis, batched with this tick's other hits."""
+        self.l1.touch(key)
+        client = self.redis
+        if client is None:
+            return
+        if not self._touches:
+            asyncio.get_running_loop().call_soon(self._send_touches, client)
+        self._touches[key] = self._touches.get(key, 0) + 1
+
+    def _send_touches(self, client):
+        batch, self._touches = self._touches, {}
+        self.touches += len(batch)
+        asyncio.create_task(self._execute_touches(client, batch))
+
+    async def _execute_touches(self, client, batch: dict):
+        pipe = client.pipeline(transaction=False)
+        for key, hits in batch.items():
+            pipe.hincrby(key, "hits", hits)
+            pipe.expire(key, self.ttl)
+        try:
+            await pipe.execute()
+        except L2_ERRORS as e:
+            self._lost(client, e)
+        except Exception:
+            pass
+
+    async def delete(self, key: str, language: str | None = None):
+        """Remove an entry everywhere: L1, Redis, and (via pub/sub) the other workers."""
+        self.l1.discard(key)
+        self._pending.pop(key, None)
+        client = self.redis
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.publish(INVALIDATION_CHANNEL, self._message("delete", key, language))
+                await pipe.execute()
+            self.deletes += 1
+            self.invalidations_sent += 1
+        except L2_ERRORS as e:
+            self._lost(client, e)
+
+    async def put(self, key: str, language: str, mapping: dict, entry: dict):
+        """Store in L1 and Redis (later, if Redis is away) and tell the other workers."""
+        self.l1.put(key, entry)
+        client = self.redis
+        if client is not None:
+            try:
+                await self._write(client, key, mapping, language)
+                return
+            except L2_ERRORS as e:
+                self._lost(client, e)
+        self._pending[key] = (language, mapping)
+        self._pending.move_to_end(key)
+        while len(self._pending) > self.l1.max_entries:
+            self._pending.popitem(last=False)
+
+    async def invalidate(self, key: str | None = None, language: str | None = None) -> int:
+        """Drop one key (or everything) from L1 here and in every other worker."""
+        removed = int(self.l1.discard(key)) if key else self.l1.clear()
+        client = self.redis
+        if client is not None:
+            try:
+                await client.publish(INVALIDATION_CHANNEL, self._message("delete" if key else "clear", key, language))
+                self.invalidations_sent += 1
+            except L2_ERRORS as e:
+                self._lost(client, e)
+        return removed
+
+    # --- pub/sub -------------------------------------------------------------
+
+    @staticmethod
+    def _message(op: str, key: str | None, language: str | None) -> str:
+        return json.dumps({"origin": WORKER_ID, "op": op, "key": key, "language": language})
+
+    async def _listen(self, client, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    await self._on_message(message, client)
+        except L2_ERRORS as e:
+            self._lost(client, e)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def _on_message(self, message: dict, client):
+        try:
+            change = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        if change.get("origin") == WORKER_ID:
+            return
+        self.invalidations_received += 1
+        op, key = change.get("op"), change.get("key")
+        if op == "clear":
+            self.l1.clear()
+        elif key:
+            self.l1.discard(key)
+        if self.on_remote and op in ("put", "delete") and key:
+            try:
+                await self.on_remote(op, key, change.get("language"), client)
+            except L2_ERRORS:
+                raise
+            except Exception:
+                pass
+
+    # --- metrics -------------------------------------------------------------
+
+    def record(self, tier: str, seconds: float):
+        """Count one lookup resolved by `tier` (L1, L2 or MISS) and its latency."""
+        self._counts[tier] += 1
+        self._latency[tier].append(seconds * 1000)
+
+    def stats(self) -> dict:
+        lookups = sum(self._counts.values())
+        tiers = {}
+        for tier, count in self._counts.items():
+            ordered = sorted(self._latency[tier])
+            tiers[tier] = {
+                "count":     count,
+                "hit_ratio": round(count / lookups, 4) if lookups else 0.0,
+                "p50_ms":    round(ordered[len(ordered) // 2], 3) if ordered else None,
+                "p95_ms":    round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3) if ordered else None,
+            }
+        return {
+            "redis":          "connected" if self.redis is not None else "reconnecting",
+            "last_error":     self.last_error,
+            "pool_size":      self.redis.connection_pool.max_connections if self.redis is not None else None,
+            "connects":       self.connects,
+            "disconnects":    self.disconnects,
+            "l2_errors":      self.l2_errors,
+            "l2_reads":       self.l2_reads,
+            "l2_read_batches": self.l2_read_batches,
+            "l2_writes":      self.l2_writes,
+            "ttl_refreshes":  self.touches,
+            "deletes":        self.deletes,
+            "pending_writes": len(self._pending),
+            "l1_entries":     len(self.l1),
+            "l1_evictions":   self.l1.evictions,
+            "invalidations":  {"sent": self.invalidations_sent, "received": self.invalidations_received},
+            "lookups":        lookups,
+            "tiers":          tiers,
+        }
@@ -2,10 +2,12 @@
 Voice_Complaint_System - Voice-based Complaint Filing
 Processes voice complaints via AWS Transcribe + Translate + Nova (with Llama fallback)
 """
-import boto3
 import requests
 import json
 
+from services.aws_clients import LazyClient
+from services.model_failover import model_failover
+
 MODEL_ID          = "amazon.nova-lite-v1:0"
 FALLBACK_MODEL_ID = "meta.llama3-3-70b-instruct-v1:0"
 
@@ -38,10 +40,10 @@ Write the formal complaint letter in English. Be concise, professional, and lega
 class VoiceComplaintService:
     def __init__(self):
         self.bucket_name = "nyaya-bharat-audio"
-        self.s3_client = boto3.client("s3")
-        self.transcribe_client = boto3.client("transcribe", region_name="us-east-1")
-        self.translate_client = boto3.client("translate", region_name="us-east-1")
-        self.bedrock_client = boto3.client("bedrock-runtime", region_name="us-east-1")
+        self.s3_client = LazyClient("s3")
+        self.transcribe_client = LazyClient("transcribe")
+        self.translate_client = LazyClient("translate")
+        self.bedrock_client = LazyClient("bedrock-runtime")
 
     def start_job(self, file_obj, job_name):
         s3_key = f"audio/{job_name}.mp3"
@@ -59,18 +61,17 @@ class VoiceComplaintService:
         return job_name
 
     def _generate_complaint(self, prompt):
-        """Try Nova first, fall back to Llama if it fails."""
-        for model_id in [MODEL_ID, FALLBACK_MODEL_ID]:
-            try:
-                response = self.bedrock_client.converse(
-                    modelId=model_id,
-                    messages=[{"role": "user", "content": [{"text": prompt}]}],
-                    inferenceConfig={"temperature": 0.2, "maxTokens": 1000}
-                )
-                return response["output"]["message"]["content"][0]["text"]
-            except Exception:
-                if model_id == FALLBACK_MODEL_ID:
-                    raise
+        """Nova first, Llama when Nova is failing or slow (see services/model_failover.py)."""
+        def generate(model_id):
+            response = self.bedrock_client.converse(
+                modelId=model_id,
+                messages=[{"role": "user", "content": [{"text": prompt}]}],
+                inferenceConfig={"temperature": 0.2, "maxTokens": 1000}
+            )
+            return response["output"]["message"]["content"][0]["text"]
+
+        text, _ = model_failover.call([MODEL_ID, FALLBACK_MODEL_ID], generate, op="voice_complaint")
+        return text
 
     def check_result(self, job_name):
         job = self.transcribe_client.get_transcription_job(TranscriptionJobName=job_name)
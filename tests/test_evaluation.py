@@ -0,0 +1,32 @@
+import pytest
+
+from services.evaluation import parse_score, parse_scores
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("5/5", 1.0),
+    ("4/5", 0.8),
+    ("3 / 4", 0.75),
+    ("8/10", 0.8),
+    ("80/100", 0.8),
+    ("Score: 0.8", 0.8),
+    ("80%", 0.8),
+    ("8", 0.8),
+    ("0.5", 0.5),
+])
+def test_parse_score_scales_to_unit_interval(text, expected):
+    assert parse_score(text) == pytest.approx(expected)
+
+
+def test_parse_score_defaults_without_a_number():
+    assert parse_score("no idea", default=0.5) == 0.5
+    assert parse_score("", default=0.3) == 0.3
+
+
+def test_parse_score_ignores_a_zero_denominator():
+    assert parse_score("0.7/0") == pytest.approx(0.7)
+
+
+def test_parse_scores_reads_ratios_per_metric():
+    scores = parse_scores("faithfulness: 4/5\nanswer_relevance: 9/10\ncontext_precision: 3/4")
+    assert scores == pytest.approx({"faithfulness": 0.8, "answer_relevance": 0.9, "context_precision": 0.75})
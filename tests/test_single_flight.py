@@ -0,0 +1,80 @@
+import asyncio
+import gc
+
+from services.single_flight import SingleFlight
+
+
+def producer(frames, gate: asyncio.Event, delay: float = 0.01):
+    """start() for SingleFlight.join: waits for `gate`, then yields `frames` slowly."""
+    async def start():
+        async def events():
+            await gate.wait()
+            for frame in frames:
+                await asyncio.sleep(delay)
+                yield frame
+        return events()
+    return start
+
+
+async def stopped(flight) -> bool:
+    """True once the flight's producer has been cancelled."""
+    await asyncio.sleep(0.05)
+    return flight.task.cancelled() or isinstance(flight.error, asyncio.CancelledError)
+
+
+def test_subscribers_share_one_producer():
+    async def main():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+        gate.set()
+        leader = flights.join("q", producer([b"a", b"b", b"c"], gate))
+        follower = flights.join("q", producer([b"x"], gate))
+        await leader.ready()
+        await follower.ready()
+        async def read(subscription):
+            return [frame async for frame in subscription]
+
+        got = await asyncio.gather(read(leader), read(follower))
+        assert got == [[b"a", b"b", b"c"]] * 2
+        assert flights.stats()["leaders"] == 1 and flights.stats()["followers"] == 1
+
+    asyncio.run(main())
+
+
+def test_follower_cancelled_before_subscribing_releases_its_place():
+    async def main():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+        leader = flights.join("q", producer([b"a", b"b"], gate))
+        follower = flights.join("q", producer([b"x"], gate))
+        flight = leader.flight
+        waiter = asyncio.create_task(follower.ready())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert flight.waiting == 1   # only the leader
+
+        # The leader reads one frame and disconnects: nobody is left, so the producer stops
+        gate.set()
+        await leader.ready()
+        async for _ in leader:
+            break
+        await leader.aclose()
+        assert await stopped(flight)
+        assert flight.waiting == 0 and flight.subscribers == 0
+
+    asyncio.run(main())
+
+
+def test_unread_subscription_is_released_when_dropped():
+    async def main():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+        subscription = flights.join("q", producer([b"a"], gate))
+        flight = subscription.flight
+        del subscription   # e.g. a response whose body was never iterated
+        gc.collect()
+        assert flight.waiting == 0
+        assert await stopped(flight)
+
+    asyncio.run(main())